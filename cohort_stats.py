@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+def load_cohort(csv_files, volunteer_names, value_column='Resistance'):
+    """
+    Concatenates one CSV per volunteer into a single frame with categorical
+    'Volunteer' and 'Stage' columns.
+    """
+    frames = []
+    for file_path, volunteer in zip(csv_files, volunteer_names):
+        df = pd.read_csv(file_path, usecols=['Stage', value_column])
+        df['Volunteer'] = volunteer
+        frames.append(df)
+    data = pd.concat(frames, ignore_index=True)
+    data['Volunteer'] = pd.Categorical(data['Volunteer'], categories=list(dict.fromkeys(volunteer_names)))
+    data['Stage'] = data['Stage'].astype('category')
+    return data
+
+
+def normalize_per_volunteer(data, value_column='Resistance', low=0.1):
+    """
+    Rescales every volunteer's values independently to the [low, 1] range
+    (volunteers with a constant signal get 0). The per-volunteer min/max come
+    from one grouped pass and are broadcast back through the category codes.
+    """
+    codes = data['Volunteer'].cat.codes.to_numpy()
+    values = data[value_column].to_numpy(dtype=np.float64)
+    stats = data.groupby('Volunteer', observed=False)[value_column].agg(['min', 'max'])
+    minimum = stats['min'].to_numpy()[codes]
+    value_range = (stats['max'] - stats['min']).to_numpy()[codes]
+    normalized = low + (values - minimum) / (value_range + 1e-6) * (1 - low)
+    return np.where(value_range == 0, 0.0, normalized)
+
+
+def cohort_summary(data, value_column='Normalized Resistance'):
+    """Mean, count and standard deviation of value_column for every (Volunteer, Stage) pair."""
+    return data.groupby(['Volunteer', 'Stage'], observed=True)[value_column].agg(['mean', 'count', 'std'])
+
+
+def stage_means(summary, volunteers, stages):
+    """(volunteers x stages) table of means from cohort_summary(), NaN where a stage is missing."""
+    return summary['mean'].unstack('Stage').reindex(index=volunteers, columns=stages)
@@ -0,0 +1,145 @@
+import argparse
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from ble_gaps import MAX_GAP_S, gap_mask, session_gaps
+from cosinuss_reader import find_session_files, load_stream
+
+# Streams used when align_session() is not given an explicit list.
+DEFAULT_STREAMS = ('heart_rate', 'rr_int', 'ppg_ir_ppg_ambient_ppg_red', 'acc_x_acc_y_acc_z', 'acc_mag',
+                   'perfusion_ir', 'ppg_quality', 'quality', 'spo2', 'temperature')
+
+AlignedSession = namedtuple('AlignedSession', ['time', 'data', 'channels', 'start_unix'])
+
+
+def block_mean(times, values, t0, rate_hz, n_bins):
+    """
+    Averages samples into 1/rate_hz wide bins starting at t0 with one
+    bincount per channel; empty bins are NaN. values is (n,) or (n, channels).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    bins = np.floor((times - t0) * rate_hz).astype(np.int64)
+    keep = (bins >= 0) & (bins < n_bins)
+    bins, values = bins[keep], values[keep]
+    counts = np.bincount(bins, minlength=n_bins).astype(np.float64)
+    out = np.empty((n_bins, values.shape[1]), dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for j in range(values.shape[1]):
+            out[:, j] = np.bincount(bins, weights=values[:, j], minlength=n_bins) / counts
+    return out
+
+
+def asof(times, values, grid, tolerance):
+    """
+    Last sample at or before every grid time (like pandas merge_asof), NaN
+    when it is older than tolerance seconds. values is (n,) or (n, channels).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    idx = np.searchsorted(times, grid, side='right') - 1
+    valid = idx >= 0
+    valid[valid] &= (grid[valid] - times[idx[valid]]) <= tolerance
+    out = np.full((len(grid), values.shape[1]), np.nan)
+    out[valid] = values[idx[valid]]
+    return out
+
+
+def _align_stream(times, values, grid, t0, rate_hz, tolerance):
+    # Streams sampled well above the output rate are block-averaged, the rest are joined as-of.
+    if len(times) > 1 and np.median(np.diff(times)) < 0.5 / rate_hz:
+        return block_mean(times, values, t0, rate_hz, len(grid))
+    return asof(times, values, grid, tolerance)
+
+
+def align_session(folder, streams=DEFAULT_STREAMS, rate_hz=1.0, gsr=None, gsr_start_unix=None,
+                  tolerance=None, max_gap_s=MAX_GAP_S):
+    """
+    Puts the Cosinuss streams of a volunteer folder (and optionally the GSR
+    logger) on one clock sampled at rate_hz.
+
+    Cosinuss times are offsets from the preamble's date_time_start_unix. gsr is
+    a (time, values) pair in the logger's own seconds; gsr_start_unix is the
+    unix time of the logger's t=0 and defaults to the Cosinuss session start.
+    Cosinuss channels are NaN in bins overlapping a BLE gap of max_gap_s
+    seconds or more (None keeps whatever the streams hold there).
+    Returns an AlignedSession whose data is a float32 (n, channels) array.
+    """
+    tolerance = tolerance if tolerance is not None else 2.0 / rate_hz
+    files = find_session_files(folder)
+    loaded = []
+    start_unix = None
+    for stream in streams:
+        if stream not in files:
+            continue
+        metadata, columns = load_stream(files[stream])
+        start_unix = metadata.date_time_start_unix if start_unix is None else start_unix
+        if len(columns['time']):
+            loaded.append((stream, metadata.date_time_start_unix, columns))
+    if start_unix is None:
+        raise FileNotFoundError(f"None of the requested streams were found in {folder}")
+
+    # Session-relative seconds of every stream; sessions can differ in start time per file.
+    sources = []
+    for stream, stream_start, columns in loaded:
+        names = [name for name in columns if name != 'time']
+        times = columns['time'] + (stream_start - start_unix)
+        values = np.column_stack([columns[name] for name in names])
+        sources.append((names, times, values))
+    if gsr is not None:
+        gsr_times, gsr_values = gsr
+        offset = (gsr_start_unix - start_unix) if gsr_start_unix is not None else 0.0
+        sources.append((['gsr'], np.asarray(gsr_times, dtype=np.float64) + offset, gsr_values))
+    if not sources:
+        raise ValueError(f"All requested streams are empty in {folder}")
+
+    t_end = max(times[-1] for _, times, _ in sources)
+    n_bins = int(np.floor(t_end * rate_hz)) + 1
+    grid = np.arange(n_bins) / rate_hz
+
+    channels = []
+    blocks = []
+    for names, times, values in sources:
+        channels.extend(names)
+        blocks.append(_align_stream(times, values, grid, 0.0, rate_hz, tolerance))
+    data = np.hstack(blocks).astype(np.float32)
+    if max_gap_s is not None:
+        n_cosinuss = sum(len(names) for names, _, _ in sources) - (gsr is not None)
+        data[gap_mask(session_gaps(folder).gaps, grid, rate_hz, max_gap_s), :n_cosinuss] = np.nan
+    return AlignedSession(grid + start_unix, data, channels, start_unix)
+
+
+def to_frame(session):
+    """The aligned session as a DataFrame indexed by seconds from the session start."""
+    return pd.DataFrame(session.data, columns=session.channels,
+                        index=pd.Index(session.time - session.start_unix, name='time'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Align every Cosinuss stream of a session on one clock.')
+    parser.add_argument('folder')
+    parser.add_argument('--rate', type=float, default=1.0, help='output rate in Hz')
+    parser.add_argument('--gsr', help='GSR logger CSV with Time and Resistance (Ohms) columns')
+    parser.add_argument('--gsr-start-unix', type=float, default=None)
+    parser.add_argument('--max-gap', type=float, default=MAX_GAP_S,
+                        help='BLE gaps at least this long (seconds) are left NaN')
+    parser.add_argument('--output', default='aligned_session.npz')
+    args = parser.parse_args(argv)
+
+    gsr = None
+    if args.gsr:
+        gsr_df = pd.read_csv(args.gsr)
+        gsr_times = gsr_df['Time'].to_numpy(dtype=np.float64)
+        gsr = (gsr_times - gsr_times[0], gsr_df['Resistance (Ohms)'].to_numpy())
+    session = align_session(args.folder, rate_hz=args.rate, gsr=gsr, gsr_start_unix=args.gsr_start_unix,
+                            max_gap_s=args.max_gap)
+    np.savez(args.output, time=session.time, data=session.data, channels=np.asarray(session.channels))
+    print(f"Aligned {len(session.channels)} channels x {len(session.time)} samples to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+DONE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(DONE_DIR, 'gsr_stress_model.pkl')
+TFLITE_MODEL_PATH = os.path.join(DONE_DIR, '..', 'model.tflite')
+
+# The decision tree was trained on this single column (see train_model.py).
+FEATURE_COLUMNS = ['Resistance (Ohms)']
+
+# Thresholds applied to the TFLite model output (see ../main.py).
+THRESHOLD_LOW = 0.4
+THRESHOLD_HIGH = 0.6
+TFLITE_LABELS = np.array(['Relaxed', 'Uncertain / Intermediate', 'Under Stress'])
+
+
+def classify_scores(scores, threshold_low=THRESHOLD_LOW, threshold_high=THRESHOLD_HIGH):
+    """Maps TFLite stress scores to Relaxed / Uncertain / Under Stress labels."""
+    scores = np.asarray(scores)
+    codes = np.ones(scores.shape, dtype=np.int8)
+    codes[scores < threshold_low] = 0
+    codes[scores > threshold_high] = 2
+    return TFLITE_LABELS[codes]
+
+
+def sliding_windows(values, window):
+    """(n - window + 1, window) read-only view of every window over a 1-D signal."""
+    return np.lib.stride_tricks.sliding_window_view(np.asarray(values, dtype=np.float32), window)
+
+
+class TreeBatchPredictor:
+    """Runs gsr_stress_model.pkl on whole arrays of GSR values at once."""
+
+    def __init__(self, model=None, model_path=MODEL_PATH):
+        if model is None:
+            import joblib
+            model = joblib.load(model_path)
+        self.model = model
+
+    @property
+    def classes(self):
+        return self.model.classes_
+
+    def predict(self, gsr_values):
+        """Returns (labels, probabilities) with one row per input value."""
+        values = np.asarray(gsr_values, dtype=np.float64).reshape(-1)
+        # One frame per batch keeps the feature names the model was fitted with.
+        X = pd.DataFrame({FEATURE_COLUMNS[0]: values})
+        probabilities = self.model.predict_proba(X)
+        labels = self.model.classes_[probabilities.argmax(axis=1)]
+        return labels, probabilities
+
+
+def make_interpreter(model_path=TFLITE_MODEL_PATH):
+    # The lightest installed runtime that can allocate the model; full TensorFlow is the last resort.
+    from fast_predict import load_tflite_interpreter
+    return load_tflite_interpreter(model_path)
+
+
+class TFLiteBatchScorer:
+    """
+    Runs model.tflite on many GSR windows per invoke(). The input tensor is
+    resized once to batch_size and reused; the last partial batch is padded.
+    """
+
+    def __init__(self, model_path=TFLITE_MODEL_PATH, batch_size=256, interpreter=None):
+        self.interpreter = interpreter if interpreter is not None else make_interpreter(model_path)
+        input_details = self.interpreter.get_input_details()[0]
+        self.input_index = input_details['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.input_shape = tuple(int(d) for d in input_details['shape'])
+        self.window = self.input_shape[1]
+        self.batch_size = batch_size
+
+        self.interpreter.resize_tensor_input(self.input_index, [batch_size] + list(self.input_shape[1:]))
+        self.interpreter.allocate_tensors()
+        self._batch = np.zeros((batch_size,) + self.input_shape[1:], dtype=np.float32)
+
+    def score(self, windows):
+        """Stress scores (float32, one per window) for an (n, window) array."""
+        windows = np.asarray(windows, dtype=np.float32).reshape(-1, self.window)
+        scores = np.empty(len(windows), dtype=np.float32)
+        batch = self._batch.reshape(self.batch_size, self.window)
+        for start in range(0, len(windows), self.batch_size):
+            chunk = windows[start:start + self.batch_size]
+            batch[:len(chunk)] = chunk
+            batch[len(chunk):] = 0
+            self.interpreter.set_tensor(self.input_index, self._batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_index)
+            scores[start:start + len(chunk)] = output[:len(chunk), 0]
+        return scores
+
+    def predict(self, windows):
+        """Returns (labels, scores) for an (n, window) array of GSR windows."""
+        scores = self.score(windows)
+        return classify_scores(scores), scores
+
+    def predict_signal(self, gsr_values):
+        """Scores every full window of a 1-D GSR signal; row i ends at sample i + window - 1."""
+        return self.predict(sliding_windows(gsr_values, self.window))
@@ -0,0 +1,168 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import importlib.util
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from manifest import load_manifest
+from instrumentation import PROFILER, enable, step
+
+DONE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Every processing script the batch runner knows about: the folder it runs in
+# (relative to done/), the script file, its entry point, and the file pattern
+# whose matches identify one volunteer session each.
+SCRIPTS = {
+    'gsr': {
+        'folder': '.',
+        'script': 'main.py',
+        'function': 'process_gsr_data',
+        'pattern': r'^GSR_Data-(\d+)\.csv$',
+    },
+    'gsr_hr': {
+        'folder': 'presentation volunteers',
+        'script': 'main.py',
+        'function': 'process_volunteer_data',
+        'pattern': r'^GSR-(\d+)\.csv$',
+    },
+    'hrv': {
+        'folder': os.path.join('exams_volunteers_ seummer__2025', 'exams - volunteers summer_pelin_only'),
+        'script': 'hrv_analysis.py',
+        'function': 'analyze_hrv',
+        'pattern': r'^v(\d+)- p$',
+    },
+}
+
+_loaded_scripts = {}
+
+
+def discover_sessions(root=DONE_DIR, kinds=None):
+    """Returns a sorted list of (kind, volunteer_id) for every session found under root."""
+    sessions = []
+    for kind, spec in SCRIPTS.items():
+        if kinds is not None and kind not in kinds:
+            continue
+        folder = os.path.join(root, spec['folder'])
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            match = re.match(spec['pattern'], name)
+            if match:
+                sessions.append((kind, int(match.group(1))))
+    return sorted(sessions)
+
+
+def _load_script(kind, root):
+    # Both processing scripts are called main.py, so they are loaded under distinct module names.
+    if kind not in _loaded_scripts:
+        spec = SCRIPTS[kind]
+        script_path = os.path.join(root, spec['folder'], spec['script'])
+        module_spec = importlib.util.spec_from_file_location(f'batch_{kind}', script_path)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        _loaded_scripts[kind] = module
+    return _loaded_scripts[kind]
+
+
+def _init_worker(profile=False):
+    import matplotlib
+    matplotlib.use('Agg')
+    enable(profile)
+
+
+def run_session(kind, volunteer_id, root=DONE_DIR):
+    """
+    Processes one session headless and returns a result record; never raises.
+    While profiling, the record carries the session's step timings under
+    'profile', since pool workers exit without running the atexit export.
+    """
+    spec = SCRIPTS[kind]
+    result = {'kind': kind, 'volunteer_id': volunteer_id, 'status': 'ok', 'output': None, 'error': None}
+    PROFILER.reset()
+    start = time.perf_counter()
+    try:
+        module = _load_script(kind, root)
+        # The scripts use paths relative to their own folder. Each worker runs one session at a time.
+        os.chdir(os.path.join(root, spec['folder']))
+        function = getattr(module, spec['function'])
+        with step(f'{kind}:{volunteer_id}'):
+            if kind == 'hrv':
+                output = function(volunteer_id, '', base_dir='.', show=False)
+            else:
+                output = function(volunteer_id, show=False)
+        if output is None:
+            result['status'] = 'skipped'
+        result['output'] = output
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f'{type(e).__name__}: {e}'
+        result['traceback'] = traceback.format_exc()
+    result['elapsed'] = time.perf_counter() - start
+    if PROFILER.enabled:
+        result['profile'] = {'records': PROFILER.records, 'origin': PROFILER.origin, 'pid': os.getpid()}
+        PROFILER.reset()
+    return result
+
+
+def run_batch(sessions, workers=None, root=DONE_DIR):
+    """
+    Runs every (kind, volunteer_id) session across a process pool and returns
+    the summary. Worker step timings are merged into this process's profiler,
+    which exports them at exit (see instrumentation.PROFILE_ENV).
+    """
+    start = time.perf_counter()
+    results = []
+    # Index the tree once here; workers then only read manifest.json instead of each scanning it.
+    load_manifest(os.path.join(root, 'manifest.json'), root, refresh=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(PROFILER.enabled,)) as pool:
+        futures = [pool.submit(run_session, kind, vid, root) for kind, vid in sessions]
+        for future in as_completed(futures):
+            result = future.result()
+            profile = result.pop('profile', None)
+            if profile is not None:
+                PROFILER.merge(**profile)
+            print(f"[{result['status']:>7}] {result['kind']} volunteer {result['volunteer_id']} "
+                  f"({result['elapsed']:.2f}s)")
+            results.append(result)
+
+    results.sort(key=lambda r: (r['kind'], r['volunteer_id']))
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return {
+        'sessions': len(results),
+        'counts': counts,
+        'wall_time': time.perf_counter() - start,
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Process every volunteer session under done/ in parallel.')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--kind', action='append', choices=sorted(SCRIPTS),
+                        help='only run this kind of session (repeatable)')
+    parser.add_argument('--summary', default='batch_summary.json', help='where to write the JSON summary')
+    args = parser.parse_args(argv)
+
+    sessions = discover_sessions(kinds=args.kind)
+    print(f"Found {len(sessions)} sessions.")
+    summary = run_batch(sessions, workers=args.workers)
+
+    with open(args.summary, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\nProcessed {summary['sessions']} sessions in {summary['wall_time']:.2f}s: {summary['counts']}")
+    for result in summary['results']:
+        if result['status'] == 'failed':
+            print(f"  {result['kind']} volunteer {result['volunteer_id']}: {result['error']}")
+    print(f"Summary saved to '{args.summary}'.")
+    return 1 if summary['counts'].get('failed') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,333 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import tracemalloc
+import importlib.util
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+
+DONE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(DONE_DIR, 'benchmark_baseline.json')
+
+from cosinuss_reader import find_session_files, load_stream
+from stage_protocol import DEFAULT_STAGES, StageProtocol
+
+PREAMBLE = """df_hash,BENCH.{tag}
+device,BENCH
+project_hash,BENCH
+project_name,benchmark
+person_hash,BENCH.{tag}
+person_label,{label}
+date_time_start,2025-01-01_00-00-00.000000_+00
+date_time_start_unix,1735689600.0
+date_time_end,2025-01-01_00-00-00.000000_+00
+length_difference_noticed,no
+
+"""
+
+
+def parse_duration(text):
+    """'90s', '10m', '2h' or plain seconds -> seconds."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _stage_resistance(seconds, rng):
+    # Raw logger resistance: a slow drift that drops during the stress stages, plus noise.
+    t = np.arange(seconds)
+    codes = StageProtocol(DEFAULT_STAGES).stage_codes(t % sum(DEFAULT_STAGES.values()))
+    stress = np.isin(codes, [2, 3]).astype(np.float64)
+    return -40000 + 5000 * np.sin(t / 300) - 8000 * stress + rng.normal(0, 500, seconds)
+
+
+def make_gsr_session(file_path, seconds, seed=0):
+    """Writes a synthetic GSR logger CSV (GSR_Data-N.csv format) lasting `seconds`."""
+    rng = np.random.default_rng(seed)
+    start = int(rng.integers(100, 1000))
+    df = pd.DataFrame({
+        'Time': np.arange(start, start + seconds),
+        'Resistance (Ohms)': np.round(_stage_resistance(seconds, rng), 2),
+        'Stage': 'Calibration (20s)',
+    })
+    df.to_csv(file_path, index=False)
+    return len(df)
+
+
+def make_cleaned_gsr_session(file_path, seconds, seed=0):
+    """Writes a synthetic cleaned GSR CSV as produced by process_gsr_data."""
+    rng = np.random.default_rng(seed)
+    resistance = _stage_resistance(seconds, rng)
+    t = np.arange(seconds)
+    df = pd.DataFrame({
+        'Time': t,
+        'Resistance (Ohms)': (resistance - resistance.min()) / (resistance.max() - resistance.min()),
+        'Stage': StageProtocol(DEFAULT_STAGES).stage_categorical(t),
+    })
+    df.to_csv(file_path, index=False)
+    return len(df)
+
+
+def _write_stream(folder, prefix, stream, preamble, columns, float_format):
+    file_path = os.path.join(folder, f'{prefix}_{stream}.csv')
+    with open(file_path, 'w') as f:
+        f.write(preamble)
+        pd.DataFrame(columns).to_csv(f, index=False, float_format=float_format)
+    return file_path
+
+
+def make_cosinuss_session(folder, seconds, ppg_rate_hz=200, seed=0, label='BENCH'):
+    """
+    Writes synthetic Cosinuss heart_rate, rr_int and ppg streams lasting
+    `seconds` into folder. Returns {stream: file path}.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok=True)
+    prefix = 'BENCH.0000_2025-01-01_00-00-00'
+    preamble = PREAMBLE.format(tag=f'{seed:04d}', label=label)
+
+    rr = np.clip(rng.normal(800, 50, int(seconds / 0.8) + 2), 400, 1500)
+    beats = 5 + np.cumsum(rr) / 1000
+    keep = beats < seconds
+    beats, rr = beats[keep], rr[keep]
+    hr_times = np.arange(5, seconds, 1.0) + rng.uniform(-0.1, 0.1, max(0, seconds - 5))
+    hr = np.interp(hr_times, beats, 60000 / rr).round()
+
+    ppg_times = 5 + np.arange(int((seconds - 5) * ppg_rate_hz)) / ppg_rate_hz
+    phase = 2 * np.pi * np.interp(ppg_times, beats, np.arange(len(beats)))
+    ppg_ir = (145000 + 400 * np.sin(phase) + rng.normal(0, 20, len(ppg_times))).astype(np.int64)
+
+    return {
+        'heart_rate': _write_stream(folder, prefix, 'heart_rate', preamble,
+                                    {'time': hr_times, 'heart_rate': hr.astype(np.int64)}, '%.3f'),
+        'rr_int': _write_stream(folder, prefix, 'rr_int', preamble,
+                                {'time': beats, 'rr_int': rr.round().astype(np.int64)}, '%.3f'),
+        'ppg_ir_ppg_ambient_ppg_red': _write_stream(
+            folder, prefix, 'ppg_ir_ppg_ambient_ppg_red', preamble,
+            {'time': ppg_times, 'ppg_ir': ppg_ir, 'ppg_ambient': np.full(len(ppg_times), 300),
+             'ppg_red': ppg_ir + 30000}, '%.3f'),
+    }
+
+
+def measure(fn, rows, repeat=3):
+    """
+    Times fn() `repeat` times, then runs it once more under tracemalloc for
+    the peak memory so tracing does not distort the timings.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return _summarize(latencies, rows, peak)
+
+
+def _summarize(latencies, rows, peak_bytes):
+    latencies = np.asarray(latencies)
+    median = float(np.median(latencies))
+    return {
+        'median_s': median,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'rows': int(rows),
+        'rows_per_s': float(rows / median) if median > 0 else float('inf'),
+        'peak_mb': peak_bytes / 1e6,
+    }
+
+
+def _load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_case(seconds, workdir, repeat=3, predict_calls=200):
+    """Benchmarks every pipeline stage on one synthetic session of `seconds` length."""
+    results = {}
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        gsr_main = _load_module('bench_gsr_main', os.path.join(DONE_DIR, 'main.py'))
+        prepare = _load_module('bench_prepare', os.path.join(DONE_DIR, 'gsr_data_graphs', 'prepare_data.py'))
+        train = _load_module('bench_train', os.path.join(DONE_DIR, 'train_model.py'))
+
+        # Load: parse the largest Cosinuss stream.
+        files = make_cosinuss_session('cosinuss', seconds)
+        ppg_file = files['ppg_ir_ppg_ambient_ppg_red']
+        _, columns = load_stream(ppg_file)
+        results['load'] = measure(lambda: load_stream(ppg_file), len(columns['time']), repeat)
+
+        # Clean: resample and normalize the raw GSR logger file.
+        rows = make_gsr_session('GSR_Data-1.csv', seconds)
+        results['clean'] = measure(lambda: gsr_main.clean_gsr_data('GSR_Data-1.csv', DEFAULT_STAGES), rows, repeat)
+
+        # Process: the full process_gsr_data path (clean, cache, CSV, plot) with a cold store every run.
+        def process_cold():
+            shutil.rmtree('.session_store', ignore_errors=True)
+            gsr_main.process_gsr_data(1, show=False)
+        results['process'] = measure(_quiet(process_cold), rows, repeat)
+
+        # Label: stage assignment plus building the combined labeled dataset.
+        os.makedirs('gsr_data_graphs', exist_ok=True)
+        for i in range(3):
+            make_cleaned_gsr_session(os.path.join('gsr_data_graphs', f'GSR_Data-{i + 1}_cleaned.csv'), seconds, seed=i)
+        protocol = StageProtocol(DEFAULT_STAGES)
+        times = np.arange(seconds, dtype=np.float64)
+        results['stage_label'] = measure(lambda: protocol.stage_categorical(times), seconds, repeat)
+        results['prepare'] = measure(_quiet(prepare.prepare_and_label_dataset), 3 * seconds, repeat)
+
+        # Train on the combined dataset (writes gsr_stress_model.pkl into workdir).
+        results['train'] = measure(_quiet(train.build_and_train_model), 3 * seconds, repeat)
+
+        # Predict: per-value latency of predict_stress_level and one batched call.
+        predict = _load_module('bench_predict', os.path.join(DONE_DIR, 'predict.py'))
+        values = np.random.default_rng(0).uniform(0, 1, predict_calls)
+        latencies = []
+        for value in values:
+            start = time.perf_counter()
+            predict.predict_stress_level(value)
+            latencies.append(time.perf_counter() - start)
+        results['predict_single'] = _summarize(latencies, 1, 0)
+        batch_values = np.random.default_rng(1).uniform(0, 1, seconds)
+        results['predict_batch'] = measure(lambda: predict.predict_stress_levels(batch_values), seconds, repeat)
+
+        results['tflite'] = _benchmark_tflite(seconds, repeat)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def run_real_case(folder, gsr_file=None, repeat=3):
+    """Benchmarks loading every stream of a recorded Cosinuss folder and cleaning its GSR file."""
+    results = {}
+    for stream, file_path in sorted(find_session_files(folder).items()):
+        _, columns = load_stream(file_path)
+        results[f'load_{stream}'] = measure(lambda: load_stream(file_path), len(columns['time']), repeat)
+    if gsr_file is not None:
+        gsr_main = _load_module('bench_gsr_main', os.path.join(DONE_DIR, 'main.py'))
+        rows = len(pd.read_csv(gsr_file))
+        results['clean'] = measure(lambda: gsr_main.clean_gsr_data(gsr_file, DEFAULT_STAGES), rows, repeat)
+    return results
+
+
+def _quiet(fn):
+    def run():
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            return fn()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return run
+
+
+def _benchmark_tflite(seconds, repeat):
+    try:
+        from batch_predict import TFLiteBatchScorer
+        scorer = TFLiteBatchScorer(batch_size=1)
+    except Exception as e:
+        return {'skipped': f'{type(e).__name__}: {e}'}
+    window = np.random.default_rng(0).uniform(0, 1, (1, scorer.window)).astype(np.float32)
+    latencies = []
+    for _ in range(max(repeat, 100)):
+        start = time.perf_counter()
+        scorer.score(window)
+        latencies.append(time.perf_counter() - start)
+    return _summarize(latencies, 1, 0)
+
+
+def compare(results, baseline, threshold=1.5):
+    """Returns [(case, stage, ratio)] for every stage whose median got more than threshold times slower."""
+    regressions = []
+    for case, stages in results.items():
+        for stage, metrics in stages.items():
+            old = baseline.get(case, {}).get(stage)
+            if not old or 'median_s' not in old or 'median_s' not in metrics or old['median_s'] <= 0:
+                continue
+            ratio = metrics['median_s'] / old['median_s']
+            if ratio > threshold:
+                regressions.append((case, stage, ratio))
+    return regressions
+
+
+def print_results(results):
+    print(f"{'case':>8} {'stage':>24} {'median':>10} {'p95':>10} {'rows/s':>12} {'peak MB':>9}")
+    for case, stages in results.items():
+        for stage, m in stages.items():
+            if 'skipped' in m:
+                print(f"{case:>8} {stage:>24}   skipped ({m['skipped'][:60]})")
+                continue
+            print(f"{case:>8} {stage:>24} {m['median_s'] * 1000:>8.2f}ms {m['p95_ms']:>8.2f}ms "
+                  f"{m['rows_per_s']:>12.0f} {m['peak_mb']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark load/clean/label/train/predict on synthetic sessions.')
+    parser.add_argument('--durations', default='10m,1h', help='comma separated session lengths, e.g. 10m,1h,24h')
+    parser.add_argument('--real', nargs='+', default=[], metavar='FOLDER[:GSR_FILE]',
+                        help='also benchmark recorded Cosinuss folders, optionally with their GSR logger file')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=1.5, help='slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for duration in args.durations.split(','):
+        workdir = tempfile.mkdtemp(prefix='gsr-bench-')
+        try:
+            print(f"Benchmarking a {duration} session...")
+            results[duration] = run_case(parse_duration(duration), workdir, repeat=args.repeat)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    for spec in args.real:
+        folder, _, gsr_file = spec.partition(':')
+        print(f"Benchmarking recorded session {folder}...")
+        results[os.path.basename(os.path.normpath(folder))] = run_real_case(folder, gsr_file or None, args.repeat)
+
+    print_results(results)
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to '{args.baseline}'.")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # Without a baseline nothing can be flagged; a silent pass would hide every regression.
+        print(f"Error: no baseline at '{args.baseline}'; run once with --save-baseline on this machine first.",
+              file=sys.stderr)
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    for case, stage, ratio in regressions:
+        print(f"REGRESSION {case} {stage}: {ratio:.2f}x slower than baseline")
+    if regressions:
+        return 1
+    print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import argparse
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from cosinuss_reader import STREAM_COLUMNS, find_session_files, load_stream
+
+# The BLE bookkeeping streams of a Cosinuss export: one for the optical packets
+# (PPG, and everything the earpiece derives from it), one for the accelerometer.
+BLE_STREAMS = {
+    'ppg': 'ble_sample_counter_ble_sample_amount_ble_packet_counter',
+    'acc': 'ble_sample_counter_acc_ble_sample_amount_acc_ble_packet_counter_acc',
+}
+
+# Packets further apart than GAP_FACTOR times the median packet interval are a
+# gap even when no counter skipped (the link stalled).
+GAP_FACTOR = 4.0
+
+# Gaps at least this long (seconds) are treated as missing data by resampling
+# and the quality mask; shorter ones are left to interpolation.
+MAX_GAP_S = 1.0
+
+GAP_COLUMNS = ['stream', 'start', 'end', 'duration', 'lost_packets', 'lost_samples', 'kind']
+
+# gaps: DataFrame with GAP_COLUMNS (session-relative seconds), stats: {stream: loss statistics}.
+GapReport = namedtuple('GapReport', ['gaps', 'stats'])
+
+
+def detect_gaps(times, sample_counter, sample_amount, packet_counter, gap_factor=GAP_FACTOR):
+    """
+    Gaps between consecutive BLE packets, from one diff of each counter.
+
+    ble_packet_counter counts packets and ble_sample_counter counts samples up
+    to the end of each packet, so a packet counter step above 1 means lost
+    packets and a sample counter step above the packet's ble_sample_amount
+    means lost samples. A step backwards is a reconnect (the earpiece restarts
+    both counters). Returns (DataFrame without the 'stream' column, samples per
+    second of the stream).
+    """
+    t = np.asarray(times, dtype=np.float64)
+    sc = np.asarray(sample_counter, dtype=np.int64)
+    amount = np.asarray(sample_amount, dtype=np.int64)
+    pc = np.asarray(packet_counter, dtype=np.int64)
+    if len(t) < 2:
+        return pd.DataFrame(columns=GAP_COLUMNS[1:]), np.nan
+
+    dt = np.diff(t)
+    dp = np.diff(pc)
+    ds = np.diff(sc)
+    reset = dp < 1
+    linked = ~reset
+    rate = ds[linked].sum() / dt[linked].sum() if dt[linked].sum() > 0 else np.nan
+
+    lost_packets = np.where(reset, 0, dp - 1)
+    lost_samples = np.where(reset, 0, np.maximum(ds - amount[1:], 0))
+    stall = dt > gap_factor * np.median(dt)
+    idx = np.flatnonzero(reset | (lost_packets > 0) | (lost_samples > 0) | stall)
+
+    # Data stops with the last received packet and resumes with the first sample of the next one;
+    # arrival times jitter, so a loss lasts at least as long as its lost samples.
+    start = t[idx]
+    end = np.maximum(t[idx + 1] - amount[idx + 1] / rate, start + lost_samples[idx] / rate)
+    # After a reconnect the counters say nothing about what was lost; estimate it from the time.
+    lost_samples[idx[reset[idx]]] = np.round((end - start)[reset[idx]] * rate).astype(np.int64)
+    kind = np.where(reset[idx], 'reconnect',
+                    np.where((lost_packets[idx] > 0) | (lost_samples[idx] > 0), 'loss', 'stall'))
+    gaps = pd.DataFrame({'start': start, 'end': end, 'duration': end - start,
+                         'lost_packets': lost_packets[idx], 'lost_samples': lost_samples[idx], 'kind': kind})
+    return gaps, rate
+
+
+def loss_stats(gaps, n_packets, n_samples, rate):
+    """Packet and sample loss of one stream from its gap table and received counts."""
+    lost_packets = int(gaps['lost_packets'].sum())
+    lost_samples = int(gaps['lost_samples'].sum())
+    return {
+        'packets_received': int(n_packets),
+        'packets_lost': lost_packets,
+        'packet_loss_pct': 100.0 * lost_packets / max(1, n_packets + lost_packets),
+        'samples_lost': lost_samples,
+        'sample_loss_pct': 100.0 * lost_samples / max(1, n_samples + lost_samples),
+        'reconnects': int((gaps['kind'] == 'reconnect').sum()),
+        'missing_s': float(gaps['duration'].sum()),
+        'longest_gap_s': float(gaps['duration'].max()) if len(gaps) else 0.0,
+        'rate_hz': float(rate),
+    }
+
+
+def session_gaps(folder, gap_factor=GAP_FACTOR):
+    """Gap table and per-stream loss statistics of a Cosinuss session folder."""
+    files = find_session_files(folder)
+    tables = []
+    stats = {}
+    for name, stream in BLE_STREAMS.items():
+        if stream not in files:
+            continue
+        _, columns = load_stream(files[stream])
+        counter, amount, packet = (columns[column] for column, _ in STREAM_COLUMNS[stream])
+        gaps, rate = detect_gaps(columns['time'], counter, amount, packet, gap_factor)
+        gaps.insert(0, 'stream', name)
+        tables.append(gaps)
+        stats[name] = loss_stats(gaps, len(packet), int(amount.sum()), rate)
+    gaps = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=GAP_COLUMNS)
+    return GapReport(gaps.sort_values('start', ignore_index=True), stats)
+
+
+def gap_mask(gaps, grid, rate_hz, min_duration=MAX_GAP_S):
+    """
+    True for every 1/rate_hz bin of grid that overlaps a gap lasting at least
+    min_duration seconds; one difference array over all gaps.
+    """
+    long_gaps = gaps[gaps['duration'] >= min_duration]
+    n_bins = len(grid)
+    if n_bins == 0 or len(long_gaps) == 0:
+        return np.zeros(n_bins, dtype=bool)
+    t0 = grid[0]
+    first = np.floor((long_gaps['start'].to_numpy() - t0) * rate_hz).astype(np.int64)
+    last = np.ceil((long_gaps['end'].to_numpy() - t0) * rate_hz).astype(np.int64)
+    first, last = np.clip(first, 0, n_bins), np.clip(last, 0, n_bins)
+    edges = np.bincount(first, minlength=n_bins + 1) - np.bincount(last, minlength=n_bins + 1)
+    return np.cumsum(edges[:n_bins]) > 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Find dropped BLE packets in Cosinuss sessions.')
+    parser.add_argument('folders', nargs='+')
+    parser.add_argument('--gap-factor', type=float, default=GAP_FACTOR)
+    parser.add_argument('--output', default=None, help='CSV of every gap of every session')
+    args = parser.parse_args(argv)
+
+    tables = []
+    for folder in args.folders:
+        report = session_gaps(folder, args.gap_factor)
+        session = os.path.basename(os.path.normpath(folder))
+        for stream, s in report.stats.items():
+            print(f"{session} {stream:>3}: {s['packets_lost']}/{s['packets_received'] + s['packets_lost']} packets "
+                  f"({s['packet_loss_pct']:.2f}%), {s['samples_lost']} samples lost, {s['reconnects']} reconnects, "
+                  f"longest gap {s['longest_gap_s']:.2f}s")
+        tables.append(report.gaps.assign(session=session))
+    if args.output:
+        pd.concat(tables, ignore_index=True).to_csv(args.output, index=False, float_format='%.3f')
+        print(f"Saved to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
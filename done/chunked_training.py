@@ -0,0 +1,230 @@
+import os
+import re
+import glob
+import time
+import argparse
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+
+from feature_engine import FEATURE_NAMES, extract_volunteer_features, feature_cache_args, volunteer_sessions
+from main import CLEANING_VERSION, clean_gsr_data, cleaning_params
+from quality import MIN_VALID_FRACTION
+from session_store import SessionStore, cache_key
+from stage_protocol import DEFAULT_STAGES, STAGE_LABELS, stage_label_codes
+
+FEATURE_COLUMNS = ['Resistance (Ohms)']
+# Share of a feature window's seconds that passed the quality mask (see feature_engine.py).
+VALID_COLUMN = 'Valid Fraction'
+CLASSES = np.arange(len(STAGE_LABELS))
+INCREMENTAL_MODEL_PATH = 'gsr_stress_model_incremental.pkl'
+
+# Estimators with partial_fit, by name.
+MODELS = {
+    'sgd': (SGDClassifier, {'loss': 'log_loss', 'alpha': 1e-4, 'random_state': 42}),
+    'nb': (GaussianNB, {}),
+}
+
+
+def volunteer_of(file_path):
+    """Volunteer number in a file name such as GSR_Data-7.csv or GSR_Data-7_cleaned.csv."""
+    match = re.search(r'-(\d+)(?:_cleaned)?\.csv$', os.path.basename(file_path))
+    return int(match.group(1)) if match else None
+
+
+def store_sources(raw_files, stages=DEFAULT_STAGES, store=None):
+    """
+    Session store keys of the cleaned frames of raw GSR logger files, cleaning
+    (and caching) any file the store does not hold yet. Returns [(volunteer, key)].
+    """
+    store = store or SessionStore()
+    params = cleaning_params(stages)
+    sources = []
+    for raw_file in raw_files:
+        key = cache_key(raw_file, params, CLEANING_VERSION)
+        if not os.path.exists(store.path(key)):
+            df, _ = store.cached_frame(raw_file, params, lambda: clean_gsr_data(raw_file, stages),
+                                      CLEANING_VERSION)
+            del df
+        sources.append((volunteer_of(raw_file), key))
+    return sources
+
+
+def window_sources(base_dir, store=None):
+    """
+    Session store keys of the feature_engine windows (GSR with HR/RR/PPG) of
+    every volunteer under base_dir, computing any the store does not hold yet.
+    Returns [(volunteer, key)].
+    """
+    store = store or SessionStore()
+    sources = []
+    for volunteer_id, gsr_file, cosinuss_folder in volunteer_sessions(base_dir):
+        key = cache_key(*feature_cache_args(gsr_file, cosinuss_folder))
+        if not os.path.exists(store.path(key)):
+            extract_volunteer_features(gsr_file, cosinuss_folder, store=store)
+        sources.append((volunteer_id, key))
+    return sources
+
+
+def read_source(source, chunk_rows, store, columns=FEATURE_COLUMNS):
+    """DataFrame chunks of one source: a cleaned CSV path or a session store key."""
+    wanted = list(columns) + ['Stage']
+    if source.endswith('.csv'):
+        return pd.read_csv(source, usecols=wanted, dtype={'Stage': 'category'}, chunksize=chunk_rows)
+    if VALID_COLUMN in store.columns(source):
+        wanted.append(VALID_COLUMN)
+    return store.iter_chunks(source, chunk_rows, wanted)
+
+
+def labeled_chunks(frames, columns=FEATURE_COLUMNS):
+    """
+    (X, y) arrays of every chunk, without rows whose stage has no training
+    label, rows missing a feature, and feature windows mostly recorded during
+    motion or poor ear fit.
+    """
+    for frame in frames:
+        codes = stage_label_codes(frame['Stage'])
+        X = frame[columns].to_numpy(dtype=np.float32)
+        keep = (codes >= 0) & ~np.isnan(X).any(axis=1)
+        if VALID_COLUMN in frame.columns:
+            keep &= frame[VALID_COLUMN].to_numpy() >= MIN_VALID_FRACTION
+        yield X[keep], codes[keep]
+
+
+def iter_batches(sources, batch_rows=4096, store=None, interleave=8, seed=0, columns=FEATURE_COLUMNS):
+    """
+    Yields shuffled (X, y) batches of batch_rows rows. Sources are read in
+    groups of `interleave` at a time, one chunk from each in turn, so a batch
+    mixes volunteers and stages instead of following one recording in
+    order. At most interleave chunks plus one batch are held in memory.
+    """
+    store = store or SessionStore()
+    rng = np.random.default_rng(seed)
+    chunk_rows = max(1, batch_rows // interleave)
+    pending_X, pending_y, pending_rows = [], [], 0
+    for first in range(0, len(sources), interleave):
+        readers = [labeled_chunks(read_source(s, chunk_rows, store, columns), columns)
+                   for s in sources[first:first + interleave]]
+        # Rows left over from one group are carried into the next; only the very last batch is short.
+        last_group = first + interleave >= len(sources)
+        while readers:
+            for reader in list(readers):
+                chunk = next(reader, None)
+                if chunk is None:
+                    readers.remove(reader)
+                    continue
+                pending_X.append(chunk[0])
+                pending_y.append(chunk[1])
+                pending_rows += len(chunk[1])
+            while pending_rows >= batch_rows or (not readers and last_group and pending_rows):
+                X, y = np.concatenate(pending_X), np.concatenate(pending_y)
+                order = rng.permutation(len(y))
+                X, y = X[order], y[order]
+                yield X[:batch_rows], y[:batch_rows]
+                pending_X, pending_y = [X[batch_rows:]], [y[batch_rows:]]
+                pending_rows = len(y) - min(batch_rows, len(y))
+
+
+class Rebalancer:
+    """
+    On-the-fly class rebalancing from running label counts: each row is
+    weighted by the inverse frequency of its class seen so far, so minority
+    stages count as much as the long video stage without a first pass.
+    """
+
+    def __init__(self, n_classes=len(STAGE_LABELS)):
+        self.counts = np.zeros(n_classes, dtype=np.int64)
+
+    def weights(self, y):
+        self.counts += np.bincount(y, minlength=len(self.counts))
+        seen = self.counts > 0
+        class_weight = np.zeros(len(self.counts))
+        class_weight[seen] = self.counts[seen].sum() / (seen.sum() * self.counts[seen])
+        return class_weight[y]
+
+
+def train_incremental(sources, model='sgd', epochs=3, batch_rows=4096, rebalance=True, store=None, seed=0,
+                      columns=FEATURE_COLUMNS):
+    """Fits a partial_fit estimator over every batch of the sources; returns (estimator, stats)."""
+    model_class, defaults = MODELS[model]
+    estimator = model_class(**defaults)
+    rebalancer = Rebalancer() if rebalance else None
+    stats = {'batches': 0, 'rows': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    for epoch in range(epochs):
+        for X, y in iter_batches(sources, batch_rows, store, seed=seed + epoch, columns=columns):
+            weights = rebalancer.weights(y) if rebalancer is not None else None
+            estimator.partial_fit(X, y, classes=CLASSES, sample_weight=weights)
+            stats['batches'] += 1
+            stats['rows'] += len(y)
+    stats['seconds'] = time.perf_counter() - start
+    return estimator, stats
+
+
+def evaluate(estimator, sources, batch_rows=4096, store=None, columns=FEATURE_COLUMNS):
+    """Streaming accuracy and per-class recall of estimator over the sources."""
+    correct = np.zeros(len(CLASSES), dtype=np.int64)
+    total = np.zeros(len(CLASSES), dtype=np.int64)
+    for X, y in iter_batches(sources, batch_rows, store, columns=columns):
+        hits = estimator.predict(X) == y
+        correct += np.bincount(y[hits], minlength=len(CLASSES))
+        total += np.bincount(y, minlength=len(CLASSES))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        recall = correct / total
+    return {'accuracy': float(correct.sum() / max(1, total.sum())),
+            'recall': dict(zip(STAGE_LABELS, recall.tolist())), 'rows': int(total.sum())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train a stress classifier in bounded memory with partial_fit.')
+    parser.add_argument('--raw', default='GSR_Data-*.csv', help='raw GSR logger files, streamed via the session store')
+    parser.add_argument('--cleaned', default=None, help='cleaned CSV files to stream instead, e.g. '
+                                                        '"gsr_data_graphs/GSR_Data-*_cleaned.csv"')
+    parser.add_argument('--windows', default=None, metavar='BASE_DIR',
+                        help='train on the quality-filtered feature_engine windows (GSR, HR, RR, PPG) of the '
+                             'volunteers under BASE_DIR, e.g. "presentation volunteers"')
+    parser.add_argument('--model', choices=sorted(MODELS), default='sgd')
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-rows', type=int, default=4096)
+    parser.add_argument('--no-rebalance', action='store_true')
+    parser.add_argument('--holdout', type=int, nargs='*', default=[], help='volunteer ids kept out for evaluation')
+    parser.add_argument('--output', default=INCREMENTAL_MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+    store = SessionStore()
+    columns = FEATURE_NAMES if args.windows else FEATURE_COLUMNS
+    if args.windows:
+        sources = window_sources(args.windows, store=store)
+    elif args.cleaned:
+        files = sorted(glob.glob(args.cleaned))
+        sources = [(volunteer_of(f), f) for f in files]
+    else:
+        sources = store_sources(sorted(glob.glob(args.raw)), store=store)
+    if not sources:
+        print("Error: No GSR data files found.")
+        return
+    tracemalloc.reset_peak()
+
+    train = [source for vid, source in sources if vid not in args.holdout]
+    test = [source for vid, source in sources if vid in args.holdout]
+    estimator, stats = train_incremental(train, args.model, args.epochs, args.batch_rows,
+                                         rebalance=not args.no_rebalance, store=store, columns=columns)
+    peak = tracemalloc.get_traced_memory()[1]
+    print(f"Trained {args.model} on {len(train)} sessions: {stats['rows']} rows in {stats['batches']} batches, "
+          f"{stats['seconds']:.2f}s, peak memory {peak / 1e6:.1f} MB")
+    if test:
+        result = evaluate(estimator, test, args.batch_rows, store, columns)
+        recall = ', '.join(f"{label} {value:.2f}" for label, value in result['recall'].items())
+        print(f"Held-out accuracy on volunteers {args.holdout}: {result['accuracy']:.3f} (recall: {recall})")
+
+    joblib.dump(estimator, args.output)
+    print(f"Model saved as '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import os
+import re
+import glob
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Column layout of every stream written by the Cosinuss exporter. The key is the
+# file-name suffix after '<person_hash>_<date>_<time>_', the value lists the data
+# columns (after 'time') with the dtype they are loaded as.
+STREAM_COLUMNS = {
+    'acc_dev': [('acc_dev', np.float32)],
+    'acc_mag': [('acc_mag', np.float32)],
+    'acc_x_acc_y_acc_z': [('acc_x', np.float32), ('acc_y', np.float32), ('acc_z', np.float32)],
+    'adc_range_led_cur_ir_led_cur_red': [('adc_range', np.int32), ('led_cur_ir', np.float32),
+                                         ('led_cur_red', np.float32)],
+    'battery': [('battery', np.int32)],
+    'ble_sample_counter_acc_ble_sample_amount_acc_ble_packet_counter_acc': [
+        ('ble_sample_counter_acc', np.int64), ('ble_sample_amount_acc', np.int32),
+        ('ble_packet_counter_acc', np.int64)],
+    'ble_sample_counter_ble_sample_amount_ble_packet_counter': [
+        ('ble_sample_counter', np.int64), ('ble_sample_amount', np.int32),
+        ('ble_packet_counter', np.int64)],
+    'heart_rate': [('heart_rate', np.float32)],
+    'omega': [('omega', np.float32)],
+    'perfusion_ir': [('perfusion_ir', np.float32)],
+    'ppg_ir_ppg_ambient_ppg_red': [('ppg_ir', np.int32), ('ppg_ambient', np.int32), ('ppg_red', np.int32)],
+    'ppg_med': [('ppg_med', np.int32)],
+    'ppg_quality': [('ppg_quality', np.float32)],
+    'quality': [('quality', np.float32)],
+    'quality_max': [('quality_max', np.float32)],
+    'respiration_rate': [('respiration_rate', np.float32)],
+    'rr_int': [('rr_int', np.float32)],
+    'spo2': [('spo2', np.float32)],
+    'tech_perfusion_ir': [('tech_perfusion_ir', np.float32)],
+    'temperature': [('temperature', np.float32)],
+}
+
+# Longest suffixes first so 'ppg_quality' is not mistaken for 'quality'.
+_STREAM_SUFFIXES = sorted(STREAM_COLUMNS, key=len, reverse=True)
+
+
+@dataclass(frozen=True)
+class SessionMetadata:
+    """The 'key,value' preamble at the top of every Cosinuss export."""
+    df_hash: str
+    device: str
+    project_hash: str
+    project_name: str
+    person_hash: str
+    person_label: str
+    date_time_start: str
+    date_time_start_unix: float
+    date_time_end: str
+    length_difference_noticed: bool
+    header_row: int
+
+
+def stream_type(file_path):
+    """Returns the stream name of a Cosinuss file (e.g. 'heart_rate'), or None."""
+    name = os.path.basename(file_path)
+    if not name.endswith('.csv'):
+        return None
+    stem = name[:-len('.csv')]
+    for suffix in _STREAM_SUFFIXES:
+        if stem.endswith('_' + suffix):
+            return suffix
+    return None
+
+
+def read_preamble(file_path):
+    """Parses the preamble of a Cosinuss export up to the 'time,...' header row."""
+    fields = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if line.startswith('time,'):
+                header_row = i
+                break
+            if line:
+                key, _, value = line.partition(',')
+                fields[key] = value
+        else:
+            raise ValueError(f"No 'time,...' header row found in {file_path}")
+
+    return SessionMetadata(
+        df_hash=fields.get('df_hash', ''),
+        device=fields.get('device', ''),
+        project_hash=fields.get('project_hash', ''),
+        project_name=fields.get('project_name', ''),
+        person_hash=fields.get('person_hash', ''),
+        person_label=fields.get('person_label', ''),
+        date_time_start=fields.get('date_time_start', ''),
+        date_time_start_unix=float(fields.get('date_time_start_unix') or 'nan'),
+        date_time_end=fields.get('date_time_end', ''),
+        length_difference_noticed=fields.get('length_difference_noticed', 'no') == 'yes',
+        header_row=header_row,
+    )
+
+
+def _cache_paths(file_path, cache_dir, names):
+    stat = os.stat(file_path)
+    stem = f"{os.path.basename(file_path)[:-len('.csv')]}-{stat.st_size}-{int(stat.st_mtime)}"
+    return {name: os.path.join(cache_dir, f'{stem}.{name}.npy') for name in names}
+
+
+def _read_body(file_path, header_row, columns):
+    dtypes = {'time': np.float64}
+    dtypes.update(columns)
+    names = list(dtypes)
+    try:
+        df = pd.read_csv(file_path, skiprows=header_row + 1, header=None, names=names,
+                         dtype=dtypes, engine='c')
+    except pd.errors.EmptyDataError:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in dtypes.items()}
+    return {name: df[name].to_numpy(dtype=dtype) for name, dtype in dtypes.items()}
+
+
+def load_stream(file_path, cache_dir=None):
+    """
+    Loads one Cosinuss stream as (metadata, {column: ndarray}).
+
+    Columns always include 'time' (float64 seconds since date_time_start_unix).
+    When cache_dir is given, the parsed columns are kept there as .npy files and
+    later loads memory-map them instead of parsing the CSV again.
+    """
+    stream = stream_type(file_path)
+    if stream is None:
+        raise ValueError(f"Unknown Cosinuss stream type: {file_path}")
+    columns = dict(STREAM_COLUMNS[stream])
+    metadata = read_preamble(file_path)
+
+    if cache_dir is None:
+        return metadata, _read_body(file_path, metadata.header_row, columns)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = _cache_paths(file_path, cache_dir, ['time'] + list(columns))
+    if all(os.path.exists(p) for p in paths.values()):
+        return metadata, {name: np.load(p, mmap_mode='r') for name, p in paths.items()}
+
+    data = _read_body(file_path, metadata.header_row, columns)
+    for name, p in paths.items():
+        np.save(p, data[name])
+    return metadata, data
+
+
+def find_session_files(folder):
+    """Maps stream name -> file path for every Cosinuss export in a volunteer folder."""
+    files = {}
+    for file_path in sorted(glob.glob(os.path.join(folder, '*.csv'))):
+        stream = stream_type(file_path)
+        if stream is not None:
+            files.setdefault(stream, file_path)
+    return files
+
+
+def find_cosinuss_folder(base_dir, volunteer_id):
+    """Finds folders like 'v-10', 'V12', 'V-14' or 'csv-v8' for a volunteer, whatever their case."""
+    pattern = re.compile(rf'^(?:csv-)?v-?{volunteer_id}$', re.IGNORECASE)
+    for name in sorted(os.listdir(base_dir)):
+        if pattern.match(name) and os.path.isdir(os.path.join(base_dir, name)):
+            return os.path.join(base_dir, name)
+    return None
+
+
+def load_session(folder, streams=None, cache_dir=None):
+    """
+    Loads the requested streams (all by default) of one volunteer folder.
+    Returns (metadata, {stream: {column: ndarray}}).
+    """
+    files = find_session_files(folder)
+    if streams is not None:
+        files = {s: files[s] for s in streams if s in files}
+    if not files:
+        raise FileNotFoundError(f"No Cosinuss streams found in {folder}")
+
+    metadata = None
+    session = {}
+    for stream, file_path in files.items():
+        metadata, session[stream] = load_stream(file_path, cache_dir=cache_dir)
+    return metadata, session
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GroupKFold, LeaveOneGroupOut, ParameterGrid
+from sklearn.tree import DecisionTreeClassifier
+
+from quality import MIN_VALID_FRACTION
+from stage_protocol import STAGE_LABELS, stage_label_codes
+
+# Estimators the harness can evaluate, by name. Ensembles are kept single-threaded
+# because the folds themselves already run in parallel.
+MODELS = {
+    'tree': (DecisionTreeClassifier, {'random_state': 42}),
+    'forest': (RandomForestClassifier, {'random_state': 42, 'n_estimators': 100, 'n_jobs': 1}),
+    'extra_trees': (ExtraTreesClassifier, {'random_state': 42, 'n_estimators': 100, 'n_jobs': 1}),
+    'logistic': (LogisticRegression, {'max_iter': 1000}),
+    'hist_gb': (HistGradientBoostingClassifier, {'random_state': 42}),
+}
+
+# Models that learn from missing values (windows without HR/RR/PPG coverage are NaN);
+# every other model only sees windows whose selected features are all present.
+NAN_AWARE_MODELS = {'hist_gb'}
+
+
+def load_dataset(path, features=None, drop_nan=True):
+    """
+    (X, y, groups, feature names) from either the combined labeled CSV of
+    prepare_data.py (needs its Volunteer column) or the volunteer_features.npz
+    of feature_engine.py. y holds label codes into STAGE_LABELS. Feature windows
+    mostly recorded during motion or poor ear fit are left out. features picks
+    columns of the .npz by name; with drop_nan, windows missing any of them are
+    left out too, otherwise their NaN are kept for a NaN-aware model.
+    """
+    if path.endswith('.npz'):
+        data = np.load(path)
+        stage_names = data['stage_names']
+        codes = stage_label_codes(stage_names)[data['stage']]
+        names = list(data['feature_names'])
+        columns = [names.index(name) for name in features] if features else list(range(len(names)))
+        X = data['X'][:, columns]
+        keep = (data['stage'] >= 0) & (codes >= 0)
+        if 'valid_fraction' in data.files:
+            keep &= data['valid_fraction'] >= MIN_VALID_FRACTION
+        if drop_nan:
+            keep &= ~np.isnan(X).any(axis=1)
+        return X[keep], codes[keep], data['volunteer'][keep], [names[i] for i in columns]
+
+    df = pd.read_csv(path, dtype={'Stage': 'category', 'Label': 'category'})
+    if 'Volunteer' not in df.columns:
+        raise ValueError(f"{path} has no Volunteer column; rerun gsr_data_graphs/prepare_data.py")
+    y = pd.Categorical(df['Label'], categories=STAGE_LABELS).codes
+    features = ['Resistance (Ohms)']
+    return df[features].to_numpy(dtype=np.float32), y, df['Volunteer'].to_numpy(), features
+
+
+def make_folds(groups, n_splits=None):
+    """Lists of held-out volunteers: one per volunteer, or n_splits balanced volunteer groups."""
+    unique = np.unique(groups)
+    if not n_splits or n_splits >= len(unique):
+        splitter = LeaveOneGroupOut()
+    else:
+        splitter = GroupKFold(n_splits=n_splits)
+    return [unique[test].tolist() for _, test in splitter.split(unique, groups=unique)]
+
+
+def share_arrays(folder, **arrays):
+    """Saves arrays as .npy files that workers memory-map instead of receiving copies."""
+    paths = {}
+    for name, array in arrays.items():
+        paths[name] = os.path.join(folder, f'{name}.npy')
+        np.save(paths[name], np.ascontiguousarray(array))
+    return paths
+
+
+def run_fold(task):
+    """Trains one (model, params) on every volunteer but the held-out ones and scores it on them."""
+    arrays = {name: np.load(path, mmap_mode='r') for name, path in task['arrays'].items()}
+    test = np.isin(arrays['groups'], task['held_out'])
+    model_class, defaults = MODELS[task['model']]
+    model = model_class(**{**defaults, **task['params']})
+
+    start = time.perf_counter()
+    model.fit(arrays['X'][~test], arrays['y'][~test])
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    accuracy = float(np.mean(model.predict(arrays['X'][test]) == arrays['y'][test]))
+    return {
+        'params': task['params'],
+        'held_out': task['held_out'],
+        'train_rows': int((~test).sum()),
+        'test_rows': int(test.sum()),
+        'accuracy': accuracy,
+        'fit_s': fit_s,
+        'predict_s': time.perf_counter() - start,
+    }
+
+
+def cross_validate(X, y, groups, model='tree', param_grid=None, n_splits=None, workers=None):
+    """
+    Grouped cross-validation of every parameter combination in param_grid.
+    All (params, fold) pairs run concurrently in a process pool over one
+    memory-mapped copy of X. Returns one summary per parameter combination,
+    best mean accuracy first, each with its per-fold results.
+    """
+    folds = make_folds(groups, n_splits)
+    grid = list(ParameterGrid(param_grid or {}))
+    shared = tempfile.mkdtemp(prefix='gsr-cv-')
+    try:
+        paths = share_arrays(shared, X=X, y=y, groups=groups)
+        tasks = [{'arrays': paths, 'model': model, 'params': params, 'held_out': held_out}
+                 for params in grid for held_out in folds]
+        if workers == 1:
+            fold_results = [run_fold(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                fold_results = list(pool.map(run_fold, tasks))
+    finally:
+        shutil.rmtree(shared, ignore_errors=True)
+
+    summaries = []
+    for i, params in enumerate(grid):
+        results = fold_results[i * len(folds):(i + 1) * len(folds)]
+        accuracies = np.array([r['accuracy'] for r in results])
+        summaries.append({
+            'model': model,
+            'params': params,
+            'mean_accuracy': float(accuracies.mean()),
+            'std_accuracy': float(accuracies.std()),
+            'fit_s': float(sum(r['fit_s'] for r in results)),
+            'folds': results,
+        })
+    summaries.sort(key=lambda s: -s['mean_accuracy'])
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Leave-one-volunteer-out / grouped k-fold cross-validation.')
+    parser.add_argument('--data', default='combined_labeled_gsr_dataset.csv',
+                        help='combined labeled CSV or volunteer_features.npz')
+    parser.add_argument('--model', choices=sorted(MODELS), default='tree')
+    parser.add_argument('--features', default=None,
+                        help='comma-separated feature names of a .npz to use (default: all of them)')
+    parser.add_argument('--grid', default='{}', help='JSON parameter grid, e.g. \'{"max_depth": [3, 5, null]}\'')
+    parser.add_argument('--folds', type=int, default=0, help='k for k-fold by volunteer; 0 leaves one volunteer out')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='cv_results.json')
+    args = parser.parse_args(argv)
+
+    selected = args.features.split(',') if args.features else None
+    drop_nan = args.model not in NAN_AWARE_MODELS
+    X, y, groups, features = load_dataset(args.data, selected, drop_nan=drop_nan)
+    nan_handling = 'dropped windows with missing features' if drop_nan else 'kept missing features (NaN-aware model)'
+    print(f"{len(y)} rows, {len(features)} features, {len(np.unique(groups))} volunteers; {nan_handling}")
+    start = time.perf_counter()
+    summaries = cross_validate(X, y, groups, args.model, json.loads(args.grid), args.folds, args.workers)
+    print(f"Cross-validation finished in {time.perf_counter() - start:.2f}s")
+
+    best = summaries[0]
+    for fold in best['folds']:
+        print(f"  held out {fold['held_out']}: accuracy {fold['accuracy']:.3f} "
+              f"(fit {fold['fit_s'] * 1000:.0f}ms, {fold['train_rows']} train / {fold['test_rows']} test rows)")
+    for summary in summaries:
+        print(f"{summary['model']} {summary['params']}: "
+              f"{summary['mean_accuracy']:.3f} +/- {summary['std_accuracy']:.3f}")
+    for summary in summaries:
+        summary.update(features=features, rows=len(y), nan_handling=nan_handling)
+    with open(args.output, 'w') as f:
+        json.dump(summaries, f, indent=1, default=str)
+    print(f"Results saved to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,95 +1,94 @@
 import os
+import argparse
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import glob
+import sys
 
-def find_header_row(file_path):
-    """Finds the row number of the header 'time,heart_rate'."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for i, line in enumerate(f):
-            if 'time,heart_rate' in line:
-                return i
-    return None
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from hrv import analyze_folder
+from plot_render import PlotSpec, Series, render_batch, render_plot, show_plot
 
-def analyze_hrv(volunteer_id, user_note, base_dir="."):
+# Conclusions from our manual notes: volunteer id -> (conclusion, annotation, color)
+MANUAL_NOTES = {
+    23: ("Relaxed / Low Stress", "High HRV: The changing pattern indicates a relaxed state.", 'green'),
+    24: ("High Stress", "Low HRV: The flat pattern indicates high stress.", 'red'),
+}
+
+def analyze_hrv(volunteer_id, user_note, base_dir=".", show=True, render=True):
     """
-    Performs HRV analysis and generates a clear plot based on manual notes.
+    Performs HRV analysis on the measured RR intervals and generates a clear plot based on manual notes.
+    Returns the plot path, or with render=False the PlotSpec so several volunteers can be
+    rendered together; the HRV metrics are computed by hrv.analyze_folder.
     """
-    print(f"\n--- Processing Heart Rate Data for Volunteer {volunteer_id} ---")
+    print(f"\n--- Processing RR Interval Data for Volunteer {volunteer_id} ---")
 
     volunteer_folder = os.path.join(base_dir, f'v{volunteer_id}- p')
-    file_pattern = os.path.join(volunteer_folder, '*_heart_rate.csv')
-    file_list = glob.glob(file_pattern)
-
-    if not file_list:
-        print(f"Error: Heart rate file not found for Volunteer {volunteer_id} at '{file_pattern}'. Skipping.")
-        return
-    
-    file_path = file_list[0]
-    
-    header_row = find_header_row(file_path)
-    if header_row is None:
-        print(f"Error: Could not find header 'time,heart_rate' in {file_path}. Skipping.")
+    try:
+        # Beat-to-beat intervals detected in the raw PPG (ppg_beats.py); beats recorded
+        # during motion or poor ear fit (quality.py) are left out
+        metrics = analyze_folder(volunteer_folder, quality=True, source='ppg')
+    except FileNotFoundError as e:
+        print(f"Error: {e}. Skipping.")
         return
 
-    df = pd.read_csv(file_path, skiprows=header_row, header=0)
-    
-    if 'heart_rate' not in df.columns:
-        print(f"Error: 'heart_rate' column not found in the file. Skipping.")
+    if len(metrics['rr_ms']) < 2:
+        print(f"Error: Not enough valid RR intervals for Volunteer {volunteer_id}. Skipping.")
         return
 
-    df['rr_intervals_ms'] = (60 / df['heart_rate']) * 1000
-    df['time_index'] = np.arange(len(df))
+    df = pd.DataFrame({'time': metrics['time'], 'rr_intervals_ms': metrics['rr_ms']})
+    df['time'] = df['time'] - df['time'].iloc[0]
 
     # Normalize RR intervals to a 0-1 scale
     min_rr = df['rr_intervals_ms'].min()
     max_rr = df['rr_intervals_ms'].max()
     df['normalized_rr_intervals'] = (df['rr_intervals_ms'] - min_rr) / (max_rr - min_rr)
 
+    print(f"RMSSD: {metrics['session_rmssd']:.1f} ms, SDNN: {metrics['session_sdnn']:.1f} ms, "
+          f"pNN50: {metrics['session_pnn50']:.1f}%, LF/HF: {metrics['session_lf_hf']:.2f}")
+
     # --- Manual Classification based on our notes ---
-    if volunteer_id == 23:
-        conclusion = "Relaxed / Low Stress"
-        annotation_text = "High HRV: The changing pattern indicates a relaxed state."
-        annotation_color = 'green'
-        plot_fill_color = 'green'
-    elif volunteer_id == 24:
-        conclusion = "High Stress"
-        annotation_text = "Low HRV: The flat pattern indicates high stress."
-        annotation_color = 'red'
-        plot_fill_color = 'red'
-    else:
-        conclusion = "Undefined"
-        annotation_text = "No specific notes available."
-        annotation_color = 'gray'
-        plot_fill_color = 'gray'
+    conclusion, annotation_text, annotation_color = MANUAL_NOTES.get(
+        volunteer_id, ("Undefined", "No specific notes available.", 'gray'))
+    plot_fill_color = annotation_color
+    annotation_text += (f"\nRMSSD {metrics['session_rmssd']:.0f} ms, SDNN {metrics['session_sdnn']:.0f} ms, "
+                        f"LF/HF {metrics['session_lf_hf']:.2f}")
 
     # --- Generate the Plot -----
-    plt.figure(figsize=(15, 7))
-    plt.plot(df['time_index'], df['normalized_rr_intervals'], label='Normalized RR Intervals', color='darkgreen')
-    
-    plt.title(f'HRV Plot for Volunteer {volunteer_id} - Condition: {conclusion}')
-    plt.xlabel('Time (data points)')
-    plt.ylabel('RR Interval (Normalized 0-1)')
-    
-    # Position the annotation text in the top-right corner
-    plt.text(0.95, 0.9, annotation_text, fontsize=15, color=annotation_color, ha='right',
-             transform=plt.gca().transAxes, bbox=dict(boxstyle="round,pad=0.3", fc="white", ec="black", lw=1))
-
-    plt.fill_between(df['time_index'], 0, df['normalized_rr_intervals'], color=plot_fill_color, alpha=0.1)
+    # High-rate RR series are decimated to the figure's pixel width before drawing
+    spec = PlotSpec(
+        file=os.path.join('hrv_plots', f'v{volunteer_id}_hrv_analysis.png'),
+        title=f'HRV Plot for Volunteer {volunteer_id} - Condition: {conclusion}',
+        xlabel='Time (seconds)',
+        ylabel='RR Interval (Normalized 0-1)',
+        series=[Series(df['time'].to_numpy(), df['normalized_rr_intervals'].to_numpy(),
+                       'Normalized RR Intervals', 'darkgreen', fill_color=plot_fill_color)],
+        annotation=(annotation_text, annotation_color),
+        figsize=(15, 7),
+    )
 
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
+    if not render:
+        return spec
 
     # Save the plot
-    plot_folder = 'hrv_plots'
-    if not os.path.exists(plot_folder):
-        os.makedirs(plot_folder)
-    plt.savefig(os.path.join(plot_folder, f'v{volunteer_id}_hrv_analysis.png'))
-    plt.show()
+    plot_file = render_plot(spec)
+    if show:
+        show_plot(spec)
     print("-" * 50)
+    return plot_file
 
 if __name__ == '__main__':
-    analyze_hrv(23, "The volunteer didn't feel stressed much", base_dir=".")
-    analyze_hrv(24, "The volunteer said she had a high heart rate for some reason", base_dir=".")
+    parser = argparse.ArgumentParser(description='HRV plots of the annotated exam volunteers.')
+    parser.add_argument('--show', action='store_true', help='also open every plot in a window')
+    args = parser.parse_args()
+
+    specs = [
+        analyze_hrv(23, "The volunteer didn't feel stressed much", base_dir=".", show=False, render=False),
+        analyze_hrv(24, "The volunteer said she had a high heart rate for some reason", base_dir=".",
+                    show=False, render=False),
+    ]
+    specs = [spec for spec in specs if spec is not None]
+    # Both plots are rendered headless in parallel
+    for plot_file in render_batch(specs):
+        print(f"Plot saved to '{plot_file}'.")
+    if args.show:
+        for spec in specs:
+            show_plot(spec)
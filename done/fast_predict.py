@@ -0,0 +1,192 @@
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+# Only numpy is imported eagerly: everything else this module can use
+# (joblib/scikit-learn for exporting, a TFLite runtime) is imported on first use.
+
+DONE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(DONE_DIR, 'gsr_stress_model.pkl')
+COMPILED_MODEL_PATH = os.path.join(DONE_DIR, 'gsr_stress_model.npz')
+TFLITE_MODEL_PATH = os.path.join(DONE_DIR, '..', 'model.tflite')
+
+# Batches up to this size are walked row by row instead of level by level.
+SCALAR_BATCH = 16
+
+# TFLite interpreters, lightest first: (module, attribute holding the Interpreter class).
+TFLITE_RUNTIMES = (
+    ('tflite_runtime.interpreter', 'Interpreter'),
+    ('ai_edge_litert.interpreter', 'Interpreter'),
+    ('tensorflow.lite', 'Interpreter'),
+)
+
+
+def load_tflite_interpreter(model_path=TFLITE_MODEL_PATH):
+    """
+    A TFLite Interpreter from the lightest runtime that can run the model:
+    tflite_runtime, then ai_edge_litert, then full TensorFlow. model.tflite is
+    an LSTM with Flex (TensorFlow) ops, which the light runtimes cannot
+    allocate; those fall through to the next runtime.
+    """
+    import importlib
+    failure = None
+    for module_name, attribute in TFLITE_RUNTIMES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        try:
+            interpreter = getattr(module, attribute)(model_path=model_path)
+            interpreter.allocate_tensors()
+        except (RuntimeError, ValueError) as e:
+            failure = e
+            continue
+        return interpreter
+    if failure is not None:
+        raise RuntimeError(f"No installed TFLite runtime can run {model_path}: {failure}") from failure
+    raise ImportError("No TFLite runtime found; install tflite-runtime, ai-edge-litert or tensorflow")
+
+
+def export_tree(model, path=COMPILED_MODEL_PATH):
+    """
+    Writes a fitted scikit-learn decision tree as plain arrays: per-node
+    feature, threshold, left/right child (-1 at leaves) and class
+    probabilities, plus the class labels.
+    """
+    tree = model.tree_
+    value = tree.value[:, 0, :].astype(np.float64)
+    probabilities = value / value.sum(axis=1, keepdims=True)
+    np.savez(path,
+             feature=tree.feature.astype(np.int32),
+             threshold=tree.threshold,
+             left=tree.children_left.astype(np.int32),
+             right=tree.children_right.astype(np.int32),
+             proba=probabilities.astype(np.float32),
+             classes=np.asarray(model.classes_, dtype=str),
+             max_depth=np.int32(tree.max_depth))
+    return path
+
+
+class CompiledTree:
+    """
+    A decision tree evaluated with NumPy only. All rows descend one level per
+    step, so a batch costs max_depth vectorized gathers.
+    """
+
+    def __init__(self, feature, threshold, left, right, proba, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.proba = proba
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        self._nodes = None
+
+    @classmethod
+    def load(cls, path=COMPILED_MODEL_PATH):
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    def apply(self, X):
+        """Leaf index of every row of X (n, n_features)."""
+        # scikit-learn compares float32 features against float64 thresholds; do the same.
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[:, np.newaxis]
+        if len(X) <= SCALAR_BATCH:
+            return self._apply_scalar(X)
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.int32)
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            leaf = self.left[node] < 0
+            go_left = X[rows, np.maximum(feature, 0)] <= self.threshold[node]
+            node = np.where(leaf, node, np.where(go_left, self.left[node], self.right[node]))
+        return node
+
+    def _apply_scalar(self, X):
+        # A few rows walk the tree in plain Python: cheaper than max_depth rounds of array calls.
+        if self._nodes is None:
+            self._nodes = (self.feature.tolist(), self.threshold.tolist(), self.left.tolist(), self.right.tolist())
+        feature, threshold, left, right = self._nodes
+        leaves = np.empty(len(X), dtype=np.int32)
+        for i, row in enumerate(X.astype(np.float64).tolist()):
+            node = 0
+            while left[node] >= 0:
+                node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+            leaves[i] = node
+        return leaves
+
+    def predict_proba(self, X):
+        return self.proba[self.apply(X)]
+
+    def predict(self, X):
+        return self.classes[self.proba[self.apply(X)].argmax(axis=1)]
+
+
+def load_compiled_tree(path=COMPILED_MODEL_PATH, model_path=None):
+    """
+    The compiled tree, exporting it from its pickled model first when it is
+    missing or older. Only the default tree is tied to gsr_stress_model.pkl;
+    any other path is loaded as-is unless its source model_path is given.
+    """
+    if model_path is None and os.path.abspath(path) == COMPILED_MODEL_PATH:
+        model_path = MODEL_PATH
+    if model_path is not None and (not os.path.exists(path) or (
+            os.path.exists(model_path) and os.path.getmtime(model_path) > os.path.getmtime(path))):
+        import joblib
+        export_tree(joblib.load(model_path), path)
+    return CompiledTree.load(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fast-startup GSR stress prediction.')
+    parser.add_argument('values', type=float, nargs='+', help='normalized GSR values')
+    parser.add_argument('--tflite', action='store_true', help='score with model.tflite instead of the tree')
+    parser.add_argument('--model', default=None, help='compiled .npz tree or .tflite model path')
+    parser.add_argument('--export', action='store_true', help='re-export gsr_stress_model.pkl before predicting')
+    parser.add_argument('--timing', action='store_true', help='report cold-start time and per-call latency')
+    parser.add_argument('--repeat', type=int, default=1000, help='calls timed with --timing')
+    args = parser.parse_args(argv)
+
+    load_start = time.perf_counter()
+    if args.tflite:
+        from batch_predict import TFLiteBatchScorer
+        scorer = TFLiteBatchScorer(args.model or TFLITE_MODEL_PATH, batch_size=1)
+        # One window; a single value is repeated to fill it like ../main.py does.
+        window = np.resize(np.asarray(args.values, dtype=np.float32), scorer.window)[np.newaxis, :]
+        predict = lambda: scorer.predict(window)
+        labels, scores = predict()
+        print(f"Model output: {scores[0]:.4f} -> {labels[0]}")
+    else:
+        model_path = args.model or COMPILED_MODEL_PATH
+        if args.export:
+            import joblib
+            export_tree(joblib.load(MODEL_PATH), model_path)
+        tree = load_compiled_tree(model_path)
+        values = np.asarray(args.values)
+        predict = lambda: tree.predict(values)
+        for value, label in zip(args.values, predict()):
+            print(f"{value}: {label}")
+    cold_start = time.perf_counter() - _IMPORT_START
+
+    if args.timing:
+        latencies = np.empty(args.repeat)
+        for i in range(args.repeat):
+            start = time.perf_counter()
+            predict()
+            latencies[i] = time.perf_counter() - start
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+        print(f"cold start {cold_start * 1000:.1f} ms (imports {(load_start - _IMPORT_START) * 1000:.1f} ms), "
+              f"per call p50 {p50:.0f} us, p99 {p99:.0f} us over {args.repeat} calls", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
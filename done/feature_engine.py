@@ -0,0 +1,270 @@
+import os
+import re
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from cosinuss_reader import find_cosinuss_folder, find_session_files, load_stream
+from hrv import clean_rr, successive
+from numeric import cumsum0
+from quality import QUALITY_PARAMS, build_quality_mask, quality_files, shift_mask, valid_at, valid_fraction
+from session_store import SessionStore
+from stage_protocol import DEFAULT_STAGES, StageProtocol
+
+FEATURE_NAMES = ['gsr_mean', 'gsr_slope', 'scr_peaks', 'hr_mean', 'rr_rmssd', 'rr_sdnn', 'ppg_amplitude']
+
+# Bump when the feature definitions change so cached matrices are recomputed.
+FEATURE_VERSION = 3
+
+
+def window_bounds(n_samples, window, step):
+    """Start and end (exclusive) sample indices of every full window."""
+    starts = np.arange(0, n_samples - window + 1, step, dtype=np.int64)
+    return starts, starts + window
+
+
+def window_mean(x, starts, ends):
+    c = cumsum0(x)
+    return (c[ends] - c[starts]) / (ends - starts)
+
+
+def window_slope(x, starts, ends):
+    """Least-squares slope (per sample) of x over every window."""
+    k = np.arange(len(x), dtype=np.float64)
+    c = cumsum0(x)
+    ck = cumsum0(k * x)
+    n = (ends - starts).astype(np.float64)
+    sum_x = c[ends] - c[starts]
+    # Sum of j * x_j with j counted from the window start.
+    sum_jx = (ck[ends] - ck[starts]) - starts * sum_x
+    mean_j = (n - 1) / 2
+    var_j = n * (n * n - 1) / 12
+    return (sum_jx - mean_j * sum_x) / var_j
+
+
+def scr_peak_mask(x, threshold=0.01, lag=4):
+    """
+    Local maxima of the GSR signal that rise more than `threshold` above the
+    minimum of the preceding `lag` samples.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    mask = np.zeros(len(x), dtype=bool)
+    if len(x) <= lag + 1:
+        return mask
+    local_max = (x[1:-1] > x[:-2]) & (x[1:-1] >= x[2:])
+    preceding_min = np.lib.stride_tricks.sliding_window_view(x[:-1], lag).min(axis=1)
+    # preceding_min[i] is the minimum of x[i:i + lag], i.e. the lag samples before x[i + lag].
+    rise = np.zeros(len(x), dtype=np.float64)
+    rise[lag:] = x[lag:] - preceding_min
+    mask[1:-1] = local_max & (rise[1:-1] > threshold)
+    return mask
+
+
+def window_count(mask, starts, ends):
+    c = cumsum0(mask.astype(np.float64))
+    return c[ends] - c[starts]
+
+
+def window_rr_stats(rr_times, rr_ms, window_start_times, window_end_times, beats=None):
+    """
+    RMSSD and SDNN (ms) of the RR intervals falling inside every time window.
+    With beats (see hrv.clean_rr), RMSSD only uses successive differences.
+    """
+    lo = np.searchsorted(rr_times, window_start_times, side='left')
+    hi = np.searchsorted(rr_times, window_end_times, side='left')
+    count = (hi - lo).astype(np.float64)
+
+    c1 = cumsum0(rr_ms)
+    c2 = cumsum0(rr_ms * rr_ms)
+    # Successive difference d[j] = rr[j + 1] - rr[j]; a window holds d[lo:hi - 1], of which
+    # only the pairs adjacent in the recording count. The trailing 0 keeps cd the same
+    # length as c1 so every lo/hi is a valid index.
+    adjacent = np.ones(max(len(rr_ms) - 1, 0), dtype=bool) if beats is None else successive(beats)
+    d2 = np.r_[np.where(adjacent, np.diff(rr_ms) ** 2, 0.0), 0.0]
+    cd = cumsum0(d2)
+    cn = cumsum0(np.r_[adjacent, False])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (c1[hi] - c1[lo]) / count
+        var = (c2[hi] - c2[lo]) / count - mean * mean
+        sdnn = np.where(count >= 2, np.sqrt(np.maximum(var, 0)), np.nan)
+        hi_d = np.maximum(hi - 1, lo)
+        n_diff = cn[hi_d] - cn[lo]
+        rmssd = np.where(n_diff >= 1, np.sqrt((cd[hi_d] - cd[lo]) / n_diff), np.nan)
+    return rmssd, sdnn
+
+
+def ppg_amplitude_per_second(times, ppg, n_seconds):
+    """Peak-to-peak PPG amplitude of every 1-second block, NaN where a block has no samples."""
+    seconds = np.floor(times).astype(np.int64)
+    keep = (seconds >= 0) & (seconds < n_seconds)
+    seconds, ppg = seconds[keep], ppg[keep].astype(np.float64)
+    amplitude = np.full(n_seconds, np.nan)
+    if len(seconds) == 0:
+        return amplitude
+    # Samples are time ordered, so every block is one contiguous run.
+    block_starts = np.flatnonzero(np.r_[True, seconds[1:] != seconds[:-1]])
+    block_ids = seconds[block_starts]
+    amplitude[block_ids] = np.maximum.reduceat(ppg, block_starts) - np.minimum.reduceat(ppg, block_starts)
+    return amplitude
+
+
+def _nan_window_mean(x, starts, ends):
+    valid = ~np.isnan(x)
+    c = cumsum0(np.where(valid, x, 0.0))
+    n = cumsum0(valid.astype(np.float64))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (c[ends] - c[starts]) / (n[ends] - n[starts])
+
+
+def compute_features(gsr, cosinuss=None, window=30, step=5, protocol=None):
+    """
+    Window features over one volunteer's 1 Hz cleaned GSR signal and, when
+    given, their Cosinuss streams ({stream: {column: array}} with times in
+    seconds from the first sample). An optional cosinuss['quality'] mask on
+    the same clock blanks HR/RR/PPG samples in invalid spans. Returns a
+    DataFrame with one row per window: 'Window Start', the FEATURE_NAMES
+    columns (float32), the window's 'Valid Fraction' and the 'Stage' of its
+    midpoint.
+    """
+    protocol = protocol or StageProtocol(DEFAULT_STAGES)
+    gsr = np.asarray(gsr, dtype=np.float64)
+    n_seconds = len(gsr)
+    starts, ends = window_bounds(n_seconds, window, step)
+    features = np.full((len(starts), len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+
+    features[:, 0] = window_mean(gsr, starts, ends)
+    features[:, 1] = window_slope(gsr, starts, ends)
+    features[:, 2] = window_count(scr_peak_mask(gsr), starts, ends)
+
+    cosinuss = cosinuss or {}
+    mask = cosinuss.get('quality')
+    if 'heart_rate' in cosinuss and len(cosinuss['heart_rate']['time']):
+        hr = cosinuss['heart_rate']
+        hr_1hz = np.interp(np.arange(n_seconds), hr['time'], hr['heart_rate'].astype(np.float64),
+                           left=np.nan, right=np.nan)
+        if mask is not None:
+            hr_1hz[~valid_at(mask, np.arange(n_seconds))] = np.nan
+        features[:, 3] = _nan_window_mean(hr_1hz, starts, ends)
+    if 'rr_int' in cosinuss and len(cosinuss['rr_int']['time']):
+        rr_times, rr_ms, beats = clean_rr(cosinuss['rr_int']['time'], cosinuss['rr_int']['rr_int'])
+        if mask is not None:
+            keep = valid_at(mask, rr_times)
+            rr_times, rr_ms, beats = rr_times[keep], rr_ms[keep], beats[keep]
+        if len(rr_ms):
+            features[:, 4], features[:, 5] = window_rr_stats(rr_times, rr_ms, starts, ends, beats)
+    if 'ppg_ir_ppg_ambient_ppg_red' in cosinuss and len(cosinuss['ppg_ir_ppg_ambient_ppg_red']['time']):
+        ppg = cosinuss['ppg_ir_ppg_ambient_ppg_red']
+        amplitude = ppg_amplitude_per_second(ppg['time'], ppg['ppg_ir'], n_seconds)
+        if mask is not None:
+            amplitude[~valid_at(mask, np.arange(n_seconds))] = np.nan
+        features[:, 6] = _nan_window_mean(amplitude, starts, ends)
+
+    df = pd.DataFrame(features, columns=FEATURE_NAMES)
+    df.insert(0, 'Window Start', starts.astype(np.int32))
+    df['Valid Fraction'] = (valid_fraction(mask, starts, ends) if mask is not None
+                            else np.ones(len(starts))).astype(np.float32)
+    df['Stage'] = protocol.stage_categorical(starts + window / 2)
+    return df
+
+
+def load_cosinuss_streams(folder, quality=True):
+    """
+    Loads the streams used for features with times shifted to start at 0, like
+    the cleaned HR files; with quality set, the session's quality mask on the
+    same clock is included as streams['quality'].
+    """
+    files = find_session_files(folder)
+    streams = {}
+    t0 = None
+    for stream in ('heart_rate', 'rr_int', 'ppg_ir_ppg_ambient_ppg_red'):
+        if stream not in files:
+            continue
+        _, columns = load_stream(files[stream])
+        streams[stream] = columns
+        if len(columns['time']) and stream == 'heart_rate':
+            t0 = columns['time'][0]
+    if t0 is None:
+        t0 = min((c['time'][0] for c in streams.values() if len(c['time'])), default=0.0)
+    shifted = {stream: dict(columns, time=columns['time'] - t0) for stream, columns in streams.items()}
+    if quality and quality_files(folder):
+        shifted['quality'] = shift_mask(build_quality_mask(folder), -t0)
+    return shifted
+
+
+def feature_cache_args(gsr_cleaned_file, cosinuss_folder=None, window=30, step=5, stages=DEFAULT_STAGES,
+                       quality=True):
+    """(sources, params, version) the windows of extract_volunteer_features() are cached under."""
+    sources = [gsr_cleaned_file]
+    if cosinuss_folder:
+        files = find_session_files(cosinuss_folder)
+        sources += [files[s] for s in ('heart_rate', 'rr_int', 'ppg_ir_ppg_ambient_ppg_red') if s in files]
+        if quality:
+            sources += quality_files(cosinuss_folder)
+    params = {'window': window, 'step': step, 'stages': stages,
+              'quality': QUALITY_PARAMS if quality else None}
+    return sources, params, f'features/{FEATURE_VERSION}'
+
+
+def extract_volunteer_features(gsr_cleaned_file, cosinuss_folder=None, window=30, step=5,
+                               stages=DEFAULT_STAGES, store=None, quality=True):
+    """Cached compute_features() for one volunteer's cleaned GSR CSV and optional Cosinuss folder."""
+    store = store or SessionStore()
+    sources, params, version = feature_cache_args(gsr_cleaned_file, cosinuss_folder, window, step, stages, quality)
+
+    def compute():
+        gsr = pd.read_csv(gsr_cleaned_file)['Resistance (Ohms)'].to_numpy()
+        cosinuss = load_cosinuss_streams(cosinuss_folder, quality=quality) if cosinuss_folder else None
+        return compute_features(gsr, cosinuss, window=window, step=step, protocol=StageProtocol(stages))
+
+    df, _ = store.cached_frame(sources, params, compute, version)
+    return df
+
+
+def volunteer_sessions(base_dir):
+    """(volunteer id, cleaned GSR CSV, Cosinuss folder or None) of every volunteer under base_dir/graphing."""
+    sessions = []
+    for name in sorted(os.listdir(os.path.join(base_dir, 'graphing'))):
+        match = re.match(r'^GSR-(\d+)_cleaned\.csv$', name)
+        if match:
+            volunteer_id = int(match.group(1))
+            sessions.append((volunteer_id, os.path.join(base_dir, 'graphing', name),
+                             find_cosinuss_folder(base_dir, volunteer_id)))
+    return sessions
+
+
+def features_by_stage(df):
+    """{stage: float32 feature matrix} for a frame returned by compute_features()."""
+    return {stage: group[FEATURE_NAMES].to_numpy(dtype=np.float32)
+            for stage, group in df.groupby('Stage', observed=True)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build windowed GSR/HR/RR/PPG feature matrices.')
+    parser.add_argument('--base-dir', default='presentation volunteers')
+    parser.add_argument('--window', type=int, default=30, help='window length in seconds')
+    parser.add_argument('--step', type=int, default=5, help='window step in seconds')
+    parser.add_argument('--output', default='volunteer_features.npz')
+    args = parser.parse_args(argv)
+
+    frames = []
+    for volunteer_id, gsr_file, cosinuss_folder in volunteer_sessions(args.base_dir):
+        df = extract_volunteer_features(gsr_file, cosinuss_folder, window=args.window, step=args.step)
+        df.insert(0, 'Volunteer', volunteer_id)
+        frames.append(df)
+        print(f"Volunteer {volunteer_id}: {len(df)} windows")
+
+    combined = pd.concat(frames, ignore_index=True)
+    np.savez(args.output,
+             X=combined[FEATURE_NAMES].to_numpy(dtype=np.float32),
+             volunteer=combined['Volunteer'].to_numpy(dtype=np.int16),
+             stage=combined['Stage'].cat.codes.to_numpy(),
+             valid_fraction=combined['Valid Fraction'].to_numpy(dtype=np.float32),
+             stage_names=np.asarray(combined['Stage'].cat.categories, dtype=str),
+             feature_names=np.asarray(FEATURE_NAMES))
+    print(f"Saved {len(combined)} windows x {len(FEATURE_NAMES)} features to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
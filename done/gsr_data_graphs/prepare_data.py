@@ -1,6 +1,11 @@
 import os
 import pandas as pd
 import glob
+import re
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from stage_protocol import STAGE_LABELS, stage_label_codes
 
 def prepare_and_label_dataset():
     """
@@ -17,22 +22,21 @@ def prepare_and_label_dataset():
         return
 
     # دمج كل الملفات في DataFrame واحد
-    combined_df = pd.concat([pd.read_csv(f) for f in all_files], ignore_index=True)
-
-    # إضافة عمود التصنيف بناءً على المرحلة
-    def categorize_stage(stage):
-        if 'Relaxation' in str(stage) or 'Calibration' in str(stage):
-            return 'Relaxed'
-        elif 'Normal' in str(stage):
-            return 'Normal'
-        elif 'Remove' in str(stage):
-            return 'Stress'
-        return 'Unknown' # في حالة وجود مراحل غير متوقعة
-
-    combined_df['Label'] = combined_df['Stage'].apply(categorize_stage)
+    # مع عمود رقم المتطوع (من اسم الملف) حتى يمكن تقسيم التقييم حسب المتطوع
+    frames = []
+    for f in all_files:
+        df = pd.read_csv(f)
+        df['Volunteer'] = int(re.search(r'GSR_Data-(\d+)', os.path.basename(f)).group(1))
+        frames.append(df)
+    combined_df = pd.concat(frames, ignore_index=True)
+
+    # إضافة عمود التصنيف بناءً على المرحلة (مرة واحدة لكل مرحلة مميزة، وليس لكل صف)
+    combined_df['Stage'] = combined_df['Stage'].astype('category')
+    label_codes = stage_label_codes(combined_df['Stage'])
+    combined_df['Label'] = pd.Categorical.from_codes(label_codes, categories=STAGE_LABELS)
 
     # إزالة أي صفوف لم يتم تصنيفها بشكل صحيح
-    combined_df = combined_df[combined_df['Label'] != 'Unknown']
+    combined_df = combined_df[label_codes >= 0]
 
     # حفظ مجموعة البيانات الموحدة والجاهزة للتدريب
     output_filename = 'combined_labeled_gsr_dataset.csv'
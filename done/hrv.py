@@ -0,0 +1,273 @@
+import os
+import re
+from collections import deque
+
+import numpy as np
+
+from cosinuss_reader import find_session_files, load_stream
+from numeric import cumsum0
+from ppg_beats import session_rr
+from quality import build_quality_mask, valid_at
+
+# Physiologically plausible RR intervals in ms; the device also logs artifacts like 10 or 6035.
+RR_MIN_MS = 300
+RR_MAX_MS = 2000
+
+# The tachogram is not interpolated across gaps between kept beats longer than this (s),
+# i.e. a few beats; resampled points inside such a gap are NaN.
+RR_MAX_GAP_S = 3.0
+
+# Frequency bands (Hz) of the standard short-term HRV spectrum.
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+
+_trapezoid = np.trapezoid if hasattr(np, 'trapezoid') else np.trapz
+
+
+def clean_rr(times, rr_ms):
+    """
+    Drops RR intervals outside [RR_MIN_MS, RR_MAX_MS]. Returns (times, rr_ms,
+    beats), beats being the index of every kept interval in the input.
+    """
+    keep = (rr_ms >= RR_MIN_MS) & (rr_ms <= RR_MAX_MS)
+    return times[keep], rr_ms[keep].astype(np.float64), np.flatnonzero(keep)
+
+
+def successive(beats):
+    """
+    True for every successive difference rr[j + 1] - rr[j] whose two intervals
+    were adjacent in the recording. Once beats are dropped, differencing the
+    kept series would otherwise pair intervals that never followed each other.
+    """
+    return np.diff(beats) == 1
+
+
+def load_rr(folder, quality=False, source='rr_int'):
+    """
+    (times, rr_ms, beats) of a volunteer folder with artifacts removed, from
+    its *_rr_int.csv or (source='ppg') from beats detected in the raw PPG. With
+    quality set, beats inside spans failing the session's quality mask are
+    dropped too. beats holds the original index of every kept interval.
+    """
+    if source == 'ppg':
+        times, rr_ms = session_rr(folder)
+    else:
+        files = find_session_files(folder)
+        if 'rr_int' not in files:
+            raise FileNotFoundError(f"No rr_int stream in {folder}")
+        _, columns = load_stream(files['rr_int'])
+        times, rr_ms = columns['time'], columns['rr_int']
+    times, rr_ms, beats = clean_rr(times, rr_ms)
+    if quality:
+        keep = valid_at(build_quality_mask(folder), times)
+        times, rr_ms, beats = times[keep], rr_ms[keep], beats[keep]
+    return times, rr_ms, beats
+
+
+def rolling_hrv(rr_ms, window=30, beats=None):
+    """
+    RMSSD, SDNN (ms) and pNN50 (%) over the last `window` beats at every beat.
+    Running sums make each beat O(1); beats before the first full window are NaN.
+    With beats (see clean_rr), RMSSD and pNN50 only use successive differences.
+    """
+    rr_ms = np.asarray(rr_ms, dtype=np.float64)
+    n = len(rr_ms)
+    result = {name: np.full(n, np.nan) for name in ('rmssd', 'sdnn', 'pnn50')}
+    if n < window or window < 2:
+        return result
+
+    ends = np.arange(window, n + 1)
+    starts = ends - window
+    c1 = cumsum0(rr_ms)
+    c2 = cumsum0(rr_ms * rr_ms)
+    mean = (c1[ends] - c1[starts]) / window
+    var = (c2[ends] - c2[starts]) / window - mean * mean
+
+    # Successive differences d[j] = rr[j + 1] - rr[j]; a window of beats holds window - 1 of them,
+    # of which only the pairs adjacent in the recording count.
+    diff = np.diff(rr_ms)
+    adjacent = np.ones(n - 1, dtype=bool) if beats is None else successive(beats)
+    cd2 = cumsum0(np.where(adjacent, diff * diff, 0.0))
+    c50 = cumsum0(adjacent & (np.abs(diff) > 50))
+    cn = cumsum0(adjacent)
+    diff_ends = ends - 1
+    pairs = cn[diff_ends] - cn[starts]
+
+    result['sdnn'][window - 1:] = np.sqrt(np.maximum(var, 0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result['rmssd'][window - 1:] = np.sqrt((cd2[diff_ends] - cd2[starts]) / pairs)
+        result['pnn50'][window - 1:] = 100 * (c50[diff_ends] - c50[starts]) / pairs
+    return result
+
+
+class RollingHRV:
+    """
+    Incremental RMSSD / SDNN / pNN50 over the last `window` beats for streams
+    that do not fit in memory. update() is O(1) per beat.
+    """
+
+    def __init__(self, window=30):
+        self.window = window
+        self._beats = deque()
+        self._diffs = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._diff_sq = 0.0
+        self._nn50 = 0
+        self._pairs = 0
+
+    def update(self, rr, adjacent=True):
+        """
+        Adds one RR interval (ms); returns (rmssd, sdnn, pnn50), NaN until the
+        window is full. adjacent=False marks beats dropped just before this one,
+        so its difference to the previous interval is left out.
+        """
+        if self._beats:
+            diff = rr - self._beats[-1] if adjacent else None
+            self._diffs.append(diff)
+            if diff is not None:
+                self._diff_sq += diff * diff
+                self._nn50 += abs(diff) > 50
+                self._pairs += 1
+        self._beats.append(rr)
+        self._sum += rr
+        self._sum_sq += rr * rr
+
+        if len(self._beats) > self.window:
+            old = self._beats.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+            old_diff = self._diffs.popleft()
+            if old_diff is not None:
+                self._diff_sq -= old_diff * old_diff
+                self._nn50 -= abs(old_diff) > 50
+                self._pairs -= 1
+
+        if len(self._beats) < self.window:
+            return np.nan, np.nan, np.nan
+        mean = self._sum / self.window
+        sdnn = np.sqrt(max(self._sum_sq / self.window - mean * mean, 0.0))
+        if not self._pairs:
+            return np.nan, sdnn, np.nan
+        rmssd = np.sqrt(max(self._diff_sq, 0.0) / self._pairs)
+        return rmssd, sdnn, 100.0 * self._nn50 / self._pairs
+
+
+def welch_psd(x, fs, segment=256, overlap=0.5):
+    """
+    Welch power spectral density with Hann windows, all segments in one rfft
+    call. Segments holding NaN (gaps) are left out; with none left the PSD is NaN.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    step = max(1, int(segment * (1 - overlap)))
+    if len(x) < segment:
+        segment = len(x)
+    segments = np.lib.stride_tricks.sliding_window_view(x, segment)[::step]
+    segments = segments[~np.isnan(segments).any(axis=1)]
+    if not len(segments):
+        return np.fft.rfftfreq(segment, 1 / fs), np.full(segment // 2 + 1, np.nan)
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    window = np.hanning(segment)
+    spectrum = np.fft.rfft(segments * window, axis=1)
+    psd = (np.abs(spectrum) ** 2).mean(axis=0) / (fs * (window * window).sum())
+    # One-sided spectrum: double everything but DC (and Nyquist for even lengths).
+    psd[1:-1 if segment % 2 == 0 else None] *= 2
+    return np.fft.rfftfreq(segment, 1 / fs), psd
+
+
+def resample_rr(times, rr_ms, fs=4.0, max_gap_s=RR_MAX_GAP_S):
+    """
+    Evenly resamples the RR tachogram at fs Hz by linear interpolation.
+    Points between two beats more than max_gap_s apart are NaN instead.
+    """
+    grid = np.arange(times[0], times[-1], 1 / fs)
+    tachogram = np.interp(grid, times, rr_ms)
+    after = np.searchsorted(times, grid, side='right')
+    gap = times[after] - times[after - 1] > max_gap_s
+    tachogram[gap] = np.nan
+    return grid, tachogram
+
+
+def _band_power(freqs, psd, band):
+    mask = (freqs >= band[0]) & (freqs < band[1])
+    return _trapezoid(psd[mask], freqs[mask]) if mask.any() else np.nan
+
+
+def lf_hf(times, rr_ms, fs=4.0, segment=256):
+    """(LF power, HF power, LF/HF ratio) of an RR series using Welch's method."""
+    _, tachogram = resample_rr(times, rr_ms, fs)
+    if len(tachogram) < 16:
+        return np.nan, np.nan, np.nan
+    freqs, psd = welch_psd(tachogram, fs, segment=segment)
+    lf = _band_power(freqs, psd, LF_BAND)
+    hf = _band_power(freqs, psd, HF_BAND)
+    return lf, hf, lf / hf if hf > 0 else np.nan
+
+
+def rolling_lf_hf(times, rr_ms, window_s=120, step_s=30, fs=4.0):
+    """
+    LF/HF ratio over sliding time windows. Every window is one Hann-tapered
+    periodogram and all windows go through a single batched rfft.
+    Returns (window end times, LF/HF ratios); windows spanning a gap are NaN.
+    """
+    grid, tachogram = resample_rr(times, rr_ms, fs)
+    size = int(window_s * fs)
+    if len(tachogram) < size:
+        return np.empty(0), np.empty(0)
+    segments = np.lib.stride_tricks.sliding_window_view(tachogram, size)[::int(step_s * fs)]
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    window = np.hanning(size)
+    power = np.abs(np.fft.rfft(segments * window, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(size, 1 / fs)
+    lf = power[:, (freqs >= LF_BAND[0]) & (freqs < LF_BAND[1])].sum(axis=1)
+    hf = power[:, (freqs >= HF_BAND[0]) & (freqs < HF_BAND[1])].sum(axis=1)
+    ends = grid[size - 1::int(step_s * fs)][:len(segments)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return ends, np.where(hf > 0, lf / hf, np.nan)
+
+
+def analyze_rr(times, rr_ms, window=30, beats=None):
+    """
+    Every HRV metric of one RR series, as arrays (rolling) and scalars (whole
+    session). With beats (see clean_rr) only successive differences are used.
+    """
+    metrics = {'time': times, 'rr_ms': rr_ms}
+    metrics.update(rolling_hrv(rr_ms, window=window, beats=beats))
+    metrics['lf_hf_time'], metrics['lf_hf'] = rolling_lf_hf(times, rr_ms)
+    metrics['session_lf'], metrics['session_hf'], metrics['session_lf_hf'] = lf_hf(times, rr_ms)
+    diff = np.diff(rr_ms)
+    if beats is not None:
+        diff = diff[successive(beats)]
+    metrics['session_rmssd'] = np.sqrt(np.mean(diff * diff)) if len(diff) else np.nan
+    metrics['session_sdnn'] = rr_ms.std() if len(rr_ms) else np.nan
+    metrics['session_pnn50'] = 100 * np.mean(np.abs(diff) > 50) if len(diff) else np.nan
+    return metrics
+
+
+def analyze_folder(folder, window=30, quality=False, source='rr_int'):
+    times, rr_ms, beats = load_rr(folder, quality=quality, source=source)
+    return analyze_rr(times, rr_ms, window=window, beats=beats)
+
+
+def analyze_all(base_dir, pattern=r'^v(\d+)\s*-\s*p$', window=30, manifest=None, quality=False,
+                source='rr_int'):
+    """
+    {volunteer_id: metrics} for every volunteer folder under base_dir with an
+    rr_int stream. With a manifest, folders holding a duplicate copy of an
+    already indexed recording are skipped.
+    """
+    results = {}
+    for name in sorted(os.listdir(base_dir)):
+        match = re.match(pattern, name)
+        folder = os.path.join(base_dir, name)
+        if not match or not os.path.isdir(folder):
+            continue
+        rr_file = manifest.stream_file(folder, 'rr_int') if manifest is not None else None
+        if rr_file is not None and manifest.is_duplicate(rr_file):
+            print(f"Skipping {name}: duplicate of an already indexed recording")
+            continue
+        try:
+            results[int(match.group(1))] = analyze_folder(folder, window=window, quality=quality, source=source)
+        except FileNotFoundError as e:
+            print(f"Skipping {name}: {e}")
+    return results
@@ -0,0 +1,294 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fast_predict import COMPILED_MODEL_PATH, TFLITE_MODEL_PATH, load_compiled_tree
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# A batch is dispatched when it holds MAX_BATCH rows or its oldest request has
+# waited MAX_LATENCY_MS, whichever comes first.
+MAX_BATCH = 256
+MAX_LATENCY_MS = 5.0
+
+# Latencies kept for the p50/p99 counters (the most recent ones).
+LATENCY_WINDOW = 10_000
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class ServerStats:
+    """Request, row and batch counters plus a rolling window of request latencies."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def record_batch(self, n_requests, n_rows, latencies):
+        self.requests += n_requests
+        self.rows += n_rows
+        self.batches += 1
+        self.latencies.extend(latencies)
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started
+        p50, p99 = (np.percentile(self.latencies, [50, 99]) * 1000).tolist() if self.latencies else (None, None)
+        return {
+            'requests': self.requests,
+            'rows': self.rows,
+            'batches': self.batches,
+            'errors': self.errors,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+            'requests_per_s': self.requests / uptime,
+            'rows_per_s': self.rows / uptime,
+            'p50_ms': p50,
+            'p99_ms': p99,
+            'uptime_s': uptime,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests for one model into batches. The model runs
+    on the server's single worker thread, so the event loop keeps accepting
+    requests while a batch is scored and the interpreter is never shared.
+    """
+
+    def __init__(self, predict, executor, max_batch=MAX_BATCH, max_latency_ms=MAX_LATENCY_MS):
+        self.predict = predict
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000.0
+        self.stats = ServerStats()
+        self.queue = asyncio.Queue()
+
+    async def submit(self, rows):
+        """Scores rows (an array with one row per sample/window) and returns the model's output for them."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        # Waits for one request, then takes more until the batch is full or the first one's budget is spent.
+        first = await self.queue.get()
+        batch = [first]
+        n_rows = len(first[0])
+        deadline = first[2] + self.max_latency
+        while n_rows < self.max_batch:
+            if self.queue.empty():
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            sizes = [len(rows) for rows, _, _ in batch]
+            X = np.concatenate([rows for rows, _, _ in batch])
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.predict, X)
+            except Exception as e:
+                self.stats.errors += len(batch)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            done = time.perf_counter()
+            offsets = np.cumsum([0] + sizes)
+            for (_, future, arrived), lo, hi in zip(batch, offsets[:-1], offsets[1:]):
+                if not future.done():
+                    future.set_result(tuple(output[lo:hi] for output in outputs))
+            self.stats.record_batch(len(batch), len(X), [done - arrived for _, _, arrived in batch])
+
+
+def tree_predict(tree):
+    def predict(values):
+        probabilities = tree.predict_proba(values)
+        return tree.classes[probabilities.argmax(axis=1)], probabilities
+    return predict
+
+
+class InferenceServer:
+    """
+    Local HTTP/1.1 service keeping the compiled decision tree and (when a
+    TFLite runtime is installed) model.tflite loaded.
+
+        POST /predict/tree    {"values": [gsr, ...]}          -> labels, probabilities
+        POST /predict/tflite  {"windows": [[gsr x 30], ...]}  -> labels, scores
+        GET  /health                                          -> loaded models, TFLite window length
+        GET  /stats                                           -> counters per model
+    """
+
+    def __init__(self, tree_path=COMPILED_MODEL_PATH, tflite_path=TFLITE_MODEL_PATH, tflite=True,
+                 max_batch=MAX_BATCH, max_latency_ms=MAX_LATENCY_MS):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.tree = load_compiled_tree(tree_path)
+        self.batchers = {'tree': MicroBatcher(tree_predict(self.tree), self.executor, max_batch, max_latency_ms)}
+        self.window = None
+        if tflite:
+            try:
+                from batch_predict import TFLiteBatchScorer
+                scorer = TFLiteBatchScorer(tflite_path, batch_size=max_batch)
+            except (ImportError, RuntimeError, ValueError) as e:
+                # No runtime, or none that can run the model: serve the tree alone.
+                print(f"TFLite model not served: {e}", file=sys.stderr)
+            else:
+                self.window = scorer.window
+                self.batchers['tflite'] = MicroBatcher(scorer.predict, self.executor, max_batch, max_latency_ms)
+        self._tasks = []
+        self._server = None
+        self._writers = set()
+
+    def stats(self):
+        return {name: batcher.stats.snapshot() for name, batcher in self.batchers.items()}
+
+    def _parse(self, model, payload):
+        if model == 'tree':
+            values = np.asarray(payload['values'], dtype=np.float64).reshape(-1)
+            return values[:, np.newaxis]
+        windows = np.asarray(payload['windows'], dtype=np.float32)
+        if windows.ndim != 2 or windows.shape[1] != self.window:
+            raise ValueError(f"windows must be a list of {self.window}-value lists")
+        return windows
+
+    async def dispatch(self, method, path, body):
+        """(status, JSON-able payload) of one request."""
+        if path == '/stats':
+            return 200, self.stats()
+        if path == '/health':
+            return 200, {'models': sorted(self.batchers), 'window': self.window}
+        if not path.startswith('/predict/'):
+            return 404, {'error': f"unknown path {path}"}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        model = path[len('/predict/'):]
+        if model not in self.batchers:
+            return (503 if model == 'tflite' else 404), {'error': f"model '{model}' is not loaded"}
+        try:
+            rows = self._parse(model, json.loads(body))
+        except KeyError as e:
+            return 400, {'error': f"missing field {e}"}
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        if not len(rows):
+            return 400, {'error': 'empty request'}
+        try:
+            labels, second = await self.batchers[model].submit(rows)
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+        key = 'probabilities' if model == 'tree' else 'scores'
+        response = {'labels': labels.tolist(), key: second.tolist()}
+        if model == 'tree':
+            response['classes'] = self.tree.classes.tolist()
+        return 200, response
+
+    async def handle(self, reader, writer):
+        # One keep-alive connection per device; requests on it are answered in order.
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self.dispatch(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT):
+        self._tasks = [asyncio.create_task(batcher.run()) for batcher in self.batchers.values()]
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self._server.close()
+        # Closing the open connections ends their handlers with EOF instead of cancelling them.
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+
+def print_stats(stats, file=sys.stdout):
+    for model, s in stats.items():
+        latency = (f"p50 {s['p50_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms" if s['p50_ms'] is not None
+                   else 'no requests')
+        print(f"{model:>6}: {s['requests']} requests, {s['rows']} rows in {s['batches']} batches "
+              f"(mean {s['mean_batch_rows']:.1f} rows), {s['requests_per_s']:.0f} req/s, {latency}", file=file)
+
+
+async def serve(args):
+    server = InferenceServer(args.tree_model or COMPILED_MODEL_PATH, args.tflite_model or TFLITE_MODEL_PATH,
+                             tflite=not args.no_tflite, max_batch=args.max_batch,
+                             max_latency_ms=args.max_latency_ms)
+    host, port = await server.start(args.host, args.port)
+    print(f"Serving {', '.join(server.batchers)} on http://{host}:{port} "
+          f"(max batch {args.max_batch}, max latency {args.max_latency_ms} ms)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print_stats(server.stats())
+        await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve GSR stress predictions with request micro-batching.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='rows per model call')
+    parser.add_argument('--max-latency-ms', type=float, default=MAX_LATENCY_MS,
+                        help='longest a request waits for its batch to fill')
+    parser.add_argument('--tree-model', default=None, help='compiled .npz tree')
+    parser.add_argument('--tflite-model', default=None)
+    parser.add_argument('--no-tflite', action='store_true', help='serve the decision tree only')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+
+# GSR_PROFILE=1 prints a per-step summary at exit; GSR_PROFILE=<path> writes the
+# records there instead ('.folded' -> flame graph stacks, '.trace.json' -> Chrome
+# trace, anything else -> JSON). '{pid}' in the path is replaced by the process id.
+PROFILE_ENV = 'GSR_PROFILE'
+
+
+class _NullStep:
+    """What step() returns while profiling is disabled: every call is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows=0, bytes_read=0):
+        pass
+
+
+_NULL_STEP = _NullStep()
+
+
+class Step:
+    """One timed step; use add() inside the block to report rows or bytes found while running."""
+
+    __slots__ = ('profiler', 'name', 'rows', 'bytes_read', 'start', 'stack')
+
+    def __init__(self, profiler, name, rows=0, bytes_read=0):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+        self.bytes_read = bytes_read
+
+    def add(self, rows=0, bytes_read=0):
+        self.rows += rows
+        self.bytes_read += bytes_read
+
+    def __enter__(self):
+        self.profiler._stack.append(self.name)
+        self.stack = ';'.join(self.profiler._stack)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler._stack.pop()
+        self.profiler.records.append({
+            'name': self.name,
+            'stack': self.stack,
+            'start': self.start - self.profiler.origin,
+            'duration': end - self.start,
+            'rows': self.rows,
+            'bytes': self.bytes_read,
+        })
+        return False
+
+
+class Profiler:
+    """Collects nested step timings of one process."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.records = []
+        self.origin = time.perf_counter()
+        self._stack = []
+
+    def step(self, name, rows=0, path=None):
+        """Context manager timing a block; path (a file being read) is counted as bytes read."""
+        if not self.enabled:
+            return _NULL_STEP
+        return Step(self, name, rows, os.path.getsize(path) if path is not None else 0)
+
+    def reset(self):
+        self.records = []
+        self.origin = time.perf_counter()
+
+    def merge(self, records, origin, pid):
+        """Adds the records of another process (e.g. a batch worker) whose profiler started at origin."""
+        # perf_counter is the system-wide monotonic clock, so only the origins differ between processes.
+        offset = origin - self.origin
+        for record in records:
+            self.records.append(dict(record, start=record['start'] + offset, pid=pid))
+
+    def summary(self):
+        """{stack: {calls, total_s, rows, bytes}} aggregated over every record."""
+        totals = {}
+        for record in self.records:
+            entry = totals.setdefault(record['stack'], {'calls': 0, 'total_s': 0.0, 'rows': 0, 'bytes': 0})
+            entry['calls'] += 1
+            entry['total_s'] += record['duration']
+            entry['rows'] += record['rows']
+            entry['bytes'] += record['bytes']
+        return totals
+
+    def to_chrome_trace(self):
+        """Complete ('X') events loadable in chrome://tracing, Perfetto or speedscope."""
+        pid = os.getpid()
+        return {'traceEvents': [
+            {'name': r['name'], 'ph': 'X', 'pid': r.get('pid', pid), 'tid': 0,
+             'ts': r['start'] * 1e6, 'dur': r['duration'] * 1e6,
+             'args': {'rows': r['rows'], 'bytes': r['bytes']}}
+            for r in self.records
+        ]}
+
+    def to_folded(self):
+        """Collapsed stacks ('a;b;c microseconds') for flamegraph.pl; children are subtracted from parents."""
+        self_time = {}
+        for stack, entry in self.summary().items():
+            self_time[stack] = self_time.get(stack, 0.0) + entry['total_s']
+            parent = stack.rpartition(';')[0]
+            if parent:
+                self_time[parent] = self_time.get(parent, 0.0) - entry['total_s']
+        return '\n'.join(f'{stack} {max(0, round(seconds * 1e6))}' for stack, seconds in sorted(self_time.items()))
+
+    def export(self, path):
+        if path.endswith('.folded'):
+            text = self.to_folded() + '\n'
+        elif path.endswith('.trace.json'):
+            text = json.dumps(self.to_chrome_trace())
+        else:
+            text = json.dumps({'records': self.records, 'summary': self.summary()}, indent=1)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def print_summary(self, file=sys.stderr):
+        print(f"{'step':<50} {'calls':>6} {'total':>10} {'rows':>10} {'MB read':>8}", file=file)
+        for stack, entry in sorted(self.summary().items()):
+            print(f"{stack:<50} {entry['calls']:>6} {entry['total_s'] * 1000:>8.1f}ms "
+                  f"{entry['rows']:>10} {entry['bytes'] / 1e6:>8.2f}", file=file)
+
+
+PROFILER = Profiler(enabled=bool(os.environ.get(PROFILE_ENV)))
+
+
+def step(name, rows=0, path=None):
+    """Times a block on the process-wide profiler, e.g. `with step('load', path=f) as s: ...; s.add(rows=n)`."""
+    return PROFILER.step(name, rows, path)
+
+
+def profiled(name=None):
+    """Decorator timing every call of a function as one step."""
+    def decorate(func):
+        step_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.step(step_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(enabled=True):
+    PROFILER.enabled = enabled
+
+
+def _report_at_exit():
+    target = os.environ.get(PROFILE_ENV)
+    if not PROFILER.records or not target:
+        return
+    if target == '1':
+        PROFILER.print_summary()
+    else:
+        PROFILER.export(target.replace('{pid}', str(os.getpid())))
+
+
+atexit.register(_report_at_exit)
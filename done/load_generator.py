@@ -0,0 +1,125 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+from inference_server import HOST, PORT, InferenceServer, print_stats
+
+async def http_request(reader, writer, method, path, payload=None):
+    """(status, decoded JSON) of one request on an open keep-alive connection."""
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def device(host, port, model, rows, window, duration, seed, latencies, errors):
+    """One simulated wearable: sends requests back to back on its own connection until duration elapses."""
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    path = f'/predict/{model}'
+    deadline = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < deadline:
+            if model == 'tree':
+                payload = {'values': rng.random(rows).tolist()}
+            else:
+                payload = {'windows': rng.random((rows, window)).tolist()}
+            start = time.perf_counter()
+            status, _ = await http_request(reader, writer, 'POST', path, payload)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await http_request(reader, writer, 'GET', path))[1]
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host, port, devices=64, duration=5.0, model='tree', rows=1):
+    """
+    Runs `devices` concurrent clients; returns the client-side summary and the
+    server's /stats. Raises ValueError when the server does not serve model.
+    """
+    health = await get_json(host, port, '/health')
+    if model not in health['models']:
+        raise ValueError(f"the server does not serve '{model}' (models: {', '.join(health['models'])})")
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(device(host, port, model, rows, health['window'], duration, seed, latencies, errors)
+                           for seed in range(devices)))
+    elapsed = time.perf_counter() - start
+    server_stats = await get_json(host, port, '/stats')
+    p50, p99 = (np.percentile(latencies, [50, 99]) * 1000).tolist() if latencies else (None, None)
+    client = {'devices': devices, 'requests': len(latencies), 'errors': len(errors),
+              'requests_per_s': len(latencies) / elapsed, 'rows_per_s': len(latencies) * rows / elapsed,
+              'p50_ms': p50, 'p99_ms': p99}
+    return client, server_stats
+
+
+async def run(args):
+    server = None
+    host, port = args.host, args.port
+    if args.local:
+        # Server and clients share one event loop here, so latencies include the clients' own work.
+        server = InferenceServer(tflite=args.model == 'tflite', max_batch=args.max_batch,
+                                 max_latency_ms=args.max_latency_ms)
+        host, port = await server.start(host, 0)
+    try:
+        client, server_stats = await run_load(host, port, args.devices, args.duration, args.model, args.rows)
+    finally:
+        if server is not None:
+            await server.stop()
+    latency = (f"round trip p50 {client['p50_ms']:.2f} ms, p99 {client['p99_ms']:.2f} ms"
+               if client['p50_ms'] is not None else 'no requests completed')
+    print(f"{client['devices']} devices: {client['requests']} requests ({client['errors']} errors), "
+          f"{client['requests_per_s']:.0f} req/s, {client['rows_per_s']:.0f} rows/s, {latency}")
+    print("Server:")
+    print_stats(server_stats)
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate many wearables calling the inference server.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--devices', type=int, default=64, help='concurrent connections')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds of load')
+    parser.add_argument('--model', choices=['tree', 'tflite'], default='tree')
+    parser.add_argument('--rows', type=int, default=1, help='values (tree) or windows (tflite) per request')
+    parser.add_argument('--local', action='store_true', help='start a server in this process instead')
+    parser.add_argument('--max-batch', type=int, default=256, help='with --local')
+    parser.add_argument('--max-latency-ms', type=float, default=5.0, help='with --local')
+    args = parser.parse_args(argv)
+    try:
+        client = asyncio.run(run(args))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if client['errors'] or not client['requests']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
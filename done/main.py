@@ -1,11 +1,65 @@
 import os
+import argparse
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 
-def process_gsr_data(volunteer_id):
+from instrumentation import profiled, step
+from plot_render import PlotSpec, Series, render_batch, render_plot, show_plot, stage_markers
+from session_store import SessionStore
+from stage_protocol import StageProtocol
+
+# 🌟 استخدام اسم العمود الصحيح 'Resistance (Ohms)' 🌟
+GSR_DATA_COLUMN = 'Resistance (Ohms)'
+
+def clean_gsr_data(gsr_file, stages):
+    """
+    يقرأ ملف GSR الخام، ويعيد أخذ العينات بمعدل ثانية واحدة، ويطبّع القيم ويعيّن المراحل.
+    """
+    with step('load', path=gsr_file) as s:
+        gsr_df = pd.read_csv(gsr_file)
+        s.add(rows=len(gsr_df))
+    gsr_data_column = GSR_DATA_COLUMN
+
+    # التأكد من وجود عمود 'Time'
+    if 'Time' not in gsr_df.columns:
+        print(f"Error: 'Time' column not found in {gsr_file}. Skipping.")
+        return None
+    
+    with step('resample', rows=len(gsr_df)):
+        # تحويل عمود 'Time' إلى نوع زمني
+        gsr_df['Time'] = pd.to_timedelta(gsr_df['Time'], unit='s')
+        gsr_df.set_index('Time', inplace=True)
+
+        # إعادة أخذ العينات والاستقراء فقط على عمود البيانات
+        gsr_df = gsr_df[[gsr_data_column]].resample('S').mean().interpolate(method='linear')
+        gsr_df.reset_index(inplace=True)
+        gsr_df['Time'] = gsr_df['Time'].dt.total_seconds().astype(int)
+
+    # التطبيع
+    with step('normalize', rows=len(gsr_df)):
+        min_val_gsr = gsr_df[gsr_data_column].min()
+        max_val_gsr = gsr_df[gsr_data_column].max()
+        gsr_df[gsr_data_column] = (gsr_df[gsr_data_column] - min_val_gsr) / (max_val_gsr - min_val_gsr)
+        gsr_df['Time'] = gsr_df['Time'] - gsr_df['Time'].iloc[0]
+
+    # تعيين المراحل
+    with step('stage_label', rows=len(gsr_df)):
+        gsr_df['Stage'] = StageProtocol(stages).stage_categorical(gsr_df['Time'].to_numpy())
+    return gsr_df
+
+# Version of clean_gsr_data() for SessionStore keys; bump it when the cleaning changes.
+CLEANING_VERSION = 'gsr_clean/1'
+
+def cleaning_params(stages):
+    """
+    معاملات التنظيف التي تحدد مفتاح الملف المخزن في SessionStore.
+    """
+    return {'stages': stages, 'resample': '1S', 'normalization': 'min-max'}
+
+@profiled()
+def process_gsr_data(volunteer_id, show=True, render=True):
     """
     يقوم بمعالجة بيانات GSR لمتطوع معين باستخدام المراحل المحددة.
+    مع render=False يعيد مواصفات الرسم (PlotSpec) دون رسمه، ليُرسم مع بقية المتطوعين دفعة واحدة.
     """
     print(f"Processing GSR Data for Volunteer {volunteer_id}...")
 
@@ -28,65 +82,48 @@ def process_gsr_data(volunteer_id):
         print(f"File not found: {gsr_file}. Skipping...")
         return
 
-    gsr_df = pd.read_csv(gsr_file)
-    
-    # 🌟 استخدام اسم العمود الصحيح 'Resistance (Ohms)' 🌟
-    gsr_data_column = 'Resistance (Ohms)'
-
-    # التأكد من وجود عمود 'Time'
-    if 'Time' not in gsr_df.columns:
-        print(f"Error: 'Time' column not found in {gsr_file}. Skipping.")
+    params = cleaning_params(stages)
+    cleaned_file = f'gsr_data_graphs/GSR_Data-{volunteer_id}_cleaned.csv'
+    store = SessionStore()
+    gsr_df, was_cached = store.cached_frame(gsr_file, params, lambda: clean_gsr_data(gsr_file, stages),
+                                             CLEANING_VERSION)
+    if gsr_df is None:
         return
-    
-    # تحويل عمود 'Time' إلى نوع زمني
-    gsr_df['Time'] = pd.to_timedelta(gsr_df['Time'], unit='s')
-    gsr_df.set_index('Time', inplace=True)
-    
-    # إعادة أخذ العينات والاستقراء فقط على عمود البيانات
-    gsr_df = gsr_df[[gsr_data_column]].resample('S').mean().interpolate(method='linear')
-    gsr_df.reset_index(inplace=True)
-    gsr_df['Time'] = gsr_df['Time'].dt.total_seconds().astype(int)
-
-    # التطبيع
-    min_val_gsr = gsr_df[gsr_data_column].min()
-    max_val_gsr = gsr_df[gsr_data_column].max()
-    gsr_df[gsr_data_column] = (gsr_df[gsr_data_column] - min_val_gsr) / (max_val_gsr - min_val_gsr)
-    gsr_df['Time'] = gsr_df['Time'] - gsr_df['Time'].iloc[0]
-
-    # تعيين المراحل
-    gsr_df['Stage'] = ''
-    current_time = 0
-    for stage, duration in stages.items():
-        end_time = current_time + duration
-        gsr_df.loc[(gsr_df['Time'] >= current_time) & (gsr_df['Time'] < end_time), 'Stage'] = stage
-        current_time = end_time
-    gsr_df.to_csv(f'gsr_data_graphs/GSR_Data-{volunteer_id}_cleaned.csv', index=False)
+    if not was_cached or not os.path.exists(cleaned_file):
+        with step('save', rows=len(gsr_df)):
+            gsr_df.to_csv(cleaned_file, index=False)
 
     # 4. إنشاء الرسم البياني
-    cleaned_gsr_df = pd.read_csv(f'gsr_data_graphs/GSR_Data-{volunteer_id}_cleaned.csv')
-
-    plt.figure(figsize=(12, 8))
-    plt.plot(cleaned_gsr_df['Time'], cleaned_gsr_df[gsr_data_column], label='GSR (Normalized)', color='blue')
-
-    plt.title(f'Normalized GSR Data for Volunteer {volunteer_id}')
-    plt.xlabel('Time (seconds)')
-    plt.ylabel('Normalized Value (0-1)')
-    plt.legend()
-    plt.grid(True)
-
-    # إضافة خطوط المراحل
-    stages_list = list(stages.keys())
-    stage_times = [0] + list(np.cumsum(list(stages.values())))
-    for i in range(len(stages_list)):
-        plt.axvline(x=stage_times[i], color='gray', linestyle='--', linewidth=1)
-        plt.text(stage_times[i] + 5, 1.05, stages_list[i], rotation=45, ha='left', va='bottom', fontsize=8)
-
-    plt.tight_layout()
-    plt.savefig(f'gsr_data_graphs/GSR_Data-{volunteer_id}_plot.png')
-    plt.show()
+    spec = PlotSpec(
+        file=f'gsr_data_graphs/GSR_Data-{volunteer_id}_plot.png',
+        title=f'Normalized GSR Data for Volunteer {volunteer_id}',
+        xlabel='Time (seconds)',
+        ylabel='Normalized Value (0-1)',
+        series=[Series(gsr_df['Time'].to_numpy(), gsr_df[GSR_DATA_COLUMN].to_numpy(), 'GSR (Normalized)', 'blue')],
+        # إضافة خطوط المراحل
+        markers=stage_markers(stages),
+    )
+    if not render:
+        return spec
+    with step('plot', rows=len(gsr_df)):
+        plot_file = render_plot(spec)
+    if show:
+        show_plot(spec)
+    return plot_file
 
 # 5. تشغيل الكود لكل المتطوعين من 1 إلى 9
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Normalized GSR plots for volunteers 1-9.')
+    parser.add_argument('--show', action='store_true', help='also open every plot in a window')
+    args = parser.parse_args()
+
     volunteer_ids = [1, 2, 3, 4, 5, 6, 7, 8, 9]
-    for vid in volunteer_ids:
-        process_gsr_data(vid)
\ No newline at end of file
+    specs = [process_gsr_data(vid, show=False, render=False) for vid in volunteer_ids]
+    specs = [spec for spec in specs if spec is not None]
+    # رسم جميع المتطوعين بالتوازي دون نوافذ
+    with step('plot', rows=len(specs)):
+        for plot_file in render_batch(specs):
+            print(f"Plot saved to '{plot_file}'.")
+    if args.show:
+        for spec in specs:
+            show_plot(spec)
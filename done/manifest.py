@@ -0,0 +1,218 @@
+import os
+import json
+import argparse
+
+from cosinuss_reader import read_preamble, stream_type
+from session_store import file_digest
+
+DONE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(DONE_DIR, 'manifest.json')
+
+# Folders never indexed.
+SKIP_DIRS = {'.session_store', '__pycache__', '.git'}
+
+# Manifests already loaded by this process, by path.
+_loaded = {}
+
+
+def _count_rows(file_path, byte_start):
+    with open(file_path, 'rb') as f:
+        f.seek(byte_start)
+        rows = 0
+        last = b'\n'
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            rows += chunk.count(b'\n')
+            last = chunk[-1:]
+    # A last row without a trailing newline still counts.
+    return rows + (last != b'\n')
+
+
+def _body_offset(file_path, header_row):
+    """Byte offset of the first data row, i.e. just past the header row."""
+    with open(file_path, 'rb') as f:
+        for _ in range(header_row + 1):
+            f.readline()
+        return f.tell()
+
+
+def scan_file(file_path, root=DONE_DIR):
+    """
+    Manifest entry of one CSV. Cosinuss exports are identified by the
+    preamble's df_hash plus their stream name; anything else by a SHA-1 of
+    its contents.
+    """
+    stat = os.stat(file_path)
+    entry = {
+        'path': os.path.relpath(file_path, root),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'stream': None,
+        'person_label': None,
+        'df_hash': None,
+        'start_unix': None,
+    }
+
+    stream = stream_type(file_path)
+    metadata = None
+    if stream is not None:
+        try:
+            metadata = read_preamble(file_path)
+        except ValueError:
+            metadata = None
+
+    if metadata is not None and metadata.df_hash:
+        entry.update(stream=stream, person_label=metadata.person_label, df_hash=metadata.df_hash,
+                     start_unix=metadata.date_time_start_unix)
+        entry['key'] = f'{metadata.df_hash}:{stream}'
+        entry['byte_start'] = _body_offset(file_path, metadata.header_row)
+    else:
+        entry['key'] = 'sha1:' + file_digest(file_path)
+        entry['byte_start'] = _body_offset(file_path, 0)
+    entry['byte_end'] = stat.st_size
+    entry['rows'] = _count_rows(file_path, entry['byte_start'])
+    return entry
+
+
+def build_manifest(root=DONE_DIR, previous=None):
+    """
+    Scans every CSV under root. Entries of a previous manifest are reused for
+    files whose size and mtime did not change, so a rebuild only reads new or
+    modified files.
+    """
+    previous = {e['path']: e for e in (previous.entries if previous is not None else [])}
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            if not name.endswith('.csv'):
+                continue
+            file_path = os.path.join(dirpath, name)
+            stat = os.stat(file_path)
+            old = previous.get(os.path.relpath(file_path, root))
+            if old is not None and old['size'] == stat.st_size and old['mtime'] == stat.st_mtime:
+                entries.append(old)
+            else:
+                entries.append(scan_file(file_path, root))
+    return Manifest(entries, root)
+
+
+class Manifest:
+    """
+    Index of every CSV under done/ with duplicates collapsed. The first path
+    (in sorted order) of every key is the canonical copy; lookups are dict hits.
+    """
+
+    def __init__(self, entries, root=DONE_DIR):
+        self.entries = entries
+        self.root = root
+        self.by_key = {}
+        self.copies = {}
+        self.by_path = {}
+        self.by_person = {}
+        self.by_folder = {}
+        for entry in sorted(entries, key=lambda e: e['path']):
+            self.by_path[entry['path']] = entry
+            self.copies.setdefault(entry['key'], []).append(entry['path'])
+            if entry['key'] in self.by_key:
+                continue
+            self.by_key[entry['key']] = entry
+            if entry['stream'] is not None:
+                person = (entry['person_label'] or '').upper()
+                self.by_person.setdefault((person, entry['stream']), []).append(entry)
+        for entry in entries:
+            if entry['stream'] is not None:
+                self.by_folder[(os.path.dirname(entry['path']), entry['stream'])] = entry
+        for sessions in self.by_person.values():
+            sessions.sort(key=lambda e: e['start_unix'] or 0)
+
+    def path(self, entry):
+        return os.path.join(self.root, entry['path'])
+
+    def unique(self):
+        """Canonical entries, one per distinct recording or file content."""
+        return list(self.by_key.values())
+
+    def duplicates(self):
+        """{key: [paths]} of everything stored more than once."""
+        return {key: paths for key, paths in self.copies.items() if len(paths) > 1}
+
+    def is_duplicate(self, file_path):
+        """True when file_path is a non-canonical copy of an indexed file."""
+        entry = self.by_path.get(os.path.relpath(os.path.abspath(file_path), self.root))
+        return entry is not None and self.by_key[entry['key']] is not entry
+
+    def find(self, person_label, stream):
+        """Canonical entries of a person's stream (e.g. 'V14', 'heart_rate'), oldest session first."""
+        return self.by_person.get((person_label.upper(), stream), [])
+
+    def stream_file(self, folder, stream):
+        """Path of a stream inside a volunteer folder, or None; folder may be relative to the cwd."""
+        rel = os.path.relpath(os.path.abspath(folder), self.root)
+        entry = self.by_folder.get((rel, stream))
+        return self.path(entry) if entry is not None else None
+
+    def save(self, path=MANIFEST_PATH):
+        # Parallel batch workers may save at the same time, so write a private file and rename it.
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'entries': self.entries}, f, indent=1)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MANIFEST_PATH, root=DONE_DIR):
+        with open(path) as f:
+            return cls(json.load(f)['entries'], root)
+
+
+def load_manifest(path=MANIFEST_PATH, root=DONE_DIR, refresh=False):
+    """
+    Loads the saved manifest, building (and saving) it first when missing or
+    when refresh is set. A process reads the file once and reuses it.
+    """
+    manifest = _loaded.get(path)
+    if manifest is None and os.path.exists(path):
+        manifest = Manifest.load(path, root)
+    if manifest is None or refresh:
+        manifest = build_manifest(root, previous=manifest)
+        manifest.save(path)
+    _loaded[path] = manifest
+    return manifest
+
+
+def session_stream_file(folder, stream, path=MANIFEST_PATH, root=DONE_DIR):
+    """
+    Path of a stream inside a volunteer folder, or None. A miss refreshes the
+    manifest once (only new or changed files are read), so sessions added
+    after it was saved are still found.
+    """
+    found = load_manifest(path, root).stream_file(folder, stream)
+    if found is None and os.path.isdir(folder):
+        found = load_manifest(path, root, refresh=True).stream_file(folder, stream)
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Index every CSV under done/ and report duplicates.')
+    parser.add_argument('--output', default=MANIFEST_PATH)
+    parser.add_argument('--full', action='store_true', help='rescan every file instead of only changed ones')
+    args = parser.parse_args(argv)
+
+    previous = None if args.full or not os.path.exists(args.output) else Manifest.load(args.output)
+    manifest = build_manifest(previous=previous)
+    manifest.save(args.output)
+
+    duplicates = manifest.duplicates()
+    wasted = sum(manifest.by_path[p]['size'] for paths in duplicates.values() for p in paths[1:])
+    print(f"Indexed {len(manifest.entries)} files: {len(manifest.unique())} unique, "
+          f"{sum(len(p) - 1 for p in duplicates.values())} duplicate copies ({wasted / 1e6:.1f} MB).")
+    sessions = {}
+    for key, paths in duplicates.items():
+        folders = tuple(sorted({os.path.dirname(p) for p in paths}))
+        sessions.setdefault(folders, []).append(key)
+    for folders, keys in sorted(sessions.items()):
+        print(f"  {len(keys)} files duplicated across: {' | '.join(folders)}")
+    print(f"Manifest saved to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
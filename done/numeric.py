@@ -0,0 +1,12 @@
+import numpy as np
+
+
+def cumsum0(x):
+    """
+    Prefix sums with a leading 0 (float64), so sum(x[a:b]) == c[b] - c[a] for
+    every window, including empty ones; len(c) == len(x) + 1.
+    """
+    out = np.empty(len(x) + 1, dtype=np.float64)
+    out[0] = 0.0
+    np.cumsum(x, out=out[1:])
+    return out
@@ -0,0 +1,178 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from numeric import cumsum0
+
+# One line on a plot; fill_color, when set, shades the area between the line and 0.
+Series = namedtuple('Series', ['x', 'y', 'label', 'color', 'fill_color'], defaults=[None])
+
+# One group of bars (a label of None keeps it out of the legend).
+Bars = namedtuple('Bars', ['x', 'height', 'width', 'label', 'color', 'edgecolor'], defaults=['black'])
+
+# Everything needed to draw one report PNG. series holds Series and Bars,
+# markers are (x, text) vertical lines, annotation is an optional (text, color)
+# box in the top-right corner, xticks an optional (positions, labels) pair,
+# texts (x, y, text) labels in data coordinates, caption a note under the
+# axes and legend keyword arguments for ax.legend().
+PlotSpec = namedtuple('PlotSpec', ['file', 'title', 'xlabel', 'ylabel', 'series', 'markers', 'annotation',
+                                   'figsize', 'xticks', 'texts', 'caption', 'legend'],
+                      defaults=[(), None, (12, 8), None, (), None, None])
+
+# Points kept per series for every horizontal pixel of the figure.
+POINTS_PER_PIXEL = 2
+
+_figures = {}
+
+
+def minmax_decimate(x, y, n_buckets):
+    """
+    Keeps the minimum and maximum sample of n_buckets equal index ranges, in
+    their original order. Peaks survive, so the drawn envelope matches the
+    raw signal at pixel resolution. The first NaN of a bucket is kept too, so
+    gaps still break the line.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return x, y
+    starts = (np.arange(n_buckets) * n) // n_buckets
+    counts = np.diff(np.r_[starts, n])
+    bucket = np.repeat(np.arange(n_buckets), counts)
+    picks = []
+    for extreme in (np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts)):
+        # First sample of every bucket equal to that bucket's extreme.
+        hits = np.flatnonzero(y == np.repeat(extreme, counts))
+        picks.append(hits[np.unique(bucket[hits], return_index=True)[1]])
+    gaps = np.flatnonzero(np.isnan(y))
+    picks.append(gaps[np.unique(bucket[gaps], return_index=True)[1]])
+    idx = np.unique(np.concatenate(picks))
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling to n_out points: from every
+    bucket it keeps the point forming the largest triangle with the previous
+    pick and the next bucket's mean. Bucket means come from one cumsum.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cx = cumsum0(x)
+    cy = cumsum0(y)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            nlo, nhi = hi, max(edges[i + 2], hi + 1)
+            avg_x = (cx[nhi] - cx[nlo]) / (nhi - nlo)
+            avg_y = (cy[nhi] - cy[nlo]) / (nhi - nlo)
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+def decimate(x, y, max_points, method='minmax'):
+    """Reduces a series to about max_points points ('minmax' or 'lttb'); short series are returned as is."""
+    if len(y) <= max_points:
+        return np.asarray(x), np.asarray(y)
+    if method == 'lttb':
+        return lttb(x, y, max_points)
+    return minmax_decimate(x, y, max_points // 2)
+
+
+def stage_markers(stages):
+    """(start time, stage name) of every stage in a {name: duration} protocol."""
+    starts = np.concatenate([[0], np.cumsum(list(stages.values()))])
+    return list(zip(starts[:-1].tolist(), stages.keys()))
+
+
+def draw(fig, spec, method='minmax'):
+    """Draws spec onto fig with every series decimated to the figure's pixel width."""
+    max_points = int(fig.get_figwidth() * fig.dpi * POINTS_PER_PIXEL)
+    ax = fig.add_subplot()
+    for series in spec.series:
+        if isinstance(series, Bars):
+            ax.bar(series.x, series.height, width=series.width, color=series.color, edgecolor=series.edgecolor,
+                   label=series.label)
+            continue
+        x, y = decimate(series.x, series.y, max_points, method)
+        ax.plot(x, y, label=series.label, color=series.color)
+        if series.fill_color is not None:
+            ax.fill_between(x, 0, y, color=series.fill_color, alpha=0.1)
+
+    ax.set_title(spec.title)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+    if spec.annotation is not None:
+        text, color = spec.annotation
+        ax.text(0.95, 0.9, text, fontsize=15, color=color, ha='right', transform=ax.transAxes,
+                bbox=dict(boxstyle="round,pad=0.3", fc="white", ec="black", lw=1))
+    if spec.xticks is not None:
+        positions, labels = spec.xticks
+        ax.set_xticks(positions)
+        ax.set_xticklabels(labels, fontsize=8, rotation=45, ha='right')
+    for x, y, text in spec.texts:
+        ax.text(x, y, text, ha='center', color='black', fontsize=10)
+    ax.legend(**(spec.legend or {}))
+    ax.grid(True)
+    for x, text in spec.markers:
+        ax.axvline(x=x, color='gray', linestyle='--', linewidth=1)
+        ax.text(x + 5, 1.05, text, rotation=45, ha='left', va='bottom', fontsize=8)
+    if spec.caption is not None:
+        fig.text(0.5, 0.01, spec.caption, wrap=True, ha='center', va='bottom', fontsize=10)
+        fig.tight_layout(rect=(0, 0.05, 1, 1))
+    else:
+        fig.tight_layout()
+    return ax
+
+
+def _figure(figsize):
+    # Figures are created once per size and cleared between plots; they never touch pyplot.
+    fig = _figures.get(figsize)
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        _figures[figsize] = fig
+    fig.clear()
+    return fig
+
+
+def render_plot(spec, method='minmax'):
+    """Renders spec to its PNG file headless and returns the file path."""
+    folder = os.path.dirname(spec.file)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    fig = _figure(tuple(spec.figsize))
+    draw(fig, spec, method)
+    fig.savefig(spec.file)
+    return spec.file
+
+
+def show_plot(spec, method='minmax'):
+    """Opens spec in an interactive pyplot window (blocks until it is closed)."""
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=spec.figsize)
+    draw(fig, spec, method)
+    plt.show()
+
+
+def render_batch(specs, workers=None, method='minmax'):
+    """Renders many specs in a process pool; returns their file paths in order."""
+    specs = list(specs)
+    if workers == 1 or len(specs) < 2:
+        return [render_plot(spec, method) for spec in specs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_plot, specs, [method] * len(specs)))
@@ -0,0 +1,200 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from cosinuss_reader import find_session_files, read_preamble
+from numeric import cumsum0
+
+PPG_STREAM = 'ppg_ir_ppg_ambient_ppg_red'
+
+# Band-pass as a difference of two moving averages: the short one smooths
+# sensor noise, the long one (about one beat) removes the baseline drift.
+SMOOTH_S = 0.05
+BASELINE_S = 0.75
+
+# Shortest allowed beat-to-beat interval (200 bpm) and the window of the
+# RMS used as adaptive peak threshold.
+REFRACTORY_S = 0.3
+RMS_WINDOW_S = 2.0
+PEAK_RMS_FACTOR = 0.5
+
+
+def moving_average(x, width):
+    """Centered moving average from one cumsum; windows shrink at the edges."""
+    n = len(x)
+    half = width // 2
+    c = cumsum0(x)
+    idx = np.arange(n)
+    lo = np.maximum(idx - half, 0)
+    hi = np.minimum(idx + half + 1, n)
+    return (c[hi] - c[lo]) / (hi - lo)
+
+
+def band_pass(ppg, fs, smooth_s=SMOOTH_S, baseline_s=BASELINE_S):
+    """
+    Pulse component of a raw ppg_ir signal, sign-flipped so each heartbeat is
+    a positive peak (more blood in the ear absorbs more IR light).
+    """
+    x = np.asarray(ppg, dtype=np.float64)
+    smooth = moving_average(x, max(1, int(round(smooth_s * fs))))
+    baseline = moving_average(x, max(1, int(round(baseline_s * fs))))
+    return baseline - smooth
+
+
+def _sliding_max(x, before, after):
+    # Max of x[i - before : i + after + 1] for every i, padded with -inf at the edges.
+    padded = np.concatenate([np.full(before, -np.inf), x, np.full(after, -np.inf)])
+    return np.lib.stride_tricks.sliding_window_view(padded, before + after + 1).max(axis=1)
+
+
+def find_peaks(x, fs, refractory_s=REFRACTORY_S, rms_window_s=RMS_WINDOW_S, rms_factor=PEAK_RMS_FACTOR):
+    """
+    Indices of beats in a band-passed signal: samples that are the maximum
+    of the refractory window on both sides (strictly greater than everything
+    before them, so plateaus give one peak) and rise above rms_factor times
+    the local RMS.
+    """
+    r = max(1, int(round(refractory_s * fs)))
+    # left[i] is the max of x[i - r : i] (excluding i), right[i] of x[i : i + r + 1].
+    left = np.concatenate([[-np.inf], _sliding_max(x, r - 1, 0)[:-1]])
+    right = _sliding_max(x, 0, r)
+    rms = np.sqrt(moving_average(x * x, max(1, int(round(rms_window_s * fs)))))
+    return np.flatnonzero((x > left) & (x >= right) & (x > rms_factor * rms))
+
+
+def refine_peaks(x, peaks):
+    """Sub-sample peak offsets (-0.5..0.5) from a parabola through each peak and its neighbours."""
+    inner = (peaks > 0) & (peaks < len(x) - 1)
+    offset = np.zeros(len(peaks))
+    p = peaks[inner]
+    a, b, c = x[p - 1], x[p], x[p + 1]
+    denom = a - 2 * b + c
+    with np.errstate(invalid='ignore', divide='ignore'):
+        offset[inner] = np.where(denom != 0, 0.5 * (a - c) / denom, 0.0)
+    return np.clip(offset, -0.5, 0.5)
+
+
+def _edge(fs):
+    # Samples at either end of a recording where the baseline filter lacks context
+    # and drift passes for pulses; peaks there are not beats.
+    return int(round(BASELINE_S * fs)) // 2
+
+
+def detect_beats(times, ppg, fs=None):
+    """Beat times (seconds, same clock as times) of a raw ppg_ir series."""
+    times = np.asarray(times, dtype=np.float64)
+    if len(times) < 3:
+        return np.empty(0)
+    fs = fs or 1.0 / np.median(np.diff(times))
+    x = band_pass(ppg, fs)
+    peaks = find_peaks(x, fs)
+    edge = _edge(fs)
+    peaks = peaks[(peaks >= edge) & (peaks < len(x) - edge)]
+    offset = refine_peaks(x, peaks)
+    # Interpolate on the real timestamps so sample jitter does not leak into RR.
+    return np.interp(peaks + offset, np.arange(len(times)), times)
+
+
+def rr_from_beats(beat_times):
+    """(times, rr_ms) with each interval stamped at the beat that ends it, like the device's rr_int."""
+    beat_times = np.asarray(beat_times, dtype=np.float64)
+    return beat_times[1:], np.diff(beat_times) * 1000.0
+
+
+class StreamingBeatDetector:
+    """
+    detect_beats() over a signal fed in chunks, in constant memory. Only a
+    tail long enough for the filters' context is carried between chunks, so
+    beats come out identical to a whole-signal run.
+    """
+
+    def __init__(self, fs):
+        self.fs = fs
+        context = max(int(round(BASELINE_S * fs)), int(round(RMS_WINDOW_S * fs)))
+        self.pad = context // 2 + int(round(REFRACTORY_S * fs)) + 2
+        self._times = np.empty(0)
+        self._values = np.empty(0)
+        self._started = False
+        self._last_beat = -np.inf
+
+    def _detect(self, final):
+        times, values = self._times, self._values
+        if len(times) < 3:
+            return np.empty(0)
+        x = band_pass(values, self.fs)
+        peaks = find_peaks(x, self.fs)
+        lo = self.pad if self._started else _edge(self.fs)
+        hi = len(times) - _edge(self.fs) if final else len(times) - self.pad
+        peaks = peaks[(peaks >= lo) & (peaks < hi)]
+        beats = np.interp(peaks + refine_peaks(x, peaks), np.arange(len(times)), times)
+        beats = beats[beats > self._last_beat + 1e-6]
+        if len(beats):
+            self._last_beat = beats[-1]
+        return beats
+
+    def push(self, times, values):
+        """Adds a chunk; returns the beat times that can no longer change."""
+        self._times = np.concatenate([self._times, np.asarray(times, dtype=np.float64)])
+        self._values = np.concatenate([self._values, np.asarray(values, dtype=np.float64)])
+        if len(self._times) < 3 * self.pad:
+            return np.empty(0)
+        beats = self._detect(final=False)
+        keep = 2 * self.pad
+        self._times, self._values = self._times[-keep:], self._values[-keep:]
+        self._started = True
+        return beats
+
+    def flush(self):
+        """Beats in the remaining tail at the end of the recording."""
+        return self._detect(final=True)
+
+
+def iter_ppg_chunks(file_path, chunk_rows=200_000, column='ppg_ir'):
+    """(times, values) chunks of a Cosinuss PPG CSV read without loading the whole file."""
+    metadata = read_preamble(file_path)
+    reader = pd.read_csv(file_path, skiprows=metadata.header_row, usecols=['time', column],
+                         dtype={'time': np.float64, column: np.float64}, chunksize=chunk_rows)
+    for chunk in reader:
+        yield chunk['time'].to_numpy(), chunk[column].to_numpy()
+
+
+def stream_beats(file_path, chunk_rows=200_000, fs=None):
+    """Beat times of a PPG file of any length, streamed in chunk_rows pieces."""
+    chunks = iter_ppg_chunks(file_path, chunk_rows)
+    detector = None
+    beats = []
+    for times, values in chunks:
+        if detector is None:
+            detector = StreamingBeatDetector(fs or 1.0 / np.median(np.diff(times)))
+        beats.append(detector.push(times, values))
+    if detector is not None:
+        beats.append(detector.flush())
+    return np.concatenate(beats) if beats else np.empty(0)
+
+
+def session_rr(folder, chunk_rows=200_000):
+    """(times, rr_ms) derived from the PPG of a session folder."""
+    files = find_session_files(folder)
+    if PPG_STREAM not in files:
+        raise FileNotFoundError(f"No {PPG_STREAM} stream in {folder}")
+    return rr_from_beats(stream_beats(files[PPG_STREAM], chunk_rows))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Detect heartbeats in the raw PPG of a Cosinuss session.')
+    parser.add_argument('folder')
+    parser.add_argument('--chunk-rows', type=int, default=200_000)
+    parser.add_argument('--output', default=None, help='CSV of beat times and RR intervals')
+    args = parser.parse_args(argv)
+
+    times, rr_ms = session_rr(args.folder, args.chunk_rows)
+    print(f"{len(rr_ms) + 1} beats, median RR {np.median(rr_ms):.0f} ms "
+          f"({60000 / np.median(rr_ms):.0f} bpm)")
+    if args.output:
+        pd.DataFrame({'time': times, 'rr_int': rr_ms}).to_csv(args.output, index=False, float_format='%.3f')
+        print(f"Saved to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,28 @@
 import joblib
 import pandas as pd
 
+from batch_predict import TreeBatchPredictor
+from instrumentation import step
+
 # Loading the trained model here 
 model = joblib.load('gsr_stress_model.pkl')
+batch_predictor = TreeBatchPredictor(model)
 
 def predict_stress_level(gsr_value):
     # Prepare the input in the correct format for the model
     input_data = pd.DataFrame([[gsr_value]], columns=['Resistance (Ohms)'])
 
     # Getting the prediction
-    prediction = model.predict(input_data)
+    with step('predict', rows=1):
+        prediction = model.predict(input_data)
 
     return prediction[0]
 
+def predict_stress_levels(gsr_values):
+    # Predict a whole array of GSR values in one call; returns (labels, probabilities)
+    with step('predict_batch', rows=len(gsr_values)):
+        return batch_predictor.predict(gsr_values)
+
 if __name__ == '__main__':
     ####################################################################
     # Enter the GSR value that we need here to predict the stress level
@@ -1,12 +1,87 @@
 import os
-import pandas as pd
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-import glob
-
-def process_volunteer_data(volunteer_id):
+import pandas as pd
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cosinuss_reader import find_cosinuss_folder, load_stream
+from instrumentation import profiled, step
+from manifest import session_stream_file
+from plot_render import PlotSpec, Series, render_batch, render_plot, show_plot, stage_markers
+from quality import QUALITY_PARAMS, build_quality_mask, quality_files, valid_at
+from session_store import SessionStore
+from stage_protocol import StageProtocol
+
+# إصدارات دوال التنظيف لمفاتيح SessionStore؛ تُرفع عند تغيير طريقة التنظيف
+GSR_CACHE_VERSION = 'presentation_gsr/1'
+HR_CACHE_VERSION = 'presentation_hr/2'  # 2: الثواني غير الصالحة تصبح NaN بدلًا من حذفها
+
+def clean_gsr_data(gsr_file, stages):
+    """
+    يقرأ ملف GSR الخام، ويعيد أخذ العينات بمعدل ثانية واحدة، ويطبّع القيم ويعيّن المراحل.
+    """
+    with step('load_gsr', path=gsr_file) as s:
+        gsr_df = pd.read_csv(gsr_file)
+        s.add(rows=len(gsr_df))
+
+    with step('resample', rows=len(gsr_df)):
+        gsr_df['Time'] = pd.to_timedelta(gsr_df['Time'], unit='s')
+        gsr_df.set_index('Time', inplace=True)
+        gsr_df = gsr_df[['Resistance (Ohms)']].resample('S').mean().interpolate(method='linear')
+        gsr_df.reset_index(inplace=True)
+        gsr_df['Time'] = gsr_df['Time'].dt.total_seconds().astype(int)
+
+    with step('normalize', rows=len(gsr_df)):
+        min_val_gsr = gsr_df['Resistance (Ohms)'].min()
+        max_val_gsr = gsr_df['Resistance (Ohms)'].max()
+        gsr_df['Resistance (Ohms)'] = (gsr_df['Resistance (Ohms)'] - min_val_gsr) / (max_val_gsr - min_val_gsr)
+        gsr_df['Time'] = gsr_df['Time'] - gsr_df['Time'].iloc[0]
+
+    with step('stage_label', rows=len(gsr_df)):
+        gsr_df['Stage'] = StageProtocol(stages).stage_categorical(gsr_df['Time'].to_numpy())
+    return gsr_df
+
+def clean_hr_data(hr_file, stages):
+    """
+    يقرأ ملف معدل ضربات القلب من Cosinuss، ويعيد أخذ العينات ويطبّع القيم ويعيّن المراحل.
+    """
+    with step('load_hr', path=hr_file) as s:
+        _, hr_columns = load_stream(hr_file)
+        hr_df = pd.DataFrame(hr_columns)
+        s.add(rows=len(hr_df))
+
+    with step('resample', rows=len(hr_df)):
+        hr_df['time'] = pd.to_timedelta(hr_df['time'], unit='s')
+        hr_df.set_index('time', inplace=True)
+        hr_df = hr_df[['heart_rate']].resample('S').mean().interpolate(method='linear')
+        hr_df.reset_index(inplace=True)
+        hr_df['time'] = hr_df['time'].dt.total_seconds().astype(int)
+        hr_df.dropna(inplace=True)
+    t0 = hr_df['time'].iloc[0]
+
+    # الثواني المسجلة أثناء الحركة أو سوء تثبيت السماعة أو انقطاع البلوتوث تصبح NaN (انظر quality.py)
+    # بدلًا من حذفها، حتى لا يصل الرسم خطًا مستقيمًا عبر الفجوة
+    with step('quality_mask', rows=len(hr_df)):
+        if quality_files(os.path.dirname(hr_file)):
+            mask = build_quality_mask(os.path.dirname(hr_file))
+            hr_df.loc[~valid_at(mask, hr_df['time'].to_numpy() + 0.5), 'heart_rate'] = np.nan
+
+    with step('normalize', rows=len(hr_df)):
+        min_val_hr = hr_df['heart_rate'].min()
+        max_val_hr = hr_df['heart_rate'].max()
+        hr_df['heart_rate'] = (hr_df['heart_rate'] - min_val_hr) / (max_val_hr - min_val_hr)
+        hr_df['time'] = hr_df['time'] - t0
+
+    with step('stage_label', rows=len(hr_df)):
+        hr_df['Stage'] = StageProtocol(stages).stage_categorical(hr_df['time'].to_numpy())
+    return hr_df
+
+@profiled()
+def process_volunteer_data(volunteer_id, show=True, render=True):
     """
     يقوم بمعالجة بيانات GSR ومعدل ضربات القلب لمتطوع معين.
+    مع render=False يعيد مواصفات الرسم (PlotSpec) دون رسمه، ليُرسم مع بقية المتطوعين دفعة واحدة.
     """
     print(f"Processing data for Volunteer {volunteer_id}...")
 
@@ -29,85 +104,65 @@ def process_volunteer_data(volunteer_id):
         print(f"GSR file not found for Volunteer {volunteer_id}. Skipping...")
         return
 
-    gsr_df = pd.read_csv(gsr_file)
-    gsr_df['Time'] = pd.to_timedelta(gsr_df['Time'], unit='s')
-    gsr_df.set_index('Time', inplace=True)
-    gsr_df = gsr_df[['Resistance (Ohms)']].resample('S').mean().interpolate(method='linear')
-    gsr_df.reset_index(inplace=True)
-    gsr_df['Time'] = gsr_df['Time'].dt.total_seconds().astype(int)
-
-    min_val_gsr = gsr_df['Resistance (Ohms)'].min()
-    max_val_gsr = gsr_df['Resistance (Ohms)'].max()
-    gsr_df['Resistance (Ohms)'] = (gsr_df['Resistance (Ohms)'] - min_val_gsr) / (max_val_gsr - min_val_gsr)
-    gsr_df['Time'] = gsr_df['Time'] - gsr_df['Time'].iloc[0]
-
-    gsr_df['Stage'] = ''
-    current_time = 0
-    for stage, duration in stages.items():
-        end_time = current_time + duration
-        gsr_df.loc[(gsr_df['Time'] >= current_time) & (gsr_df['Time'] < end_time), 'Stage'] = stage
-        current_time = end_time
-    gsr_df.to_csv(f'graphing/GSR-{volunteer_id}_cleaned.csv', index=False)
+    params = {'stages': stages, 'resample': '1S', 'normalization': 'min-max'}
+    store = SessionStore()
+    gsr_cleaned_file = f'graphing/GSR-{volunteer_id}_cleaned.csv'
+    gsr_df, was_cached = store.cached_frame(gsr_file, params, lambda: clean_gsr_data(gsr_file, stages),
+                                             GSR_CACHE_VERSION)
+    if not was_cached or not os.path.exists(gsr_cleaned_file):
+        with step('save', rows=len(gsr_df)):
+            gsr_df.to_csv(gsr_cleaned_file, index=False)
 
     # 4. معالجة وحفظ بيانات معدل ضربات القلب
-    hr_file_pattern = f'v-{volunteer_id}/*_heart_rate.csv'
-    hr_files = glob.glob(hr_file_pattern)
-    if not hr_files:
+    # المجلدات مسماة بأشكال مختلفة ('v-10', 'V-14', 'V12', 'csv-v8')
+    hr_folder = find_cosinuss_folder('.', volunteer_id)
+    hr_file = session_stream_file(hr_folder, 'heart_rate') if hr_folder is not None else None
+    if hr_file is None:
         print(f"Heart rate file not found for Volunteer {volunteer_id}. Skipping...")
         return
-        
-    hr_file = hr_files[0] # Get the first file that matches the pattern
-
-    hr_df = pd.read_csv(hr_file, skiprows=10)
-    hr_df.columns = ['time', 'heart_rate']
-    
-    hr_df['time'] = pd.to_timedelta(hr_df['time'], unit='s')
-    hr_df.set_index('time', inplace=True)
-    hr_df['heart_rate'] = pd.to_numeric(hr_df['heart_rate'], errors='coerce')
-    hr_df = hr_df[['heart_rate']].resample('S').mean().interpolate(method='linear')
-    hr_df.reset_index(inplace=True)
-    hr_df['time'] = hr_df['time'].dt.total_seconds().astype(int)
-    hr_df.dropna(inplace=True)
-    
-    min_val_hr = hr_df['heart_rate'].min()
-    max_val_hr = hr_df['heart_rate'].max()
-    hr_df['heart_rate'] = (hr_df['heart_rate'] - min_val_hr) / (max_val_hr - min_val_hr)
-    hr_df['time'] = hr_df['time'] - hr_df['time'].iloc[0]
-
-    hr_df['Stage'] = ''
-    current_time = 0
-    for stage, duration in stages.items():
-        end_time = current_time + duration
-        hr_df.loc[(hr_df['time'] >= current_time) & (hr_df['time'] < end_time), 'Stage'] = stage
-        current_time = end_time
-    hr_df.to_csv(f'graphing/V{volunteer_id}_heart_rate_cleaned.csv', index=False)
 
-    # 5. إنشاء الرسم البياني
-    cleaned_gsr_df = pd.read_csv(f'graphing/GSR-{volunteer_id}_cleaned.csv')
-    cleaned_hr_df = pd.read_csv(f'graphing/V{volunteer_id}_heart_rate_cleaned.csv')
-
-    plt.figure(figsize=(12, 8))
-    plt.plot(cleaned_gsr_df['Time'], cleaned_gsr_df['Resistance (Ohms)'], label='GSR (Normalized)', color='blue')
-    plt.plot(cleaned_hr_df['time'], cleaned_hr_df['heart_rate'], label='Heart Rate (Normalized)', color='red')
-
-    plt.title(f'Normalized GSR and Heart Rate for Volunteer {volunteer_id}')
-    plt.xlabel('Time (seconds)')
-    plt.ylabel('Normalized Value (0-1)')
-    plt.legend()
-    plt.grid(True)
+    hr_cleaned_file = f'graphing/V{volunteer_id}_heart_rate_cleaned.csv'
+    hr_sources = [hr_file] + quality_files(os.path.dirname(hr_file))
+    hr_params = dict(params, quality=QUALITY_PARAMS)
+    hr_df, was_cached = store.cached_frame(hr_sources, hr_params, lambda: clean_hr_data(hr_file, stages),
+                                           HR_CACHE_VERSION)
+    if not was_cached or not os.path.exists(hr_cleaned_file):
+        with step('save', rows=len(hr_df)):
+            hr_df.to_csv(hr_cleaned_file, index=False)
 
-    stages_list = list(stages.keys())
-    stage_times = [0] + list(np.cumsum(list(stages.values())))
-    for i in range(len(stages_list)):
-        plt.axvline(x=stage_times[i], color='gray', linestyle='--', linewidth=1)
-        plt.text(stage_times[i] + 5, 1.05, stages_list[i], rotation=45, ha='left', va='bottom', fontsize=8)
-
-    plt.tight_layout()
-    plt.savefig(f'graphing/volunteer_{volunteer_id}_gsr_hr_plot.png')
-    plt.show()
+    # 5. إنشاء الرسم البياني
+    spec = PlotSpec(
+        file=f'graphing/volunteer_{volunteer_id}_gsr_hr_plot.png',
+        title=f'Normalized GSR and Heart Rate for Volunteer {volunteer_id}',
+        xlabel='Time (seconds)',
+        ylabel='Normalized Value (0-1)',
+        series=[
+            Series(gsr_df['Time'].to_numpy(), gsr_df['Resistance (Ohms)'].to_numpy(), 'GSR (Normalized)', 'blue'),
+            Series(hr_df['time'].to_numpy(), hr_df['heart_rate'].to_numpy(), 'Heart Rate (Normalized)', 'red'),
+        ],
+        markers=stage_markers(stages),
+    )
+    if not render:
+        return spec
+    with step('plot', rows=len(gsr_df) + len(hr_df)):
+        plot_file = render_plot(spec)
+    if show:
+        show_plot(spec)
+    return plot_file
 
 # 🌟 6. Main execution loop for all volunteers 🌟
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GSR and heart rate plots for every presentation volunteer.')
+    parser.add_argument('--show', action='store_true', help='also open every plot in a window')
+    args = parser.parse_args()
+
     volunteer_ids = [8, 9, 10, 11, 12, 13, 14, 15, 16]
-    for vid in volunteer_ids:
-        process_volunteer_data(vid)
\ No newline at end of file
+    specs = [process_volunteer_data(vid, show=False, render=False) for vid in volunteer_ids]
+    specs = [spec for spec in specs if spec is not None]
+    # رسم جميع المتطوعين بالتوازي دون نوافذ
+    with step('plot', rows=len(specs)):
+        for plot_file in render_batch(specs):
+            print(f"Plot saved to '{plot_file}'.")
+    if args.show:
+        for spec in specs:
+            show_plot(spec)
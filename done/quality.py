@@ -0,0 +1,160 @@
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from alignment import asof, block_mean
+from ble_gaps import BLE_STREAMS, GAP_FACTOR, MAX_GAP_S, gap_mask, session_gaps
+from cosinuss_reader import find_session_files, load_stream
+from numeric import cumsum0
+
+# Lowest acceptable reading of every quality stream (quality and ppg_quality are 0-100 scores,
+# perfusion_ir is the PPG perfusion index in percent).
+QUALITY_THRESHOLDS = {
+    'quality': 30.0,
+    'ppg_quality': 30.0,
+    'perfusion_ir': 0.1,
+}
+
+# Motion: acc_mag standard deviation (g) over ACC_WINDOW_S seconds above which a span is invalid.
+ACC_STD_MAX = 0.05
+ACC_WINDOW_S = 4
+
+# Windows with less than this share of valid seconds are dropped from training.
+MIN_VALID_FRACTION = 0.8
+
+# Streams whose files decide the mask (and therefore belong in cache keys).
+QUALITY_STREAMS = tuple(QUALITY_THRESHOLDS) + ('acc_mag',) + tuple(BLE_STREAMS.values())
+
+# Everything that changes a mask, for cache keys.
+QUALITY_PARAMS = {'thresholds': QUALITY_THRESHOLDS, 'acc_std_max': ACC_STD_MAX, 'acc_window_s': ACC_WINDOW_S,
+                  'max_gap_s': MAX_GAP_S, 'gap_factor': GAP_FACTOR}
+
+# time: session-relative seconds of every grid bin (seconds since the preamble's start),
+# valid: combined mask, reasons: {criterion: bool array, False where that criterion failed}.
+QualityMask = namedtuple('QualityMask', ['time', 'valid', 'reasons', 'rate_hz'])
+
+
+def rolling_std(values, window):
+    """Standard deviation of each centered `window` bin run of a 1-D series (NaN bins ignored)."""
+    ok = ~np.isnan(values)
+    x = np.where(ok, values, 0.0)
+    kernel = np.ones(window)
+    n = np.convolve(ok.astype(np.float64), kernel, mode='same')
+    s = np.convolve(x, kernel, mode='same')
+    s2 = np.convolve(x * x, kernel, mode='same')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = s / n
+        return np.sqrt(np.maximum(s2 / n - mean * mean, 0.0))
+
+
+def build_quality_mask(folder, rate_hz=1.0, thresholds=QUALITY_THRESHOLDS, acc_std_max=ACC_STD_MAX,
+                       acc_window_s=ACC_WINDOW_S, max_gap_s=MAX_GAP_S):
+    """
+    Validity of every 1/rate_hz bin of a Cosinuss session: each quality stream
+    must be at or above its threshold, acc_mag must be still and no BLE gap of
+    max_gap_s seconds or more may overlap the bin (None keeps gaps). Bins a
+    stream says nothing about (missing stream, no reading nearby) are not
+    flagged by it.
+    """
+    files = find_session_files(folder)
+    loaded = {}
+    start_unix = None
+    for stream in tuple(thresholds) + ('acc_mag',):
+        if stream not in files:
+            continue
+        metadata, columns = load_stream(files[stream])
+        start_unix = metadata.date_time_start_unix if start_unix is None else start_unix
+        if len(columns['time']):
+            times = columns['time'] + (metadata.date_time_start_unix - start_unix)
+            loaded[stream] = (times, columns[stream].astype(np.float64))
+    t_end = max((times[-1] for times, _ in loaded.values()), default=0.0)
+    n_bins = int(np.floor(t_end * rate_hz)) + 1
+    grid = np.arange(n_bins) / rate_hz
+
+    reasons = {}
+    for stream, minimum in thresholds.items():
+        if stream in loaded:
+            times, values = loaded[stream]
+            # Quality scores arrive every 1-2 s; a reading holds until the next one.
+            level = asof(times, values, grid, tolerance=3.0)[:, 0]
+            reasons[stream] = ~(level < minimum)
+    if 'acc_mag' in loaded:
+        times, values = loaded['acc_mag']
+        acc = block_mean(times, values, 0.0, rate_hz, n_bins)[:, 0]
+        window = max(1, int(round(acc_window_s * rate_hz)))
+        # Per-bin means hide within-bin shaking, so combine them with the per-bin spread.
+        acc_sq = block_mean(times, values * values, 0.0, rate_hz, n_bins)[:, 0]
+        within = np.sqrt(np.maximum(acc_sq - acc * acc, 0.0))
+        spread = np.fmax(rolling_std(acc, window), within)
+        reasons['acc_mag'] = ~(spread > acc_std_max)
+    if max_gap_s is not None and any(stream in files for stream in BLE_STREAMS.values()):
+        # Streams are interpolated or held across dropped packets; long gaps hold no real data.
+        reasons['ble_gap'] = ~gap_mask(session_gaps(folder).gaps, grid, rate_hz, max_gap_s)
+
+    valid = np.ones(n_bins, dtype=bool)
+    for ok in reasons.values():
+        valid &= ok
+    return QualityMask(grid, valid, reasons, rate_hz)
+
+
+def quality_files(folder):
+    """Paths of the quality streams present in a session folder."""
+    files = find_session_files(folder)
+    return [files[stream] for stream in QUALITY_STREAMS if stream in files]
+
+
+def shift_mask(mask, offset):
+    """The mask on a clock shifted by offset seconds (e.g. -t0 for streams that start at 0)."""
+    return mask._replace(time=mask.time + offset)
+
+
+def valid_at(mask, times):
+    """Mask value at each time; times outside the mask are treated as valid."""
+    times = np.asarray(times, dtype=np.float64)
+    idx = np.floor((times - mask.time[0]) * mask.rate_hz).astype(np.int64) if len(mask.time) else None
+    out = np.ones(len(times), dtype=bool)
+    if idx is None:
+        return out
+    inside = (idx >= 0) & (idx < len(mask.valid))
+    out[inside] = mask.valid[idx[inside]]
+    return out
+
+
+def valid_fraction(mask, starts, ends):
+    """Share of valid seconds in every [start, end) window, from one cumsum over the seconds."""
+    starts = np.asarray(starts)
+    ends = np.asarray(ends)
+    n_seconds = int(ends.max()) if len(ends) else 0
+    valid = valid_at(mask, np.arange(n_seconds) + 0.5).astype(np.float64)
+    c = cumsum0(valid)
+    return (c[ends] - c[starts]) / np.maximum(ends - starts, 1)
+
+
+def invalid_spans(valid, time):
+    """[(start, end)] of every run of invalid bins."""
+    edges = np.diff(np.concatenate([[0], (~valid).astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    step = time[1] - time[0] if len(time) > 1 else 1.0
+    return [(float(time[s]), float(time[e - 1] + step)) for s, e in zip(starts, ends)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report the signal-quality mask of a Cosinuss session.')
+    parser.add_argument('folder')
+    parser.add_argument('--rate', type=float, default=1.0, help='mask resolution in Hz')
+    parser.add_argument('--acc-std-max', type=float, default=ACC_STD_MAX)
+    args = parser.parse_args(argv)
+
+    mask = build_quality_mask(args.folder, rate_hz=args.rate, acc_std_max=args.acc_std_max)
+    print(f"{args.folder}: {mask.valid.mean() * 100:.1f}% of {len(mask.valid) / args.rate:.0f}s valid")
+    for criterion, ok in mask.reasons.items():
+        spans = invalid_spans(ok, mask.time)
+        print(f"  {criterion:>12}: {(~ok).mean() * 100:5.1f}% flagged in {len(spans)} spans")
+    for start, end in invalid_spans(mask.valid, mask.time)[:20]:
+        print(f"  invalid {start:8.1f}s - {end:8.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import os
+import json
+import hashlib
+import zipfile
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = '.session_store'
+
+# Suffix of the extra array holding the categories of a categorical column.
+_CATEGORIES_SUFFIX = '__categories'
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(source_paths, params, version):
+    """
+    Key of a cached result: the contents of every source file, the processing
+    parameters and the consumer's version string (e.g. 'gsr_clean/1'). Bump
+    the version when the code producing the result changes, so entries
+    written by the old code are no longer served.
+    """
+    if isinstance(source_paths, (str, os.PathLike)):
+        source_paths = [source_paths]
+    digest = hashlib.sha1()
+    digest.update(str(version).encode() + b'\0')
+    for file_path in source_paths:
+        digest.update(file_digest(file_path).encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _frame_to_arrays(df):
+    arrays = {}
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[column] = series.cat.codes.to_numpy()
+            arrays[column + _CATEGORIES_SUFFIX] = np.asarray(series.cat.categories, dtype=str)
+        elif series.dtype == object:
+            arrays[column] = series.to_numpy(dtype=str)
+        else:
+            arrays[column] = series.to_numpy()
+    return arrays
+
+
+def _arrays_to_frame(arrays, columns):
+    data = {}
+    for column in columns:
+        values = arrays[column]
+        categories_key = column + _CATEGORIES_SUFFIX
+        if categories_key in arrays:
+            data[column] = pd.Categorical.from_codes(values, categories=arrays[categories_key])
+        else:
+            data[column] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+class SessionStore:
+    """
+    Binary (.npz) cache of cleaned session frames, keyed by cache_key() so a
+    changed source file or changed processing parameters are recomputed and
+    everything else is served without touching the CSVs.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, f'{key}.npz')
+
+    def load_frame(self, key):
+        """Returns the cached DataFrame for key, or None when it is not cached."""
+        file_path = self.path(key)
+        if not os.path.exists(file_path):
+            return None
+        with np.load(file_path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        columns = [str(c) for c in arrays.pop('__columns__')]
+        return _arrays_to_frame(arrays, columns)
+
+    def columns(self, key):
+        """Column names of the cached frame for key, read without loading any data."""
+        with zipfile.ZipFile(self.path(key)) as archive, archive.open('__columns__.npy') as f:
+            return [str(c) for c in np.lib.format.read_array(f)]
+
+    def iter_chunks(self, key, chunk_rows=65536, columns=None):
+        """
+        Yields the cached frame for key as DataFrames of at most chunk_rows rows.
+        Column data is streamed from the uncompressed .npz members, so only one
+        chunk is ever in memory whatever the session length.
+        """
+        columns = self.columns(key) if columns is None else list(columns)
+        with zipfile.ZipFile(self.path(key)) as archive, contextlib.ExitStack() as stack:
+            categories = {}
+            streams = {}
+            n_rows = 0
+            for column in columns:
+                categories_key = column + _CATEGORIES_SUFFIX
+                if categories_key + '.npy' in archive.namelist():
+                    with archive.open(categories_key + '.npy') as f:
+                        categories[categories_key] = np.lib.format.read_array(f)
+                f = stack.enter_context(archive.open(column + '.npy'))
+                version = np.lib.format.read_magic(f)
+                read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                               else np.lib.format.read_array_header_2_0)
+                shape, _, dtype = read_header(f)
+                streams[column] = (f, dtype)
+                n_rows = shape[0]
+            for _ in range(0, n_rows, chunk_rows):
+                arrays = dict(categories)
+                for column, (f, dtype) in streams.items():
+                    arrays[column] = np.frombuffer(f.read(chunk_rows * dtype.itemsize), dtype=dtype)
+                yield _arrays_to_frame(arrays, columns)
+
+    def save_frame(self, key, df):
+        os.makedirs(self.root, exist_ok=True)
+        arrays = _frame_to_arrays(df)
+        arrays['__columns__'] = np.asarray(df.columns, dtype=str)
+        # Write to a temporary file first so an interrupted run never leaves a truncated entry.
+        tmp_path = self.path(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.path(key))
+
+    def cached_frame(self, source_paths, params, compute, version):
+        """
+        Returns (df, was_cached). compute() is only called on a cache miss; a
+        None result is passed through and not cached. version identifies the
+        code behind compute (see cache_key()).
+        """
+        key = cache_key(source_paths, params, version)
+        df = self.load_frame(key)
+        if df is not None:
+            return df, True
+        df = compute()
+        if df is not None:
+            self.save_frame(key, df)
+        return df, False
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Training labels, in code order (code -1 means unlabeled).
+STAGE_LABELS = ('Relaxed', 'Normal', 'Stress')
+
+# The original experiment protocol: stage name -> duration in seconds.
+DEFAULT_STAGES = {
+    'Calibration (20s)': 20,
+    'Normal - Watch Video (4 min)': 4 * 60,
+    'Remove 5 Easy Pieces (3 min)': 3 * 60,
+    'Remove 12 Pieces with Noise (1 min)': 1 * 60,
+    'Relaxation with Music (1 min)': 1 * 60
+}
+
+
+def label_for_stage(stage):
+    """Maps a stage name to its training label, or None for unexpected stages."""
+    stage = str(stage)
+    if 'Relaxation' in stage or 'Calibration' in stage:
+        return 'Relaxed'
+    elif 'Normal' in stage:
+        return 'Normal'
+    elif 'Remove' in stage:
+        return 'Stress'
+    return None
+
+
+def _label_code(stage):
+    label = label_for_stage(stage)
+    return STAGE_LABELS.index(label) if label is not None else -1
+
+
+def stage_label_codes(stages):
+    """
+    Label codes (int8, -1 for unknown) for an array of stage names. The
+    substring rules run once per distinct stage name, not once per row.
+    """
+    stages = pd.Categorical(stages)
+    # The trailing -1 is picked up by the -1 code of missing stages.
+    category_codes = np.array([_label_code(name) for name in stages.categories] + [-1], dtype=np.int8)
+    return category_codes[stages.codes]
+
+
+class StageProtocol:
+    """
+    A sequence of consecutive stages given as {name: duration in seconds}.
+    Times are labeled with a single searchsorted over the cumulative stage
+    boundaries; times before the first or after the last stage get code -1.
+    """
+
+    def __init__(self, stages):
+        self.names = list(stages)
+        self.durations = np.asarray(list(stages.values()), dtype=np.float64)
+        self.boundaries = np.concatenate([[0.0], np.cumsum(self.durations)])
+        self.label_codes = np.array([_label_code(name) for name in self.names], dtype=np.int8)
+
+    def stage_codes(self, times):
+        """Stage index (int8) of every time in seconds, -1 outside the protocol."""
+        times = np.asarray(times, dtype=np.float64)
+        codes = np.searchsorted(self.boundaries, times, side='right') - 1
+        codes[(times < 0) | (times >= self.boundaries[-1])] = -1
+        return codes.astype(np.int8)
+
+    def stage_categorical(self, times):
+        return pd.Categorical.from_codes(self.stage_codes(times), categories=self.names)
+
+    def label_codes_for(self, stage_codes):
+        """Label codes (int8) for stage codes returned by stage_codes()."""
+        stage_codes = np.asarray(stage_codes)
+        return np.where(stage_codes >= 0, self.label_codes[stage_codes], -1).astype(np.int8)
+
+    def label_categorical(self, times):
+        codes = self.label_codes_for(self.stage_codes(times))
+        return pd.Categorical.from_codes(codes, categories=STAGE_LABELS)
+
+
+DEFAULT_PROTOCOL = StageProtocol(DEFAULT_STAGES)
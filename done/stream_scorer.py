@@ -0,0 +1,265 @@
+import sys
+import time
+import argparse
+from collections import deque, namedtuple
+
+import numpy as np
+
+from batch_predict import (FEATURE_COLUMNS, TFLITE_MODEL_PATH, THRESHOLD_LOW, THRESHOLD_HIGH, TFLiteBatchScorer,
+                           classify_scores)
+
+StressEvent = namedtuple('StressEvent', ['sample_index', 'value', 'score', 'label', 'latency_ms'])
+
+
+class RingWindow:
+    """
+    Fixed-size window over the most recent samples. Every sample is written
+    twice, window apart, so the latest window is always one contiguous slice
+    and no copy or roll is needed per sample.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._buffer = np.zeros(2 * size, dtype=np.float32)
+        self._next = 0
+        self.count = 0
+
+    def push(self, value):
+        self._buffer[self._next] = value
+        self._buffer[self._next + self.size] = value
+        self._next = (self._next + 1) % self.size
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.size
+
+    def window(self):
+        """The last `size` samples, oldest first (a view, valid until the next push)."""
+        return self._buffer[self._next:self._next + self.size]
+
+
+class StreamingStressScorer:
+    """Scores every new GSR sample against the window of the last `window` samples."""
+
+    def __init__(self, scorer=None, window=None, threshold_low=THRESHOLD_LOW, threshold_high=THRESHOLD_HIGH):
+        self.scorer = scorer if scorer is not None else TFLiteBatchScorer(TFLITE_MODEL_PATH, batch_size=1)
+        self.window = RingWindow(window or self.scorer.window)
+        self.threshold_low = threshold_low
+        self.threshold_high = threshold_high
+
+    def push(self, value):
+        """Adds one sample; returns a StressEvent once the window is full, else None."""
+        start = time.perf_counter()
+        self.window.push(value)
+        if not self.window.full:
+            return None
+        score = float(self.scorer.score(self.window.window()[np.newaxis, :])[0])
+        label = str(classify_scores(score, self.threshold_low, self.threshold_high))
+        latency_ms = (time.perf_counter() - start) * 1000
+        return StressEvent(self.window.count - 1, float(value), score, label, latency_ms)
+
+    def run(self, samples):
+        """Yields a StressEvent for every sample of an iterable once the window is full."""
+        for value in samples:
+            event = self.push(value)
+            if event is not None:
+                yield event
+
+
+class LineParser:
+    """
+    Turns logger lines into (time, raw value) rows. The GSR column is found by
+    name in the header row (the logger writes Time,Resistance (Ohms),Stage);
+    input without a header must hold one bare value per line, one per second.
+    """
+
+    def __init__(self, column=FEATURE_COLUMNS[0]):
+        self.column = column
+        self.value_index = None
+        self.time_index = None
+        self.rows = 0
+
+    def parse(self, line):
+        """(time, value) of one line, or None for blank, header and unparsable lines."""
+        fields = [field.strip() for field in line.strip().split(',')]
+        if fields == ['']:
+            return None
+        if self.value_index is None and len(fields) > 1:
+            if self.column not in fields:
+                raise ValueError(f"No '{self.column}' column in header: {line.strip()}")
+            self.value_index = fields.index(self.column)
+            self.time_index = fields.index('Time') if 'Time' in fields else None
+            return None
+        try:
+            value = float(fields[self.value_index or 0])
+            time_s = float(fields[self.time_index]) if self.time_index is not None else float(self.rows)
+        except (ValueError, IndexError):
+            return None
+        self.rows += 1
+        return time_s, value
+
+
+class StreamCleaner:
+    """
+    clean_gsr_data()'s cleaning for a live stream: rows are averaged per whole
+    second, skipped seconds are filled by linear interpolation, and values are
+    min-max normalized. Training normalized every session over its full range,
+    which a live stream only knows afterwards, so the range is either given
+    (e.g. from an earlier session of the same volunteer) or the range seen so far.
+    """
+
+    def __init__(self, low=None, high=None):
+        self.fixed = low is not None and high is not None
+        self.low = low if self.fixed else np.inf
+        self.high = high if self.fixed else -np.inf
+        self._second = None
+        self._sum = 0.0
+        self._n = 0
+        self._last = None
+
+    def push(self, time_s, value):
+        """
+        Adds one raw row; returns the normalized values of the seconds it
+        completed, oldest first. A row older than the open second arrives
+        after that second was scored and is dropped.
+        """
+        second = int(np.floor(time_s))
+        if self._second is not None and second < self._second:
+            return []
+        completed = []
+        if self._second is not None and second > self._second:
+            completed = self._close()
+        if second != self._second:
+            self._second, self._sum, self._n = second, 0.0, 0
+        self._sum += value
+        self._n += 1
+        return completed
+
+    def flush(self):
+        """Normalized value of the last, still open second (at the end of the input)."""
+        completed = self._close() if self._n else []
+        self._n = 0
+        return completed
+
+    def _close(self):
+        mean = self._sum / self._n
+        values = [mean]
+        if self._last is not None:
+            last_second, last_mean = self._last
+            values = np.linspace(last_mean, mean, self._second - last_second + 1)[1:].tolist()
+        self._last = (self._second, mean)
+        return [self._normalize(value) for value in values]
+
+    def _normalize(self, value):
+        if not self.fixed:
+            self.low = min(self.low, value)
+            self.high = max(self.high, value)
+        if self.high <= self.low:
+            return 0.0
+        return float(np.clip((value - self.low) / (self.high - self.low), 0.0, 1.0))
+
+
+def clean_rows(rows, low=None, high=None):
+    """Normalized 1 Hz GSR values of (time, raw value) rows, cleaned like the training data."""
+    cleaner = StreamCleaner(low, high)
+    for time_s, value in rows:
+        yield from cleaner.push(time_s, value)
+    yield from cleaner.flush()
+
+
+def parse_lines(lines, column=FEATURE_COLUMNS[0]):
+    parser = LineParser(column)
+    for line in lines:
+        row = parser.parse(line)
+        if row is not None:
+            yield row
+
+
+def read_lines(lines, column=FEATURE_COLUMNS[0], low=None, high=None):
+    """Cleaned, normalized GSR values of logger lines (see LineParser and StreamCleaner)."""
+    return clean_rows(parse_lines(lines, column), low, high)
+
+
+def follow_lines(file_path, poll_interval=0.1, follow=True):
+    """
+    Yields complete lines appended to a file, like `tail -f`. A line the
+    logger is still writing is held back until its newline arrives.
+    """
+    with open(file_path, 'r') as f:
+        pending = ''
+        while True:
+            pending += f.readline()
+            if pending.endswith('\n'):
+                yield pending
+                pending = ''
+            elif follow:
+                time.sleep(poll_interval)
+            else:
+                # The file is complete, so a last line without a newline is whole too.
+                if pending:
+                    yield pending
+                return
+
+
+def tail_file(file_path, poll_interval=0.1, follow=True, column=FEATURE_COLUMNS[0], low=None, high=None):
+    """Cleaned, normalized GSR values of the rows appended to a logger file."""
+    return read_lines(follow_lines(file_path, poll_interval, follow), column, low, high)
+
+
+def simulate_sensor(n_samples=600, rate_hz=None, seed=0):
+    """Synthetic normalized GSR: a slow drift with a stress bump and sensor noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples)
+    signal = 0.3 + 0.4 * np.exp(-((t - n_samples * 0.6) / (n_samples * 0.1)) ** 2)
+    signal += rng.normal(0, 0.02, n_samples)
+    for value in np.clip(signal, 0, 1):
+        yield float(value)
+        if rate_hz:
+            time.sleep(1.0 / rate_hz)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a live GSR stream with model.tflite.')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--tail', help='follow a file that the logger appends GSR samples to')
+    source.add_argument('--stdin', action='store_true', help='read one GSR sample per line from stdin')
+    source.add_argument('--simulate', type=int, metavar='N', default=600,
+                        help='score N synthetic samples (default source)')
+    parser.add_argument('--rate', type=float, default=None, help='simulated sensor rate in Hz')
+    parser.add_argument('--column', default=FEATURE_COLUMNS[0], help='GSR column of --tail/--stdin CSV input')
+    parser.add_argument('--range', type=float, nargs=2, metavar=('LOW', 'HIGH'), default=(None, None),
+                        help='raw GSR range to normalize --tail/--stdin input with (default: the range seen so far)')
+    parser.add_argument('--model', default=TFLITE_MODEL_PATH)
+    parser.add_argument('--changes-only', action='store_true', help='only print when the label changes')
+    args = parser.parse_args(argv)
+
+    if args.tail:
+        samples = tail_file(args.tail, column=args.column, low=args.range[0], high=args.range[1])
+    elif args.stdin:
+        samples = read_lines(sys.stdin, args.column, *args.range)
+    else:
+        samples = simulate_sensor(args.simulate, rate_hz=args.rate)
+
+    stream = StreamingStressScorer(TFLiteBatchScorer(args.model, batch_size=1))
+    # Bounded so a session-long run keeps constant memory; the stats cover the most recent samples.
+    latencies = deque(maxlen=100000)
+    last_label = None
+    try:
+        for event in stream.run(samples):
+            latencies.append(event.latency_ms)
+            if not args.changes_only or event.label != last_label:
+                print(f"#{event.sample_index:6d} value={event.value:.4f} score={event.score:.3f} "
+                      f"{event.label} ({event.latency_ms:.2f} ms)")
+            last_label = event.label
+    except KeyboardInterrupt:
+        pass
+
+    if latencies:
+        latencies = np.array(latencies)
+        print(f"\nScored {len(latencies)} samples: latency p50={np.percentile(latencies, 50):.2f} ms, "
+              f"p99={np.percentile(latencies, 99):.2f} ms, max={latencies.max():.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
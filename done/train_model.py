@@ -9,7 +9,8 @@ def build_and_train_model():
     يقوم بتحميل البيانات المصنفة، وتدريب نموذج مصنف شجرة القرارات، ثم يحفظ النموذج.
     """
     # 1. تحميل مجموعة البيانات الموحدة
-    df = pd.read_csv('combined_labeled_gsr_dataset.csv')
+    # قراءة أعمدة المرحلة والملصق كأعمدة فئوية بدلاً من ملايين النصوص المكررة
+    df = pd.read_csv('combined_labeled_gsr_dataset.csv', dtype={'Stage': 'category', 'Label': 'category'})
 
     # 2. تحديد المتغيرات (الميزات والملصقات)
     X = df[['Resistance (Ohms)']]  # الميزة (المدخل)
@@ -1,34 +1,12 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+import sys
+import argparse
 
-# Define the correct path to your CSV files
-csv_dir = os.path.expanduser("~/Downloads/gsr")  # Expands to your full Mac path
+from cohort_stats import load_cohort, normalize_per_volunteer, cohort_summary, stage_means
 
-# Get the list of CSV files in the directory
-csv_files = [f for f in os.listdir(csv_dir) if f.endswith('.csv')]
-
-# Load and normalize data for each volunteer
-all_volunteer_data = []
-
-for i, file in enumerate(csv_files):
-    file_path = os.path.join(csv_dir, file)  # Full path to CSV file
-    df = pd.read_csv(file_path)
-    volunteer_name = f'Volunteer {i+1}'
-    df['Volunteer'] = volunteer_name
-
-    # Normalize Resistance independently
-    resistance_range = df['Resistance'].max() - df['Resistance'].min()
-    if resistance_range == 0:
-        df['Normalized Resistance'] = 0  # Handle edge case where all values are identical
-    else:
-        df['Normalized Resistance'] = (df['Resistance'] - df['Resistance'].min()) / (resistance_range + 1e-6)
-        df['Normalized Resistance'] = 0.1 + df['Normalized Resistance'] * 0.9  # Rescale to 0.1–1 range
-
-    all_volunteer_data.append(df)
-
-# Combine all volunteers' data into a single DataFrame
-data = pd.concat(all_volunteer_data, ignore_index=True)
+# Renders the charts headless (and in parallel) with done/plot_render.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'done'))
+from plot_render import Bars, PlotSpec, render_batch, show_plot
 
 # Define volunteers for different stages and female volunteers
 cold_pressure_volunteers = [f'Volunteer {i}' for i in range(1, 17)]
@@ -40,48 +18,69 @@ female_volunteers = {'Volunteer 10', 'Volunteer 12', 'Volunteer 13', 'Volunteer
 total_volunteers = len(cold_pressure_volunteers) + len(doctor_game_volunteers)
 bar_width = 4 / total_volunteers
 
-# Function to plot graphs
-def plot_graph(volunteers, title, description, color):
-    fig, ax = plt.subplots(figsize=(11, 7))
-
-    for i, volunteer in enumerate(volunteers):
-        volunteer_data = data[data['Volunteer'] == volunteer]
-
-        # Compute means for each stage
-        relaxation_mean = volunteer_data[volunteer_data['Stage'] == 'Relaxation']['Normalized Resistance'].mean()
-        stress_mean = volunteer_data[volunteer_data['Stage'] == 'Under Stress']['Normalized Resistance'].mean()
-
-        # Plot bars
-        ax.bar(i - bar_width / 2, relaxation_mean, width=bar_width, color='lightgray', edgecolor='black', label='Relaxation' if i == 0 else '')
-        ax.bar(i + bar_width / 2, stress_mean, width=bar_width, color=color, edgecolor='black', label='Under Stress' if i == 0 else '')
-
-        # Annotate female volunteers
-        if volunteer in female_volunteers:
-            ax.text(i, max(relaxation_mean, stress_mean) + 0.03, 'Female', ha='center', color='black', fontsize=10)
-
-    ax.set_xticks(range(len(volunteers)))
-    ax.set_xticklabels(volunteers, fontsize=8, rotation=45, ha='right')
-    ax.set_xlabel('Volunteer')
-    ax.set_ylabel('Normalized Resistance')
-    ax.set_title(title)
-    ax.legend(loc='upper left', ncol=2)
-    ax.grid(True)
-
-    plt.figtext(0.5, -0.05, description, wrap=True, horizontalalignment='center', fontsize=10)
-    plt.tight_layout()
-    plt.show()
-
-# Plot graphs
-plot_graph(
-    cold_pressure_volunteers, 
-    "Stress Levels (GSR) for Cold Pressure Volunteers", 
-    "Volunteers 1-16 worked with Cold Pressure in the Under Stress stage.", 
-    'gray'
-)
-
-plot_graph(
-    doctor_game_volunteers, 
-    "Stress Levels (GSR) for Doctor Game Volunteers", 
-    "Volunteers 17-34 worked with the Doctor Game in the Under Stress stage.", 
-    'darkgray'
-)
\ No newline at end of file
+def load_summary(csv_dir):
+    # Load all volunteers into one frame and normalize Resistance independently per volunteer
+    csv_files = [f for f in os.listdir(csv_dir) if f.endswith('.csv')]
+    volunteer_names = [f'Volunteer {i+1}' for i in range(len(csv_files))]
+    data = load_cohort([os.path.join(csv_dir, file) for file in csv_files], volunteer_names)
+    data['Normalized Resistance'] = normalize_per_volunteer(data)  # Rescaled to the 0.1–1 range
+
+    # Per-volunteer, per-stage means, counts and dispersion in one grouped pass
+    return cohort_summary(data)
+
+# Function to describe one bar chart
+def graph_spec(summary, volunteers, title, description, color, output_file):
+    # Means for each stage, read from the precomputed summary table
+    means = stage_means(summary, volunteers, ['Relaxation', 'Under Stress'])
+    positions = list(range(len(volunteers)))
+    relaxation = means['Relaxation'].to_numpy()
+    stress = means['Under Stress'].to_numpy()
+
+    # Annotate female volunteers
+    texts = [(i, max(relaxation[i], stress[i]) + 0.03, 'Female')
+             for i, volunteer in enumerate(volunteers) if volunteer in female_volunteers]
+
+    return PlotSpec(
+        file=output_file,
+        title=title,
+        xlabel='Volunteer',
+        ylabel='Normalized Resistance',
+        series=[
+            Bars([i - bar_width / 2 for i in positions], relaxation, bar_width, 'Relaxation', 'lightgray'),
+            Bars([i + bar_width / 2 for i in positions], stress, bar_width, 'Under Stress', color),
+        ],
+        figsize=(11, 7),
+        xticks=(positions, volunteers),
+        texts=texts,
+        caption=description,
+        legend={'loc': 'upper left', 'ncol': 2},
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bar charts of mean GSR per stage for every volunteer.')
+    # Define the correct path to your CSV files
+    parser.add_argument('--csv-dir', default=os.path.expanduser("~/Downloads/gsr"))  # Expands to your full Mac path
+    parser.add_argument('--output-dir', default='gsr_graphs')
+    parser.add_argument('--show', action='store_true', help='also open every chart in a window')
+    args = parser.parse_args(argv)
+
+    summary = load_summary(args.csv_dir)
+    specs = [
+        graph_spec(summary, cold_pressure_volunteers,
+                   "Stress Levels (GSR) for Cold Pressure Volunteers",
+                   "Volunteers 1-16 worked with Cold Pressure in the Under Stress stage.",
+                   'gray', os.path.join(args.output_dir, 'cold_pressure_volunteers.png')),
+        graph_spec(summary, doctor_game_volunteers,
+                   "Stress Levels (GSR) for Doctor Game Volunteers",
+                   "Volunteers 17-34 worked with the Doctor Game in the Under Stress stage.",
+                   'darkgray', os.path.join(args.output_dir, 'doctor_game_volunteers.png')),
+    ]
+    # Headless: the charts are saved in parallel instead of blocking on a window
+    for plot_file in render_batch(specs):
+        print(f"Saved '{plot_file}'.")
+    if args.show:
+        for spec in specs:
+            show_plot(spec)
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
-import tensorflow as tf
+import os
+import sys
 import numpy as np
 
+# Loads the lightest installed TFLite runtime that can run the model (its LSTM needs TensorFlow's Flex ops)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'done'))
+from fast_predict import load_tflite_interpreter
+
 try:
-    interpreter = tf.lite.Interpreter(model_path="/Users/safamoqbel/Downloads/gsr/model.tflite")
+    interpreter = load_tflite_interpreter("/Users/safamoqbel/Downloads/gsr/model.tflite")
 except Exception as e:
     print(f"Error loading model: {e}")
     exit()
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DONE_DIR = os.path.join(ROOT_DIR, 'done')
+
+# The modules live in done/ (and cohort_stats.py at the root) and import each other by name.
+# done/ goes first: both folders hold a main.py and done/'s is the one the modules import.
+for path in (ROOT_DIR, DONE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
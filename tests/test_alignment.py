@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alignment import align_session, asof, block_mean, to_frame
+from benchmark import make_cosinuss_session
+from cosinuss_reader import find_session_files, load_stream
+
+rng = np.random.default_rng(0)
+
+
+@pytest.mark.parametrize('rate_hz', [1.0, 4.0])
+def test_block_mean_equals_pandas_resample(rate_hz):
+    times = np.sort(rng.uniform(0, 60, 5000))
+    times = times[(times < 20) | (times >= 23)]  # a gap leaves empty bins
+    values = rng.normal(0, 1, (len(times), 2))
+    n_bins = int(60 * rate_hz)
+    out = block_mean(times, values, 0.0, rate_hz, n_bins)
+
+    frame = pd.DataFrame(values, index=pd.to_datetime(times, unit='s'))
+    resampled = frame.resample(pd.Timedelta(seconds=1 / rate_hz), origin='epoch').mean()
+    expected = resampled.reindex(pd.to_datetime(np.arange(n_bins) / rate_hz, unit='s')).to_numpy()
+    np.testing.assert_allclose(out, expected, rtol=1e-12)
+    assert np.isnan(out[int(20.5 * rate_hz)]).all()
+
+
+def test_block_mean_drops_samples_outside_the_grid():
+    out = block_mean(np.array([-0.5, 0.2, 0.7, 3.5]), np.array([100.0, 1.0, 3.0, 100.0]), 0.0, 1.0, 3)
+    np.testing.assert_array_equal(out[:, 0], [2.0, np.nan, np.nan])
+
+
+def test_asof_equals_merge_asof():
+    times = np.sort(rng.uniform(0, 100, 80))
+    values = rng.normal(0, 1, len(times))
+    grid = np.arange(0, 110, 0.5)
+    out = asof(times, values, grid, tolerance=2.0)
+    expected = pd.merge_asof(pd.DataFrame({'t': grid}), pd.DataFrame({'t': times, 'v': values}),
+                             on='t', tolerance=2.0)['v'].to_numpy()
+    np.testing.assert_array_equal(out[:, 0], expected)
+
+
+def test_align_session_puts_every_stream_on_one_clock(tmp_path):
+    files = make_cosinuss_session(str(tmp_path), 60, ppg_rate_hz=50)
+    session = align_session(str(tmp_path), streams=('heart_rate', 'ppg_ir_ppg_ambient_ppg_red'),
+                            gsr=(np.arange(60.0), np.linspace(0, 1, 60)))
+    df = to_frame(session)
+    assert list(df.columns) == ['heart_rate', 'ppg_ir', 'ppg_ambient', 'ppg_red', 'gsr']
+    assert session.start_unix == 1735689600.0
+    np.testing.assert_array_equal(df.index, np.arange(len(df)))
+
+    # Heart rate (about 1 Hz) is joined as-of, PPG (50 Hz) is block-averaged.
+    _, hr = load_stream(files['heart_rate'])
+    np.testing.assert_allclose(df['heart_rate'], asof(hr['time'], hr['heart_rate'], df.index.to_numpy(), 2.0)[:, 0])
+    _, ppg = load_stream(find_session_files(str(tmp_path))['ppg_ir_ppg_ambient_ppg_red'])
+    expected = pd.Series(ppg['ppg_ir'].astype(np.float64)).groupby(np.floor(ppg['time']).astype(int)).mean()
+    np.testing.assert_allclose(df['ppg_ir'].loc[expected.index], expected, rtol=1e-6)
+    np.testing.assert_allclose(df['gsr'], np.linspace(0, 1, 60), rtol=1e-6)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from batch_predict import FEATURE_COLUMNS, TFLiteBatchScorer, TreeBatchPredictor, classify_scores, sliding_windows
+
+
+def fit_tree(seed=0, n=600):
+    rng = np.random.default_rng(seed)
+    x = rng.random(n)
+    y = np.where(x < 0.3, 'Relaxed', np.where(x < 0.6, 'Normal', 'Stress'))
+    flip = rng.random(n) < 0.1
+    y[flip] = rng.choice(['Relaxed', 'Normal', 'Stress'], flip.sum())
+    return DecisionTreeClassifier(max_depth=6, random_state=0).fit(pd.DataFrame({FEATURE_COLUMNS[0]: x}), y)
+
+
+class WindowMeanInterpreter:
+    """Stands in for a tf.lite Interpreter whose model scores a window by its mean."""
+
+    def __init__(self, window=30):
+        self.shape = [1, window, 1]
+        self.invocations = 0
+
+    def get_input_details(self):
+        return [{'index': 0, 'shape': np.array(self.shape)}]
+
+    def get_output_details(self):
+        return [{'index': 1}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = list(shape)
+
+    def allocate_tensors(self):
+        pass
+
+    def set_tensor(self, index, value):
+        assert list(value.shape) == self.shape and value.dtype == np.float32
+        self.input = value.copy()
+
+    def invoke(self):
+        self.invocations += 1
+        self.output = self.input.reshape(self.shape[0], -1).mean(axis=1, keepdims=True)
+
+    def get_tensor(self, index):
+        return self.output
+
+
+def test_tree_batch_matches_single_value_predictions():
+    model = fit_tree()
+    values = np.random.default_rng(1).random(200)
+    labels, probabilities = TreeBatchPredictor(model).predict(values)
+    # One DataFrame row per call, as predict.predict_stress_level does it.
+    expected = [model.predict(pd.DataFrame([[v]], columns=FEATURE_COLUMNS))[0] for v in values]
+    np.testing.assert_array_equal(labels, expected)
+    np.testing.assert_allclose(probabilities, model.predict_proba(pd.DataFrame({FEATURE_COLUMNS[0]: values})))
+
+
+def test_classify_scores_thresholds():
+    labels = classify_scores([0.1, 0.4, 0.5, 0.6, 0.61])
+    assert list(labels) == ['Relaxed', 'Uncertain / Intermediate', 'Uncertain / Intermediate',
+                            'Uncertain / Intermediate', 'Under Stress']
+
+
+@pytest.mark.parametrize('n_windows', [1, 7, 8, 19])
+def test_tflite_batches_match_one_window_per_invoke(n_windows):
+    interpreter = WindowMeanInterpreter()
+    scorer = TFLiteBatchScorer(batch_size=8, interpreter=interpreter)
+    windows = np.random.default_rng(n_windows).random((n_windows, 30)).astype(np.float32)
+    labels, scores = scorer.predict(windows)
+    np.testing.assert_allclose(scores, windows.mean(axis=1), rtol=1e-6)
+    np.testing.assert_array_equal(labels, classify_scores(scores))
+    assert interpreter.invocations == -(-n_windows // 8)
+
+
+def test_predict_signal_scores_every_full_window():
+    scorer = TFLiteBatchScorer(batch_size=16, interpreter=WindowMeanInterpreter(window=5))
+    signal = np.arange(12, dtype=np.float32)
+    _, scores = scorer.predict_signal(signal)
+    np.testing.assert_allclose(scores, np.arange(2, 10))
+    assert sliding_windows(signal, 5).shape == (8, 5)
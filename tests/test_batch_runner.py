@@ -0,0 +1,73 @@
+import os
+import json
+
+import pytest
+
+import batch_runner
+import instrumentation
+from batch_runner import discover_sessions, run_batch, run_session
+
+SCRIPT = '''
+def process_gsr_data(volunteer_id, show=True):
+    if volunteer_id == 2:
+        return None
+    if volunteer_id == 3:
+        raise ValueError('bad session')
+    return f'GSR_Data-{volunteer_id}_cleaned.csv'
+'''
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    for name in ('GSR_Data-1.csv', 'GSR_Data-2.csv', 'GSR_Data-3.csv', 'GSR_Data-1_cleaned.csv', 'notes.txt'):
+        (tmp_path / name).write_text('')
+    (tmp_path / 'main.py').write_text(SCRIPT)
+    os.makedirs(tmp_path / 'presentation volunteers')
+    (tmp_path / 'presentation volunteers' / 'GSR-12.csv').write_text('')
+    # run_session changes directory and caches the loaded scripts; undo both after each test.
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(batch_runner, '_loaded_scripts', {})
+    return str(tmp_path)
+
+
+def test_discover_sessions(root):
+    assert discover_sessions(root) == [('gsr', 1), ('gsr', 2), ('gsr', 3), ('gsr_hr', 12)]
+    assert discover_sessions(root, kinds=['gsr_hr']) == [('gsr_hr', 12)]
+
+
+def test_run_session_records_every_outcome(root):
+    ok = run_session('gsr', 1, root)
+    assert ok['status'] == 'ok' and ok['output'] == 'GSR_Data-1_cleaned.csv'
+    assert run_session('gsr', 2, root)['status'] == 'skipped'
+    failed = run_session('gsr', 3, root)
+    assert failed['status'] == 'failed'
+    assert failed['error'] == 'ValueError: bad session'
+    assert 'Traceback' in failed['traceback']
+
+
+def test_run_batch_indexes_and_runs_the_given_root(root):
+    summary = run_batch([('gsr', 1), ('gsr', 2)], workers=2, root=root)
+    assert summary['sessions'] == 2
+    assert summary['counts'] == {'ok': 1, 'skipped': 1}
+    assert [r['volunteer_id'] for r in summary['results']] == [1, 2]
+    # The manifest of the temporary tree is written inside it, not over done/manifest.json.
+    with open(os.path.join(root, 'manifest.json')) as f:
+        paths = {entry['path'] for entry in json.load(f)['entries']}
+    assert 'GSR_Data-1.csv' in paths and os.path.join('presentation volunteers', 'GSR-12.csv') in paths
+
+
+def test_run_batch_merges_worker_profiles(root, tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation.PROFILER, 'enabled', True)
+    monkeypatch.setattr(instrumentation.PROFILER, 'records', [])
+    summary = run_batch([('gsr', 1), ('gsr', 2)], workers=2, root=root)
+    assert all('profile' not in r for r in summary['results'])
+
+    records = instrumentation.PROFILER.records
+    assert sorted(r['stack'] for r in records) == ['gsr:1', 'gsr:2']
+    assert all(r['pid'] != os.getpid() for r in records)
+    trace_path = str(tmp_path / 'batch.trace.json')
+    instrumentation.PROFILER.export(trace_path)
+    with open(trace_path) as f:
+        events = json.load(f)['traceEvents']
+    assert sorted(e['name'] for e in events) == ['gsr:1', 'gsr:2']
+    assert all(e['ts'] >= 0 for e in events)
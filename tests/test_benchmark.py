@@ -0,0 +1,40 @@
+import pytest
+
+from benchmark import compare, main, make_gsr_session, parse_duration, run_case
+
+
+def test_parse_duration():
+    assert [parse_duration(t) for t in ('90s', '10m', '2h', '1.5h', '45')] == [90, 600, 7200, 5400, 45]
+
+
+def test_compare_reports_only_slowdowns_above_the_threshold():
+    baseline = {'10m': {'load': {'median_s': 1.0}, 'clean': {'median_s': 1.0}, 'tflite': {'skipped': 'x'}}}
+    results = {'10m': {'load': {'median_s': 1.6}, 'clean': {'median_s': 1.4}, 'tflite': {'median_s': 9.0},
+                       'train': {'median_s': 9.0}},
+               '1h': {'load': {'median_s': 9.0}}}
+    assert compare(results, baseline, threshold=1.5) == [('10m', 'load', pytest.approx(1.6))]
+
+
+def test_make_gsr_session_rows(tmp_path):
+    assert make_gsr_session(str(tmp_path / 'GSR_Data-1.csv'), 120) == 120
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_run_case_measures_every_stage(tmp_path):
+    results = run_case(600, str(tmp_path), repeat=1, predict_calls=5)
+    for stage in ('load', 'clean', 'process', 'stage_label', 'prepare', 'train', 'predict_single', 'predict_batch'):
+        assert results[stage]['median_s'] > 0, stage
+    assert results['clean']['rows'] == 600
+    assert results['prepare']['rows'] == 3 * 600
+    assert results['load']['rows'] == 595 * 200
+    assert 'tflite' in results
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_a_missing_baseline_fails_loudly(tmp_path, capsys):
+    baseline = str(tmp_path / 'baseline.json')
+    args = ['--durations', '90s', '--repeat', '1', '--output', str(tmp_path / 'results.json'), '--baseline', baseline]
+    assert main(args) == 2
+    assert 'no baseline' in capsys.readouterr().err
+    assert main(args + ['--save-baseline']) == 0
+    assert main(args + ['--threshold', '1000']) == 0
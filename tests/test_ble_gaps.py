@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alignment import align_session
+from benchmark import PREAMBLE, _write_stream, make_cosinuss_session
+from ble_gaps import GAP_COLUMNS, detect_gaps, gap_mask, loss_stats, session_gaps
+
+# 10 samples per packet, one packet every 0.1 s: 100 Hz.
+AMOUNT = 10
+INTERVAL = 0.1
+
+
+def packets(n, first_packet=1, t0=0.1):
+    times = t0 + INTERVAL * np.arange(n)
+    packet = first_packet + np.arange(n)
+    return times, AMOUNT * packet, np.full(n, AMOUNT), packet
+
+
+def concat(*streams):
+    return [np.concatenate(parts) for parts in zip(*streams)]
+
+
+def test_counter_jump_is_a_loss():
+    times, sample, amount, packet = packets(200)
+    keep = np.ones(200, dtype=bool)
+    keep[50:55] = False  # five packets (0.5 s, 50 samples) never arrive
+    gaps, rate = detect_gaps(times[keep], sample[keep], amount[keep], packet[keep])
+    assert rate == pytest.approx(100.0)
+    assert len(gaps) == 1
+    gap = gaps.iloc[0]
+    assert gap['kind'] == 'loss' and gap['lost_packets'] == 5 and gap['lost_samples'] == 50
+    np.testing.assert_allclose([gap['start'], gap['end'], gap['duration']], [times[49], times[54], 0.5])
+
+
+def test_lost_samples_without_lost_packets():
+    times, sample, amount, packet = packets(100)
+    sample[60:] += 30
+    gaps, rate = detect_gaps(times, sample, amount, packet)
+    assert gaps[['lost_packets', 'lost_samples', 'kind']].values.tolist() == [[0, 30, 'loss']]
+    # Arrival times show no gap, so the loss lasts as long as its samples.
+    np.testing.assert_allclose(gaps['duration'], 30 / rate)
+
+
+def test_counter_reset_is_a_reconnect():
+    before = packets(100)
+    after = packets(100, first_packet=1, t0=before[0][-1] + 5.0)
+    gaps, rate = detect_gaps(*concat(before, after))
+    gap = gaps.iloc[0]
+    assert len(gaps) == 1 and gap['kind'] == 'reconnect'
+    # The first packet after the reconnect holds the 10 samples before its arrival.
+    np.testing.assert_allclose(gap['duration'], 5.0 - INTERVAL)
+    assert gap['lost_packets'] == 0 and gap['lost_samples'] == round(gap['duration'] * rate)
+
+
+def test_late_packets_are_a_stall():
+    times, sample, amount, packet = packets(100)
+    times[40:] += 2.0
+    gaps, _ = detect_gaps(times, sample, amount, packet)
+    assert gaps['kind'].tolist() == ['stall']
+    np.testing.assert_allclose(gaps['duration'], 2.0, atol=0.05)
+    assert detect_gaps(*packets(100))[0].empty
+
+
+def test_loss_stats():
+    gaps = pd.DataFrame({'start': [1.0, 5.0], 'end': [1.5, 9.0], 'duration': [0.5, 4.0], 'lost_packets': [5, 0],
+                         'lost_samples': [50, 400], 'kind': ['loss', 'reconnect']})
+    stats = loss_stats(gaps, n_packets=95, n_samples=950, rate=100.0)
+    assert stats['packet_loss_pct'] == 5.0
+    assert stats['sample_loss_pct'] == 100 * 450 / 1400
+    assert stats['reconnects'] == 1 and stats['longest_gap_s'] == 4.0 and stats['missing_s'] == 4.5
+
+
+def test_gap_mask_matches_a_loop():
+    gaps = pd.DataFrame({'start': [2.3, 10.0, 30.5, 58.2], 'end': [2.8, 14.2, 33.0, 70.0],
+                         'duration': [0.5, 4.2, 2.5, 11.8]})
+    grid = np.arange(0, 60, 0.5)
+    mask = gap_mask(gaps, grid, 2.0, min_duration=1.0)
+    expected = np.zeros(len(grid), dtype=bool)
+    for start, end, duration in gaps.values:
+        if duration >= 1.0:
+            expected |= (grid + 0.5 > start) & (grid < end)
+    np.testing.assert_array_equal(mask, expected)
+    assert not gap_mask(gaps, grid, 2.0, min_duration=20).any()
+
+
+def test_session_gaps_and_alignment_blank_long_gaps(tmp_path):
+    folder = str(tmp_path)
+    make_cosinuss_session(folder, 60, ppg_rate_hz=100)
+    times, sample, amount, packet = packets(590, t0=5.1)
+    keep = (times < 30) | (times >= 33)
+    _write_stream(folder, 'BENCH.0000_2025-01-01_00-00-00', 'ble_sample_counter_ble_sample_amount_ble_packet_counter',
+                  PREAMBLE.format(tag='0000', label='BENCH'),
+                  {'time': times[keep], 'ble_sample_counter': sample[keep], 'ble_sample_amount': amount[keep],
+                   'ble_packet_counter': packet[keep]}, '%.3f')
+    report = session_gaps(folder)
+    assert list(report.gaps.columns) == GAP_COLUMNS
+    assert report.gaps[['stream', 'kind', 'lost_packets']].values.tolist() == [['ppg', 'loss', 30]]
+    assert report.stats['ppg']['packets_received'] == keep.sum()
+
+    streams = ('heart_rate', 'ppg_ir_ppg_ambient_ppg_red')
+    gsr = (np.arange(60.0), np.linspace(0, 1, 60))
+    aligned = align_session(folder, streams=streams, gsr=gsr)
+    kept = align_session(folder, streams=streams, gsr=gsr, max_gap_s=None)
+    blank = np.isnan(aligned.data[:, 0]) & ~np.isnan(kept.data[:, 0])
+    assert np.flatnonzero(blank).tolist() == [29, 30, 31, 32]
+    assert not np.isnan(aligned.data[:, -1]).any()  # the GSR channel is not a Cosinuss stream
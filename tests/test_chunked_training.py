@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.naive_bayes import GaussianNB
+
+from benchmark import make_gsr_session
+from chunked_training import (VALID_COLUMN, Rebalancer, iter_batches, store_sources, train_incremental,
+                              volunteer_of)
+from main import clean_gsr_data
+from quality import MIN_VALID_FRACTION
+from session_store import SessionStore
+from stage_protocol import DEFAULT_STAGES, StageProtocol, stage_label_codes
+
+
+@pytest.fixture
+def cleaned_files(tmp_path):
+    # Resistance encodes (volunteer, row) so every row can be traced back to its source.
+    files = []
+    for volunteer in range(1, 6):
+        n = 400 + 100 * volunteer
+        t = np.arange(n)
+        file_path = tmp_path / f'GSR_Data-{volunteer}_cleaned.csv'
+        pd.DataFrame({'Time': t, 'Resistance (Ohms)': volunteer * 10_000 + t,
+                      'Stage': StageProtocol(DEFAULT_STAGES).stage_categorical(t)}).to_csv(file_path, index=False)
+        files.append(str(file_path))
+    return files
+
+
+def _labeled_rows(files):
+    frames = [pd.read_csv(f) for f in files]
+    df = pd.concat(frames, ignore_index=True)
+    codes = stage_label_codes(df['Stage'])
+    return df['Resistance (Ohms)'].to_numpy()[codes >= 0], codes[codes >= 0]
+
+
+def test_volunteer_of():
+    assert volunteer_of('x/GSR_Data-7.csv') == 7
+    assert volunteer_of('GSR_Data-12_cleaned.csv') == 12
+    assert volunteer_of('notes.csv') is None
+
+
+def test_batches_cover_every_labeled_row_once(cleaned_files):
+    batches = list(iter_batches(cleaned_files, batch_rows=256, interleave=3))
+    assert all(len(y) == 256 for _, y in batches[:-1]) and 0 < len(batches[-1][1]) <= 256
+    X = np.concatenate([X for X, _ in batches])[:, 0]
+    y = np.concatenate([y for _, y in batches])
+    order = np.argsort(X)
+    expected_X, expected_y = _labeled_rows(cleaned_files)
+    expected_order = np.argsort(expected_X)
+    np.testing.assert_array_equal(X[order], expected_X[expected_order])
+    np.testing.assert_array_equal(y[order], expected_y[expected_order])
+    # Interleaving mixes several recordings into the first batch.
+    assert len(np.unique(batches[0][0][:, 0] // 10_000)) == 3
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_store_sources_stream_the_cleaned_sessions(tmp_path):
+    raw_files = [str(tmp_path / f'GSR_Data-{i}.csv') for i in (1, 2)]
+    for i, raw_file in enumerate(raw_files):
+        make_gsr_session(raw_file, 600, seed=i)
+    store = SessionStore(str(tmp_path / 'store'))
+    sources = store_sources(raw_files, store=store)
+    assert [volunteer for volunteer, _ in sources] == [1, 2]
+    assert store_sources(raw_files, store=store) == sources
+    rows = sum(len(y) for _, y in iter_batches([key for _, key in sources], batch_rows=100, store=store))
+    expected = sum((stage_label_codes(clean_gsr_data(f, DEFAULT_STAGES)['Stage']) >= 0).sum() for f in raw_files)
+    assert rows == expected
+
+
+def test_feature_windows_failing_the_quality_mask_are_skipped(tmp_path):
+    store = SessionStore(str(tmp_path / 'store'))
+    n = 200
+    starts = np.arange(n) * 5
+    hr = np.where(np.arange(n) % 4 == 1, np.nan, 70.0 + np.arange(n))
+    valid = np.where(np.arange(n) % 4 == 2, 0.5, 1.0)
+    store.save_frame('windows', pd.DataFrame({
+        'Window Start': starts, 'gsr_mean': np.arange(n, dtype=np.float64), 'hr_mean': hr,
+        VALID_COLUMN: valid.astype(np.float32), 'Stage': StageProtocol(DEFAULT_STAGES).stage_categorical(starts + 15)}))
+    batches = list(iter_batches(['windows'], batch_rows=32, store=store, columns=['gsr_mean', 'hr_mean']))
+    X = np.concatenate([X for X, _ in batches])
+    rows = np.sort(X[:, 0]).astype(int)
+    labeled = stage_label_codes(StageProtocol(DEFAULT_STAGES).stage_categorical(starts + 15)) >= 0
+    expected = np.flatnonzero(labeled & ~np.isnan(hr) & (valid >= MIN_VALID_FRACTION))
+    np.testing.assert_array_equal(rows, expected)
+    assert X.shape[1] == 2 and not np.isnan(X).any()
+
+
+def test_rebalancer_weights_every_class_equally():
+    y = np.array([0] * 60 + [1] * 30 + [2] * 10)
+    weights = Rebalancer().weights(y)
+    totals = np.bincount(y, weights=weights)
+    np.testing.assert_allclose(totals, totals[0])
+    np.testing.assert_allclose(weights.sum(), len(y))
+
+
+def test_partial_fit_matches_a_full_fit(cleaned_files):
+    estimator, stats = train_incremental(cleaned_files, model='nb', epochs=1, batch_rows=300, rebalance=False)
+    X, y = _labeled_rows(cleaned_files)
+    assert stats['rows'] == len(y)
+    full = GaussianNB().fit(X[:, np.newaxis].astype(np.float32), y)
+    np.testing.assert_allclose(estimator.theta_, full.theta_, rtol=1e-6)
+    np.testing.assert_allclose(estimator.var_, full.var_, rtol=1e-4)
+    np.testing.assert_allclose(estimator.class_prior_, full.class_prior_)
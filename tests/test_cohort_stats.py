@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohort_stats import cohort_summary, load_cohort, normalize_per_volunteer, stage_means
+
+
+@pytest.fixture
+def csv_files(tmp_path):
+    rng = np.random.default_rng(0)
+    files = []
+    for i in range(5):
+        n = 50 + 10 * i
+        stages = rng.choice(['Relaxation', 'Under Stress', 'Baseline'], n)
+        resistance = np.full(n, 7.0) if i == 3 else rng.normal(1000 * (i + 1), 50, n)
+        if i == 4:
+            stages[stages == 'Under Stress'] = 'Relaxation'
+        file_path = tmp_path / f'GSR{i}.csv'
+        pd.DataFrame({'Time': range(n), 'Resistance': resistance, 'Stage': stages}).to_csv(file_path, index=False)
+        files.append(str(file_path))
+    return files
+
+
+def _loop_means(csv_files, names):
+    # The per-file normalization and per-volunteer boolean-mask means the grouped pass replaced.
+    means = {}
+    for file_path, name in zip(csv_files, names):
+        df = pd.read_csv(file_path)
+        resistance_range = df['Resistance'].max() - df['Resistance'].min()
+        if resistance_range == 0:
+            df['Normalized Resistance'] = 0
+        else:
+            df['Normalized Resistance'] = (df['Resistance'] - df['Resistance'].min()) / (resistance_range + 1e-6)
+            df['Normalized Resistance'] = 0.1 + df['Normalized Resistance'] * 0.9
+        means[name] = [df[df['Stage'] == stage]['Normalized Resistance'].mean()
+                       for stage in ('Relaxation', 'Under Stress')]
+    return means
+
+
+def test_grouped_means_match_the_loop(csv_files):
+    names = [f'Volunteer {i + 1}' for i in range(len(csv_files))]
+    data = load_cohort(csv_files, names)
+    data['Normalized Resistance'] = normalize_per_volunteer(data)
+    means = stage_means(cohort_summary(data), names + ['Volunteer 9'], ['Relaxation', 'Under Stress'])
+    expected = _loop_means(csv_files, names)
+    for name in names:
+        np.testing.assert_allclose(means.loc[name].to_numpy(), expected[name], rtol=1e-12, err_msg=name)
+    assert means.loc['Volunteer 4'].tolist() == [0.0, 0.0]
+    assert np.isnan(means.loc['Volunteer 5', 'Under Stress'])
+    assert means.loc['Volunteer 9'].isna().all()
+
+
+def test_summary_counts(csv_files):
+    names = [f'Volunteer {i + 1}' for i in range(len(csv_files))]
+    data = load_cohort(csv_files, names)
+    data['Normalized Resistance'] = normalize_per_volunteer(data)
+    summary = cohort_summary(data)
+    assert summary['count'].sum() == len(data)
+    assert summary.loc[('Volunteer 2', 'Baseline'), 'count'] == (pd.read_csv(csv_files[1])['Stage'] == 'Baseline').sum()
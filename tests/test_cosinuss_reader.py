@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmark import make_cosinuss_session
+from cosinuss_reader import (find_cosinuss_folder, find_session_files, load_session, load_stream, read_preamble,
+                             stream_type)
+
+
+def test_stream_type_prefers_the_longest_suffix():
+    assert stream_type('X_2025-01-01_00-00-00_ppg_quality.csv') == 'ppg_quality'
+    assert stream_type('X_2025-01-01_00-00-00_quality.csv') == 'quality'
+    assert stream_type('X_2025-01-01_00-00-00_acc_mag.csv') == 'acc_mag'
+    assert stream_type('notes.txt') is None
+
+
+def test_read_preamble(tmp_path):
+    files = make_cosinuss_session(str(tmp_path), 20, label='v7 - p')
+    metadata = read_preamble(files['heart_rate'])
+    assert metadata.person_label == 'v7 - p'
+    assert metadata.date_time_start_unix == 1735689600.0
+    assert metadata.length_difference_noticed is False
+    assert metadata.header_row == 11
+
+
+def test_load_stream_matches_pandas(tmp_path):
+    files = make_cosinuss_session(str(tmp_path), 20)
+    for stream, file_path in files.items():
+        _, columns = load_stream(file_path)
+        expected = pd.read_csv(file_path, skiprows=11)
+        assert list(columns) == list(expected.columns)
+        assert columns['time'].dtype == np.float64
+        for name, values in columns.items():
+            np.testing.assert_allclose(values, expected[name].to_numpy(), rtol=1e-6, err_msg=f'{stream}.{name}')
+
+
+def test_cache_dir_returns_the_same_columns(tmp_path):
+    files = make_cosinuss_session(str(tmp_path / 'session'), 20)
+    cache_dir = str(tmp_path / 'cache')
+    _, parsed = load_stream(files['rr_int'])
+    _, first = load_stream(files['rr_int'], cache_dir=cache_dir)
+    _, cached = load_stream(files['rr_int'], cache_dir=cache_dir)
+    assert isinstance(cached['time'], np.memmap)
+    for name in parsed:
+        np.testing.assert_array_equal(first[name], parsed[name])
+        np.testing.assert_array_equal(cached[name], parsed[name])
+
+
+def test_load_session_and_folder_lookup(tmp_path):
+    make_cosinuss_session(str(tmp_path / 'V-12'), 20)
+    folder = find_cosinuss_folder(str(tmp_path), 12)
+    assert folder == os.path.join(str(tmp_path), 'V-12')
+    assert find_cosinuss_folder(str(tmp_path), 1) is None
+    assert set(find_session_files(folder)) == {'heart_rate', 'rr_int', 'ppg_ir_ppg_ambient_ppg_red'}
+    _, session = load_session(folder, streams=['heart_rate', 'spo2'])
+    assert list(session) == ['heart_rate']
@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import LeaveOneGroupOut, cross_val_score
+from sklearn.tree import DecisionTreeClassifier
+
+from cross_validation import cross_validate, load_dataset, main, make_folds
+from quality import MIN_VALID_FRACTION
+
+
+def _dataset(n_volunteers=6, rows=120, seed=0):
+    rng = np.random.default_rng(seed)
+    groups = np.repeat(np.arange(1, n_volunteers + 1), rows)
+    y = rng.integers(0, 3, len(groups))
+    X = (y + rng.normal(0, 0.8, len(y)))[:, np.newaxis].astype(np.float32)
+    return X, y, groups
+
+
+def test_every_volunteer_is_held_out_exactly_once():
+    groups = np.repeat([3, 1, 7, 9, 4], 10)
+    assert make_folds(groups) == [[1], [3], [4], [7], [9]]
+    folds = make_folds(groups, n_splits=2)
+    assert len(folds) == 2
+    assert sorted(v for fold in folds for v in fold) == [1, 3, 4, 7, 9]
+
+
+def test_accuracies_match_sklearn_leave_one_group_out():
+    X, y, groups = _dataset()
+    summaries = cross_validate(X, y, groups, 'tree', {'max_depth': [2, 4]}, workers=1)
+    expected = {depth: cross_val_score(DecisionTreeClassifier(random_state=42, max_depth=depth), X, y,
+                                       groups=groups, cv=LeaveOneGroupOut())
+                for depth in (2, 4)}
+    assert [s['mean_accuracy'] for s in summaries] == sorted((s['mean_accuracy'] for s in summaries), reverse=True)
+    for summary in summaries:
+        accuracies = [fold['accuracy'] for fold in summary['folds']]
+        np.testing.assert_allclose(accuracies, expected[summary['params']['max_depth']])
+        assert all(fold['train_rows'] + fold['test_rows'] == len(y) for fold in summary['folds'])
+
+
+def test_parallel_folds_equal_serial_folds():
+    X, y, groups = _dataset(n_volunteers=4)
+    serial = cross_validate(X, y, groups, 'tree', {'max_depth': [3]}, n_splits=2, workers=1)
+    parallel = cross_validate(X, y, groups, 'tree', {'max_depth': [3]}, n_splits=2, workers=2)
+    assert [f['accuracy'] for f in serial[0]['folds']] == [f['accuracy'] for f in parallel[0]['folds']]
+
+
+def test_load_dataset_drops_unlabeled_and_low_quality_windows(tmp_path):
+    path = str(tmp_path / 'features.npz')
+    np.savez(path, X=np.arange(10, dtype=np.float32).reshape(5, 2), volunteer=np.array([1, 1, 2, 2, 3]),
+             stage=np.array([0, 1, -1, 2, 3]), valid_fraction=np.array([1.0, MIN_VALID_FRACTION - 0.01, 1, 1, 1]),
+             stage_names=np.array(['Calibration (20s)', 'Normal - Watch Video (4 min)', 'Remove 5 Easy Pieces (3 min)',
+                                   'Break']),
+             feature_names=np.array(['a', 'b']))
+    X, y, groups, features = load_dataset(path)
+    np.testing.assert_array_equal(X, [[0, 1], [6, 7]])
+    assert y.tolist() == [0, 2] and groups.tolist() == [1, 2] and features == ['a', 'b']
+
+    csv_path = str(tmp_path / 'combined.csv')
+    pd.DataFrame({'Resistance (Ohms)': [0.1, 0.9], 'Stage': ['a', 'b'], 'Label': ['Relaxed', 'Stress'],
+                  'Volunteer': [1, 2]}).to_csv(csv_path, index=False)
+    X, y, groups, _ = load_dataset(csv_path)
+    assert y.tolist() == [0, 2] and groups.tolist() == [1, 2]
+
+
+def _features_npz(path):
+    X = np.array([[0.1, np.nan], [0.2, 800.0], [0.3, 810.0], [0.4, np.nan]], dtype=np.float32)
+    np.savez(path, X=X, volunteer=np.array([1, 1, 2, 2]), stage=np.array([0, 1, 0, 1]),
+             stage_names=np.array(['Calibration (20s)', 'Remove 5 Easy Pieces (3 min)']),
+             feature_names=np.array(['gsr_mean', 'hr_mean']))
+
+
+def test_load_dataset_never_fills_missing_features(tmp_path):
+    path = str(tmp_path / 'features.npz')
+    _features_npz(path)
+    X, y, groups, features = load_dataset(path)
+    np.testing.assert_array_equal(X, np.array([[0.2, 800], [0.3, 810]], dtype=np.float32))
+    assert y.tolist() == [2, 0] and groups.tolist() == [1, 2]
+
+    X, _, _, features = load_dataset(path, features=['gsr_mean'])
+    assert features == ['gsr_mean'] and len(X) == 4
+
+    X, _, _, _ = load_dataset(path, drop_nan=False)
+    assert np.isnan(X).sum() == 2
+
+
+def test_results_record_the_missing_value_handling(tmp_path):
+    path, output = str(tmp_path / 'features.npz'), str(tmp_path / 'cv.json')
+    _features_npz(path)
+    main(['--data', path, '--model', 'hist_gb', '--workers', '1', '--output', output])
+    with open(output) as f:
+        summary = json.load(f)[0]
+    assert summary['rows'] == 4 and summary['features'] == ['gsr_mean', 'hr_mean']
+    assert summary['nan_handling'].startswith('kept')
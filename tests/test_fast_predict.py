@@ -0,0 +1,97 @@
+import os
+import sys
+import types
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+import fast_predict
+from fast_predict import SCALAR_BATCH, CompiledTree, export_tree, load_compiled_tree, load_tflite_interpreter
+
+
+def _fit(n_features, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((2000, n_features))
+    y = np.where(X.sum(axis=1) + rng.normal(0, 0.2, len(X)) < n_features / 2, 'Relaxed', 'Stress')
+    y[X[:, 0] > 0.9] = 'Normal'
+    return DecisionTreeClassifier(random_state=0, min_samples_leaf=5).fit(X, y), X
+
+
+@pytest.mark.parametrize('n_features', [1, 3])
+@pytest.mark.parametrize('n_rows', [1, SCALAR_BATCH, 500])
+def test_compiled_tree_equals_sklearn(tmp_path, n_features, n_rows):
+    model, _ = _fit(n_features)
+    tree = CompiledTree.load(export_tree(model, str(tmp_path / 'tree.npz')))
+    X = np.random.default_rng(n_rows).random((n_rows, n_features))
+    np.testing.assert_array_equal(tree.apply(X), model.apply(X))
+    np.testing.assert_array_equal(tree.predict(X), model.predict(X))
+    np.testing.assert_allclose(tree.predict_proba(X), model.predict_proba(X), rtol=1e-6)
+
+
+def test_values_on_the_thresholds(tmp_path):
+    model, _ = _fit(1)
+    tree = CompiledTree.load(export_tree(model, str(tmp_path / 'tree.npz')))
+    thresholds = model.tree_.threshold[model.tree_.feature >= 0]
+    X = np.concatenate([thresholds, np.nextafter(thresholds, 2), np.nextafter(thresholds, -1)])[:, np.newaxis]
+    np.testing.assert_array_equal(tree.apply(X), model.apply(X))
+    for value in X[:SCALAR_BATCH, 0]:
+        assert tree.predict(np.array([value]))[0] == model.predict([[value]])[0]
+
+
+def test_load_compiled_tree_reexports_a_newer_model(tmp_path):
+    model_path, compiled_path = str(tmp_path / 'model.pkl'), str(tmp_path / 'model.npz')
+    joblib.dump(_fit(1)[0], model_path)
+    load_compiled_tree(compiled_path, model_path)
+    os.utime(compiled_path, (0, 0))
+    retrained, _ = _fit(1, seed=1)
+    joblib.dump(retrained, model_path)
+    tree = load_compiled_tree(compiled_path, model_path)
+    np.testing.assert_array_equal(tree.threshold, retrained.tree_.threshold)
+
+
+def test_load_compiled_tree_keeps_a_custom_tree(tmp_path, monkeypatch):
+    model_path, compiled_path = str(tmp_path / 'model.pkl'), str(tmp_path / 'custom.npz')
+    joblib.dump(_fit(1, seed=1)[0], model_path)
+    custom, _ = _fit(1)
+    export_tree(custom, compiled_path)
+    os.utime(compiled_path, (0, 0))
+    # Even with the default pickle newer than it, a custom tree is never overwritten.
+    monkeypatch.setattr(fast_predict, 'MODEL_PATH', model_path)
+    tree = load_compiled_tree(compiled_path)
+    np.testing.assert_array_equal(tree.threshold, custom.tree_.threshold)
+    assert os.path.getmtime(compiled_path) == 0
+    with pytest.raises(FileNotFoundError):
+        load_compiled_tree(str(tmp_path / 'missing.npz'))
+
+
+def _runtime(name, error=None):
+    class Interpreter:
+        runtime = name
+
+        def __init__(self, model_path):
+            self.model_path = model_path
+
+        def allocate_tensors(self):
+            if error is not None:
+                raise error
+    return types.SimpleNamespace(Interpreter=Interpreter)
+
+
+def test_tflite_runtime_without_flex_ops_falls_through(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'test_light_runtime',
+                        _runtime('light', RuntimeError('Select TensorFlow op(s) not supported')))
+    monkeypatch.setitem(sys.modules, 'test_full_runtime', _runtime('full'))
+    monkeypatch.setattr(fast_predict, 'TFLITE_RUNTIMES', (('test_missing_runtime', 'Interpreter'),
+                                                          ('test_light_runtime', 'Interpreter'),
+                                                          ('test_full_runtime', 'Interpreter')))
+    interpreter = load_tflite_interpreter('model.tflite')
+    assert interpreter.runtime == 'full' and interpreter.model_path == 'model.tflite'
+
+    monkeypatch.setattr(fast_predict, 'TFLITE_RUNTIMES', (('test_light_runtime', 'Interpreter'),))
+    with pytest.raises(RuntimeError, match='Select TensorFlow op'):
+        load_tflite_interpreter('model.tflite')
+    monkeypatch.setattr(fast_predict, 'TFLITE_RUNTIMES', (('test_missing_runtime', 'Interpreter'),))
+    with pytest.raises(ImportError):
+        load_tflite_interpreter('model.tflite')
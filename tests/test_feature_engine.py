@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from feature_engine import (FEATURE_NAMES, compute_features, ppg_amplitude_per_second, scr_peak_mask,
+                            window_bounds, window_count, window_mean, window_rr_stats, window_slope)
+from hrv import clean_rr
+
+rng = np.random.default_rng(0)
+
+
+def test_window_mean_and_slope_match_numpy():
+    x = np.cumsum(rng.normal(0, 1, 500))
+    starts, ends = window_bounds(len(x), 30, 5)
+    assert ends[-1] <= len(x) < ends[-1] + 5
+    np.testing.assert_allclose(window_mean(x, starts, ends), [x[s:e].mean() for s, e in zip(starts, ends)])
+    np.testing.assert_allclose(window_slope(x, starts, ends),
+                               [np.polyfit(np.arange(e - s), x[s:e], 1)[0] for s, e in zip(starts, ends)],
+                               rtol=1e-6, atol=1e-9)
+
+
+def test_scr_peak_mask_matches_a_loop():
+    x = np.cumsum(rng.normal(0, 0.01, 400))
+    threshold, lag = 0.01, 4
+    expected = np.zeros(len(x), dtype=bool)
+    for i in range(1, len(x) - 1):
+        rise = x[i] - x[i - lag:i].min() if i >= lag else 0.0
+        expected[i] = x[i] > x[i - 1] and x[i] >= x[i + 1] and rise > threshold
+    mask = scr_peak_mask(x, threshold, lag)
+    np.testing.assert_array_equal(mask, expected)
+    starts, ends = window_bounds(len(x), 30, 5)
+    np.testing.assert_array_equal(window_count(mask, starts, ends), [mask[s:e].sum() for s, e in zip(starts, ends)])
+
+
+def test_window_rr_stats_match_numpy():
+    rr_ms = rng.normal(800, 40, 300)
+    rr_times = np.cumsum(rr_ms) / 1000
+    starts = np.arange(0, 200, 5.0)
+    ends = starts + 30
+    rmssd, sdnn = window_rr_stats(rr_times, rr_ms, starts, ends)
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        window = rr_ms[(rr_times >= s) & (rr_times < e)]
+        np.testing.assert_allclose(sdnn[i], window.std())
+        np.testing.assert_allclose(rmssd[i], np.sqrt(np.mean(np.diff(window) ** 2)))
+
+
+def test_window_rr_stats_skip_pairs_across_dropped_beats():
+    raw = rng.normal(800, 40, 300)
+    raw[::7] = 6035
+    times, rr_ms, beats = clean_rr(np.cumsum(raw) / 1000, raw)
+    starts = np.arange(0, 200, 5.0)
+    rmssd, _ = window_rr_stats(times, rr_ms, starts, starts + 30, beats)
+    for i, s in enumerate(starts):
+        inside = (times >= s) & (times < s + 30)
+        diff = np.diff(rr_ms[inside])[np.diff(beats[inside]) == 1]
+        np.testing.assert_allclose(rmssd[i], np.sqrt(np.mean(diff ** 2)))
+
+
+def test_window_rr_stats_sparse_windows_are_nan():
+    rmssd, sdnn = window_rr_stats(np.array([1.0, 50.0]), np.array([800.0, 820.0]),
+                                  np.array([0.0, 40.0, 100.0]), np.array([30.0, 70.0, 130.0]))
+    assert np.isnan(rmssd).all() and np.isnan(sdnn).all()
+
+
+def test_ppg_amplitude_matches_groupby():
+    times = np.sort(rng.uniform(0, 20, 3000))
+    times = times[(times < 7) | (times >= 8)]  # second 7 has no samples
+    ppg = rng.integers(140000, 150000, len(times))
+    amplitude = ppg_amplitude_per_second(times, ppg, 22)
+    grouped = pd.Series(ppg).groupby(np.floor(times).astype(int)).agg(lambda s: s.max() - s.min())
+    expected = grouped.reindex(range(22)).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(amplitude, expected)
+    assert np.isnan(amplitude[[7, 20, 21]]).all()
+
+
+def test_compute_features_layout():
+    gsr = np.linspace(0, 1, 600)
+    hr_times = np.arange(0.5, 600, 1.0)
+    df = compute_features(gsr, {'heart_rate': {'time': hr_times, 'heart_rate': np.full(len(hr_times), 70.0)}})
+    assert list(df.columns) == ['Window Start'] + FEATURE_NAMES + ['Valid Fraction', 'Stage']
+    assert len(df) == len(window_bounds(600, 30, 5)[0])
+    assert (df[FEATURE_NAMES].dtypes == np.float32).all()
+    # The mean of a window of a ramp is its value at the window's midpoint.
+    np.testing.assert_allclose(df['gsr_mean'], (df['Window Start'] + 14.5) / 599, rtol=1e-5)
+    np.testing.assert_allclose(df['gsr_slope'], 1 / 599, rtol=1e-4)
+    np.testing.assert_allclose(df['hr_mean'].iloc[1:], 70.0)
+    assert df['Stage'].iloc[0] == 'Calibration (20s)'
+    assert df['rr_rmssd'].isna().all()
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from scipy import signal
+
+from hrv import (RollingHRV, analyze_rr, clean_rr, lf_hf, resample_rr, rolling_hrv, rolling_lf_hf,
+                 successive, welch_psd)
+
+rng = np.random.default_rng(0)
+
+
+def _naive_hrv(rr, window, index=None):
+    index = np.arange(len(rr)) if index is None else index
+    rmssd, sdnn, pnn50 = (np.full(len(rr), np.nan) for _ in range(3))
+    for i in range(window - 1, len(rr)):
+        beats = rr[i - window + 1:i + 1]
+        diff = np.diff(beats)[np.diff(index[i - window + 1:i + 1]) == 1]
+        sdnn[i] = beats.std()
+        if len(diff):
+            rmssd[i] = np.sqrt(np.mean(diff ** 2))
+            pnn50[i] = 100 * np.mean(np.abs(diff) > 50)
+    return {'rmssd': rmssd, 'sdnn': sdnn, 'pnn50': pnn50}
+
+
+def test_clean_rr_drops_artifacts():
+    times, rr, beats = clean_rr(np.arange(5.0), np.array([10, 800, 2000, 6035, 300], dtype=np.float32))
+    np.testing.assert_array_equal(times, [1, 2, 4])
+    assert rr.dtype == np.float64 and rr.tolist() == [800, 2000, 300]
+    assert beats.tolist() == [1, 2, 4]
+    assert successive(beats).tolist() == [True, False]
+
+
+def _with_artifacts(n):
+    """A clean RR series with every fifth interval replaced by an artifact, as (times, raw rr)."""
+    rr = rng.normal(800, 60, n)
+    rr[::5] = 10
+    return np.cumsum(np.abs(rr)) / 1000, rr
+
+
+@pytest.mark.parametrize('window', [2, 5, 30])
+def test_rolling_hrv_matches_naive(window):
+    rr = rng.normal(800, 60, 200)
+    result = rolling_hrv(rr, window=window)
+    expected = _naive_hrv(rr, window)
+    for name in expected:
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-7, err_msg=name)
+
+
+@pytest.mark.parametrize('window', [2, 5, 30])
+def test_rolling_hrv_skips_pairs_across_dropped_beats(window):
+    times, rr, beats = clean_rr(*_with_artifacts(200))
+    result = rolling_hrv(rr, window=window, beats=beats)
+    expected = _naive_hrv(rr, window, beats)
+    for name in expected:
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-7, err_msg=name)
+
+
+def test_session_rmssd_only_uses_successive_differences():
+    times, rr, beats = clean_rr(*_with_artifacts(200))
+    diff = np.diff(rr)[np.diff(beats) == 1]
+    metrics = analyze_rr(times, rr, beats=beats)
+    assert metrics['session_rmssd'] == pytest.approx(np.sqrt(np.mean(diff ** 2)))
+    assert metrics['session_pnn50'] == pytest.approx(100 * np.mean(np.abs(diff) > 50))
+
+
+def test_incremental_matches_vectorized():
+    rr = rng.normal(800, 60, 150)
+    rolling = RollingHRV(window=20)
+    incremental = np.array([rolling.update(value) for value in rr])
+    expected = rolling_hrv(rr, window=20)
+    for column, name in enumerate(('rmssd', 'sdnn', 'pnn50')):
+        np.testing.assert_allclose(incremental[:, column], expected[name], rtol=1e-6, err_msg=name)
+
+
+def test_incremental_skips_pairs_across_dropped_beats():
+    _, rr, beats = clean_rr(*_with_artifacts(150))
+    rolling = RollingHRV(window=20)
+    adjacent = np.r_[True, successive(beats)]
+    incremental = np.array([rolling.update(value, ok) for value, ok in zip(rr, adjacent)])
+    expected = rolling_hrv(rr, window=20, beats=beats)
+    for column, name in enumerate(('rmssd', 'sdnn', 'pnn50')):
+        np.testing.assert_allclose(incremental[:, column], expected[name], rtol=1e-6, err_msg=name)
+
+
+def test_welch_psd_matches_scipy():
+    x = rng.normal(0, 1, 2000)
+    freqs, psd = welch_psd(x, fs=4.0, segment=256)
+    expected_freqs, expected = signal.welch(x, fs=4.0, window=np.hanning(256), noverlap=128, detrend='constant')
+    np.testing.assert_allclose(freqs, expected_freqs)
+    np.testing.assert_allclose(psd, expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize('frequency, lf_dominant', [(0.1, True), (0.3, False)])
+def test_lf_hf_finds_the_modulated_band(frequency, lf_dominant):
+    # Beat times of an RR series modulated at `frequency` Hz.
+    times = [0.0]
+    while times[-1] < 600:
+        times.append(times[-1] + 0.8 + 0.05 * np.sin(2 * np.pi * frequency * times[-1]))
+    times = np.array(times[1:])
+    rr_ms = 1000 * np.diff(np.r_[0.0, times])
+    _, _, ratio = lf_hf(times, rr_ms)
+    assert (ratio > 10) if lf_dominant else (ratio < 0.1)
+    ends, ratios = rolling_lf_hf(times, rr_ms, window_s=120, step_s=30)
+    assert len(ends) == len(ratios) > 10
+    assert np.all(ratios > 1) if lf_dominant else np.all(ratios < 1)
+
+
+def test_tachogram_is_not_interpolated_across_gaps():
+    times = np.r_[np.arange(0, 60, 0.8), np.arange(90, 300, 0.8)]
+    rr_ms = rng.normal(800, 30, len(times))
+    last_before = times[times < 60][-1]
+    grid, tachogram = resample_rr(times, rr_ms)
+    gap = (grid > last_before) & (grid < 90)
+    assert np.isnan(tachogram[gap]).all() and not np.isnan(tachogram[~gap]).any()
+
+    ends, ratios = rolling_lf_hf(times, rr_ms, window_s=60, step_s=10)
+    # A window covers the 240 grid points (4 Hz) up to its end.
+    spans_gap = (ends - 60 + 0.25 < 90) & (ends > last_before)
+    assert np.isnan(ratios[spans_gap]).all() and not np.isnan(ratios[~spans_gap]).any()
+    # The whole-session estimate only averages the segments after the gap.
+    assert np.isfinite(lf_hf(times, rr_ms)[2])
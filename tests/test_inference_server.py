@@ -0,0 +1,136 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from fast_predict import CompiledTree, export_tree
+from inference_server import InferenceServer, MicroBatcher
+from load_generator import get_json, http_request, run_load
+
+
+@pytest.fixture
+def tree_path(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.random((500, 1))
+    y = np.where(X[:, 0] < 0.4, 'Relaxed', np.where(X[:, 0] < 0.7, 'Normal', 'Stress'))
+    return export_tree(DecisionTreeClassifier(random_state=0).fit(X, y), str(tmp_path / 'tree.npz'))
+
+
+async def _batched(predict, requests, max_batch=256, max_latency_ms=20.0):
+    executor = ThreadPoolExecutor(max_workers=1)
+    batcher = MicroBatcher(predict, executor, max_batch, max_latency_ms)
+    task = asyncio.create_task(batcher.run())
+    try:
+        results = await asyncio.gather(*(batcher.submit(rows) for rows in requests), return_exceptions=True)
+    finally:
+        task.cancel()
+        executor.shutdown()
+    return results, batcher.stats
+
+
+def test_concurrent_requests_share_batches():
+    calls = []
+
+    def predict(X):
+        calls.append(len(X))
+        return X[:, 0] * 2, X.sum(axis=1)
+
+    requests = [np.full((1 + i % 3, 2), float(i)) for i in range(40)]
+    results, stats = asyncio.run(_batched(predict, requests))
+    for rows, (doubled, sums) in zip(requests, results):
+        np.testing.assert_array_equal(doubled, rows[:, 0] * 2)
+        np.testing.assert_array_equal(sums, rows.sum(axis=1))
+    assert sum(calls) == sum(len(r) for r in requests) == stats.rows
+    assert len(calls) < len(requests) and stats.requests == 40 and stats.batches == len(calls)
+
+
+def test_batches_never_exceed_max_batch():
+    calls = []
+
+    def predict(X):
+        calls.append(len(X))
+        return (X[:, 0],)
+
+    asyncio.run(_batched(predict, [np.zeros((3, 1))] * 30, max_batch=8))
+    # A batch closes once it holds max_batch rows, so it can overshoot by at most one request.
+    assert max(calls) <= 8 + 2 and sum(calls) == 90
+
+
+def test_a_failing_batch_fails_its_requests():
+    def predict(X):
+        raise RuntimeError('model crashed')
+
+    results, stats = asyncio.run(_batched(predict, [np.zeros((1, 1))] * 5))
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert stats.errors == 5
+
+
+async def _serve(tree_path, client):
+    server = InferenceServer(tree_path, tflite=False, max_latency_ms=2.0)
+    host, port = await server.start('127.0.0.1', 0)
+    try:
+        return await client(server, host, port)
+    finally:
+        await server.stop()
+
+
+async def _requests(host, port, *requests):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return [await http_request(reader, writer, method, path, payload) for method, path, payload in requests]
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def test_http_predictions_equal_the_compiled_tree(tree_path):
+    values = np.random.default_rng(1).random(50)
+
+    async def client(server, host, port):
+        return await _requests(host, port, ('GET', '/health', None),
+                               ('POST', '/predict/tree', {'values': values.tolist()}),
+                               ('POST', '/predict/tree', {'values': 0.5}))
+
+    (_, health), (status, body), (_, single) = asyncio.run(_serve(tree_path, client))
+    tree = CompiledTree.load(tree_path)
+    assert health == {'models': ['tree'], 'window': None}
+    assert status == 200 and body['classes'] == tree.classes.tolist()
+    assert body['labels'] == tree.predict(values).tolist()
+    np.testing.assert_allclose(body['probabilities'], tree.predict_proba(values))
+    assert single['labels'] == tree.predict(np.array([0.5])).tolist()
+
+
+def test_http_errors(tree_path):
+    async def client(server, host, port):
+        def crash(values):
+            raise ValueError('bad input')
+        server.batchers['tree'].predict = crash
+        return await _requests(host, port, ('POST', '/predict/tree', {'value': [1]}),
+                               ('POST', '/predict/tree', {'values': ['x']}),
+                               ('POST', '/predict/tree', {'values': []}),
+                               ('GET', '/predict/tree', None),
+                               ('POST', '/predict/tflite', {'windows': [[0.0] * 30]}),
+                               ('POST', '/predict/forest', {'values': [1]}),
+                               ('GET', '/missing', None),
+                               ('POST', '/predict/tree', {'values': [0.5]}))
+
+    responses = asyncio.run(_serve(tree_path, client))
+    assert [status for status, _ in responses] == [400, 400, 400, 405, 503, 404, 404, 500]
+    assert responses[0][1] == {'error': "missing field 'values'"}
+    assert responses[-1][1] == {'error': 'ValueError: bad input'}
+
+
+def test_load_generator_against_a_local_server(tree_path):
+    async def client(server, host, port):
+        summary, stats = await run_load(host, port, devices=8, duration=0.3, model='tree', rows=2)
+        with pytest.raises(ValueError, match="does not serve 'tflite'"):
+            await run_load(host, port, model='tflite')
+        return summary, stats, await get_json(host, port, '/stats')
+
+    summary, stats, after = asyncio.run(_serve(tree_path, client))
+    assert summary['requests'] > 0 and summary['errors'] == 0 and summary['p50_ms'] is not None
+    assert stats['tree']['requests'] == summary['requests']
+    assert stats['tree']['rows'] == 2 * summary['requests']
+    assert stats['tree']['batches'] <= summary['requests'] and after['tree']['requests'] == summary['requests']
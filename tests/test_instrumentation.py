@@ -0,0 +1,66 @@
+import json
+
+import instrumentation
+from instrumentation import Profiler, profiled
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    with profiler.step('load', rows=10) as s:
+        s.add(rows=5)
+    assert profiler.records == []
+
+
+def test_nested_steps_and_summary(tmp_path):
+    source = tmp_path / 'data.csv'
+    source.write_bytes(b'x' * 1234)
+    profiler = Profiler(enabled=True)
+    for _ in range(2):
+        with profiler.step('process'):
+            with profiler.step('load', path=str(source)) as s:
+                s.add(rows=100)
+            with profiler.step('clean', rows=7):
+                pass
+    assert [r['stack'] for r in profiler.records[:3]] == ['process;load', 'process;clean', 'process']
+    summary = profiler.summary()
+    load = summary['process;load']
+    assert (load['calls'], load['rows'], load['bytes']) == (2, 200, 2 * 1234)
+    assert summary['process;clean']['rows'] == 14
+    assert summary['process']['total_s'] >= summary['process;load']['total_s'] + summary['process;clean']['total_s']
+
+
+def test_folded_stacks_hold_self_time():
+    profiler = Profiler(enabled=True)
+    profiler.records = [
+        {'name': 'process', 'stack': 'process', 'start': 0.0, 'duration': 1.0, 'rows': 0, 'bytes': 0},
+        {'name': 'load', 'stack': 'process;load', 'start': 0.1, 'duration': 0.25, 'rows': 0, 'bytes': 0},
+        {'name': 'clean', 'stack': 'process;clean', 'start': 0.5, 'duration': 0.5, 'rows': 0, 'bytes': 0},
+    ]
+    assert profiler.to_folded().splitlines() == ['process 250000', 'process;clean 500000', 'process;load 250000']
+    events = profiler.to_chrome_trace()['traceEvents']
+    assert [(e['name'], e['ph'], e['ts'], e['dur']) for e in events] == [
+        ('process', 'X', 0.0, 1e6), ('load', 'X', 1e5, 2.5e5), ('clean', 'X', 5e5, 5e5)]
+
+
+def test_export_formats(tmp_path):
+    profiler = Profiler(enabled=True)
+    with profiler.step('load', rows=3):
+        pass
+    profiler.export(str(tmp_path / 'profile.json'))
+    profiler.export(str(tmp_path / 'profile.trace.json'))
+    profiler.export(str(tmp_path / 'profile.folded'))
+    assert json.loads((tmp_path / 'profile.json').read_text())['summary']['load']['rows'] == 3
+    assert len(json.loads((tmp_path / 'profile.trace.json').read_text())['traceEvents']) == 1
+    assert (tmp_path / 'profile.folded').read_text().startswith('load ')
+
+
+def test_profiled_decorator(monkeypatch):
+    @profiled()
+    def clean(x):
+        return x + 1
+
+    monkeypatch.setattr(instrumentation, 'PROFILER', Profiler(enabled=False))
+    assert clean(1) == 2 and instrumentation.PROFILER.records == []
+    monkeypatch.setattr(instrumentation, 'PROFILER', Profiler(enabled=True))
+    assert clean(2) == 3
+    assert [r['name'] for r in instrumentation.PROFILER.records] == ['clean']
@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import manifest as manifest_module
+from benchmark import make_cosinuss_session
+from manifest import build_manifest, load_manifest, session_stream_file
+
+
+@pytest.fixture
+def root(tmp_path):
+    make_cosinuss_session(str(tmp_path / 'v1 - p'), 30, ppg_rate_hz=20, label='V1')
+    shutil.copytree(tmp_path / 'v1 - p', tmp_path / 'backup' / 'v1 - p')
+    make_cosinuss_session(str(tmp_path / 'v2 - p'), 30, ppg_rate_hz=20, seed=1, label='v2')
+    pd.DataFrame({'Time': range(10), 'Resistance (Ohms)': range(10)}).to_csv(tmp_path / 'GSR-1.csv', index=False)
+    shutil.copy(tmp_path / 'GSR-1.csv', tmp_path / 'backup' / 'GSR-1.csv')
+    return str(tmp_path)
+
+
+def test_duplicates_are_collapsed(root):
+    manifest = build_manifest(root)
+    # Three streams in each of three folders plus two copies of one GSR file.
+    assert len(manifest.entries) == 11
+    assert len(manifest.unique()) == 7
+    duplicates = manifest.duplicates()
+    assert len(duplicates) == 4
+    assert duplicates[manifest.by_path['GSR-1.csv']['key']] == ['GSR-1.csv', os.path.join('backup', 'GSR-1.csv')]
+    # The first path in sorted order is the canonical copy.
+    for paths in duplicates.values():
+        assert not manifest.is_duplicate(os.path.join(root, paths[0]))
+        assert manifest.is_duplicate(os.path.join(root, paths[1]))
+    assert [e['path'].split(os.sep)[0] for e in manifest.find('v1', 'heart_rate')] == ['backup']
+    assert len(manifest.find('V2', 'rr_int')) == 1
+
+
+def test_rows_and_body_offset(root):
+    manifest = build_manifest(root)
+    for entry in manifest.entries:
+        file_path = manifest.path(entry)
+        with open(file_path, 'rb') as f:
+            f.seek(entry['byte_start'])
+            body = f.read()
+        skip = 12 if entry['stream'] else 1
+        assert entry['rows'] == len(pd.read_csv(file_path, skiprows=skip, header=None)), entry['path']
+        assert body == open(file_path, 'rb').read().split(b'\n', skip)[skip]
+
+
+def test_rebuild_only_scans_changed_files(root, monkeypatch):
+    previous = build_manifest(root)
+    scanned = []
+    scan_file = manifest_module.scan_file
+    monkeypatch.setattr(manifest_module, 'scan_file', lambda path, r: scanned.append(path) or scan_file(path, r))
+    with open(os.path.join(root, 'GSR-1.csv'), 'a') as f:
+        f.write('10,10\n')
+    rebuilt = build_manifest(root, previous=previous)
+    assert scanned == [os.path.join(root, 'GSR-1.csv')]
+    assert rebuilt.by_path['GSR-1.csv']['rows'] == 11
+    assert not rebuilt.duplicates().get(rebuilt.by_path['GSR-1.csv']['key'])
+
+
+def test_session_stream_file_refreshes_on_a_miss(root, tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    load_manifest(path, root)
+    folder = os.path.join(root, 'v3 - p')
+    files = make_cosinuss_session(folder, 30, ppg_rate_hz=20, seed=3, label='V3')
+    assert load_manifest(path, root).stream_file(folder, 'heart_rate') is None
+    assert session_stream_file(folder, 'heart_rate', path, root) == files['heart_rate']
+    assert session_stream_file(os.path.join(root, 'missing'), 'heart_rate', path, root) is None
@@ -0,0 +1,13 @@
+import numpy as np
+
+from numeric import cumsum0
+
+
+def test_cumsum0_gives_window_sums():
+    x = np.array([1, 2, 3])
+    c = cumsum0(x)
+    np.testing.assert_array_equal(c, [0, 1, 3, 6])
+    assert c.dtype == np.float64
+    assert [c[b] - c[a] for a, b in [(0, 3), (1, 2), (2, 2)]] == [6, 2, 0]
+    assert cumsum0(np.array([], dtype=bool)).tolist() == [0]
+    np.testing.assert_array_equal(cumsum0(np.array([True, False, True])), [0, 1, 1, 2])
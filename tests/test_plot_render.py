@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import gsr_analysis
+from plot_render import PlotSpec, Series, decimate, lttb, minmax_decimate, render_batch, render_plot, stage_markers
+
+rng = np.random.default_rng(0)
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    y = np.cumsum(rng.normal(0, 1, 10_007))
+    x = np.arange(len(y)) * 0.5
+    dx, dy = minmax_decimate(x, y, 100)
+    assert len(dy) <= 200
+    assert np.all(np.diff(dx) > 0)
+    starts = (np.arange(100) * len(y)) // 100
+    buckets = np.searchsorted(x[starts], dx, side='right') - 1
+    for b, (lo, hi) in enumerate(zip(starts, np.r_[starts[1:], len(y)])):
+        kept = dy[buckets == b]
+        assert kept.min() == y[lo:hi].min() and kept.max() == y[lo:hi].max()
+    np.testing.assert_array_equal(dy, y[(dx * 2).astype(int)])
+
+
+def test_minmax_keeps_nan_gaps():
+    y = np.sin(np.linspace(0, 20, 5000))
+    y[2000:2100] = np.nan
+    _, dy = minmax_decimate(np.arange(5000), y, 50)
+    assert np.isnan(dy).sum() >= 1
+    assert np.nanmax(dy) == np.nanmax(y) and np.nanmin(dy) == np.nanmin(y)
+
+
+def test_lttb_and_decimate():
+    y = np.cumsum(rng.normal(0, 1, 3000))
+    x = np.arange(3000.0)
+    lx, ly = lttb(x, y, 300)
+    assert len(lx) == 300 and lx[0] == 0 and lx[-1] == 2999
+    assert np.all(np.diff(lx) > 0)
+    np.testing.assert_array_equal(ly, y[lx.astype(int)])
+    short_x, short_y = decimate(x[:100], y[:100], 500)
+    np.testing.assert_array_equal(short_y, y[:100])
+    assert len(decimate(x, y, 400, method='lttb')[0]) == 400
+    assert len(decimate(x, y, 400)[0]) <= 400
+
+
+def test_stage_markers():
+    assert stage_markers({'a': 20, 'b': 240, 'c': 60}) == [(0, 'a'), (20, 'b'), (260, 'c')]
+
+
+def test_render_plot_and_batch(tmp_path):
+    t = np.arange(100_000)
+    specs = [PlotSpec(str(tmp_path / 'plots' / f'{i}.png'), f'Plot {i}', 'Time', 'GSR',
+                      [Series(t, np.sin(t / (100 + i)), 'GSR', 'blue', 'blue')],
+                      markers=stage_markers({'a': 20_000, 'b': 80_000}), annotation=('Stress', 'red'))
+             for i in range(3)]
+    assert render_plot(specs[0]) == specs[0].file
+    assert render_batch(specs, workers=2) == [spec.file for spec in specs]
+    for spec in specs:
+        with open(spec.file, 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+
+
+def test_gsr_analysis_saves_both_charts(tmp_path):
+    csv_dir = tmp_path / 'gsr'
+    os.makedirs(csv_dir)
+    for i in range(34):
+        n = 40
+        pd.DataFrame({'Resistance': rng.normal(1000, 50, n),
+                      'Stage': np.repeat(['Relaxation', 'Under Stress'], n // 2)}).to_csv(csv_dir / f'GSR{i}.csv')
+    output_dir = tmp_path / 'graphs'
+    gsr_analysis.main(['--csv-dir', str(csv_dir), '--output-dir', str(output_dir)])
+    assert sorted(os.listdir(output_dir)) == ['cold_pressure_volunteers.png', 'doctor_game_volunteers.png']
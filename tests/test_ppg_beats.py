@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from benchmark import make_cosinuss_session
+from cosinuss_reader import find_session_files, load_stream
+from ppg_beats import (StreamingBeatDetector, detect_beats, moving_average, rr_from_beats, session_rr,
+                       stream_beats)
+
+FS = 100.0
+
+
+def synthetic_ppg(seconds=120, seed=0):
+    """Raw ppg_ir whose pulses dip at known beat times, with baseline drift, noise and timestamp jitter."""
+    rng = np.random.default_rng(seed)
+    rr = np.clip(rng.normal(0.8, 0.05, int(seconds / 0.6)), 0.5, 1.2)
+    beats = 1 + np.cumsum(rr)
+    beats = beats[beats < seconds - 1]
+    times = np.arange(int(seconds * FS)) / FS + rng.uniform(-0.002, 0.002, int(seconds * FS))
+    times.sort()
+    pulse = np.exp(-((times[:, np.newaxis] - beats) / 0.06) ** 2).sum(axis=1)
+    ppg = 145000 + 300 * np.sin(times / 9) - 400 * pulse + rng.normal(0, 5, len(times))
+    return times, ppg, beats
+
+
+def test_moving_average_matches_a_loop():
+    x = np.random.default_rng(0).normal(0, 1, 50)
+    for width in (1, 4, 5):
+        half = width // 2
+        expected = [x[max(0, i - half):i + half + 1].mean() for i in range(len(x))]
+        np.testing.assert_allclose(moving_average(x, width), expected)
+
+
+def test_detected_beats_match_the_true_beats():
+    times, ppg, beats = synthetic_ppg()
+    detected = detect_beats(times, ppg)
+    assert len(detected) == len(beats)
+    np.testing.assert_allclose(detected, beats, atol=0.01)
+    _, rr_ms = rr_from_beats(detected)
+    np.testing.assert_allclose(rr_ms, np.diff(beats) * 1000, atol=20)
+
+
+@pytest.mark.parametrize('chunk_rows', [250, 997, 4000, 100_000])
+def test_streaming_beats_equal_batch_beats(chunk_rows):
+    times, ppg, _ = synthetic_ppg(seed=1)
+    detector = StreamingBeatDetector(FS)
+    streamed = [detector.push(times[i:i + chunk_rows], ppg[i:i + chunk_rows])
+                for i in range(0, len(times), chunk_rows)]
+    streamed = np.concatenate(streamed + [detector.flush()])
+    np.testing.assert_allclose(streamed, detect_beats(times, ppg, FS), rtol=0, atol=1e-9)
+
+
+def test_stream_beats_from_a_file(tmp_path):
+    files = make_cosinuss_session(str(tmp_path), 60, ppg_rate_hz=100)
+    _, columns = load_stream(files['ppg_ir_ppg_ambient_ppg_red'])
+    expected = detect_beats(columns['time'], columns['ppg_ir'], FS)
+    beats = stream_beats(files['ppg_ir_ppg_ambient_ppg_red'], chunk_rows=1000, fs=FS)
+    np.testing.assert_allclose(beats, expected, atol=1e-6)
+
+    times, rr_ms = session_rr(str(tmp_path), chunk_rows=1000)
+    _, rr_int = load_stream(find_session_files(str(tmp_path))['rr_int'])
+    # Beats come from a pulse wave built on the rr_int beats, so the median intervals agree.
+    assert abs(np.median(rr_ms) - np.median(rr_int['rr_int'])) < 25
+    assert len(times) == len(rr_ms) == len(beats) - 1
@@ -0,0 +1,91 @@
+import os
+import importlib.util
+
+import numpy as np
+import pytest
+
+from benchmark import DONE_DIR, PREAMBLE, _write_stream
+from quality import (QualityMask, build_quality_mask, invalid_spans, quality_files, rolling_std, shift_mask,
+                     valid_at, valid_fraction)
+from stage_protocol import DEFAULT_STAGES
+
+PREFIX = 'BENCH.0000_2025-01-01_00-00-00'
+
+
+def write_session(folder, seconds=100, gap=(80.0, 83.0)):
+    """Quality scores failing in [20, 30), a shaking earpiece in [60, 65) and lost BLE packets over gap."""
+    rng = np.random.default_rng(0)
+    preamble = PREAMBLE.format(tag='0000', label='V1')
+    t = np.arange(0.0, seconds)
+    _write_stream(folder, PREFIX, 'quality', preamble,
+                  {'time': t, 'quality': np.where((t >= 20) & (t < 30), 10, 80)}, '%.3f')
+    t_acc = np.arange(0, seconds, 0.02)
+    shaking = (t_acc >= 60) & (t_acc < 65)
+    acc = 1.0 + rng.normal(0, 0.001, len(t_acc)) + np.where(shaking, 0.5 * np.sin(2 * np.pi * 3 * t_acc), 0)
+    _write_stream(folder, PREFIX, 'acc_mag', preamble, {'time': t_acc, 'acc_mag': acc}, '%.4f')
+    t_ble = np.arange(0.1, seconds, 0.1)
+    received = (t_ble < gap[0]) | (t_ble >= gap[1])
+    packets = np.arange(1, len(t_ble) + 1)
+    _write_stream(folder, PREFIX, 'ble_sample_counter_ble_sample_amount_ble_packet_counter', preamble,
+                  {'time': t_ble[received], 'ble_sample_counter': 10 * packets[received],
+                   'ble_sample_amount': np.full(received.sum(), 10), 'ble_packet_counter': packets[received]},
+                  '%.3f')
+
+
+@pytest.mark.parametrize('window', [4, 5])
+def test_rolling_std_matches_a_loop(window):
+    x = np.random.default_rng(1).normal(0, 1, 60)
+    x[[3, 17, 18]] = np.nan
+    expected = [np.nanstd(x[max(0, i - window // 2):i + (window - 1) // 2 + 1]) for i in range(len(x))]
+    np.testing.assert_allclose(rolling_std(x, window), expected, atol=1e-12)
+
+
+def test_mask_flags_every_criterion(tmp_path):
+    write_session(str(tmp_path))
+    mask = build_quality_mask(str(tmp_path))
+    assert set(mask.reasons) == {'quality', 'acc_mag', 'ble_gap'}
+    assert len(mask.time) == 100 and mask.rate_hz == 1.0
+    assert invalid_spans(mask.reasons['quality'], mask.time) == [(20.0, 30.0)]
+    [(start, end)] = invalid_spans(mask.reasons['acc_mag'], mask.time)
+    assert 56 <= start <= 60 and 65 <= end <= 68
+    [(start, end)] = invalid_spans(mask.reasons['ble_gap'], mask.time)
+    assert start == 79.0 and end == 83.0
+    np.testing.assert_array_equal(mask.valid, np.logical_and.reduce(list(mask.reasons.values())))
+    assert len(quality_files(str(tmp_path))) == 3
+
+
+def test_short_gaps_and_disabled_gaps_are_kept(tmp_path):
+    write_session(str(tmp_path), gap=(50.0, 50.5))
+    assert build_quality_mask(str(tmp_path)).reasons['ble_gap'].all()
+    assert 'ble_gap' not in build_quality_mask(str(tmp_path), max_gap_s=None).reasons
+
+
+def test_valid_at_and_valid_fraction():
+    valid = np.ones(100, dtype=bool)
+    valid[10:20] = False
+    mask = QualityMask(np.arange(100.0), valid, {}, 1.0)
+    np.testing.assert_array_equal(valid_at(mask, [-5, 9.9, 10, 19.99, 20, 150]), [True, True, False, False, True, True])
+    starts = np.arange(0, 70, 5)
+    ends = starts + 30
+    np.testing.assert_allclose(valid_fraction(mask, starts, ends), [valid[s:e].mean() for s, e in zip(starts, ends)])
+    shifted = shift_mask(mask, -5.0)
+    np.testing.assert_array_equal(valid_at(shifted, [4.5, 5.5, 14.5, 15.5]), [True, False, False, True])
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_presentation_hr_blanks_invalid_seconds(tmp_path):
+    spec = importlib.util.spec_from_file_location(
+        'presentation_main', os.path.join(DONE_DIR, 'presentation volunteers', 'main.py'))
+    presentation = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(presentation)
+
+    write_session(str(tmp_path))
+    t = np.arange(0.0, 100)
+    hr_file = _write_stream(str(tmp_path), PREFIX, 'heart_rate', PREAMBLE.format(tag='0000', label='V1'),
+                            {'time': t, 'heart_rate': 70 + 10 * np.sin(t / 7)}, '%.3f')
+    hr = presentation.clean_hr_data(hr_file, DEFAULT_STAGES)
+    invalid = ~build_quality_mask(str(tmp_path)).valid
+    # Invalid seconds stay in the frame as gaps instead of being dropped.
+    assert len(hr) == 100
+    np.testing.assert_array_equal(hr['heart_rate'].isna().to_numpy(), invalid)
+    assert hr['heart_rate'].min() == 0.0 and hr['heart_rate'].max() == 1.0
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from session_store import SessionStore, cache_key
+
+
+def _frame(n=1000):
+    return pd.DataFrame({
+        'Time': np.arange(n, dtype=np.int64),
+        'Resistance (Ohms)': np.linspace(0, 1, n, dtype=np.float32),
+        'Stage': pd.Categorical(np.where(np.arange(n) < n // 2, 'Relaxation', 'Under Stress')),
+        'Note': np.where(np.arange(n) % 2, 'odd', 'even').astype(object),
+    })
+
+
+def test_cache_key_depends_on_contents_params_and_version(tmp_path):
+    source = tmp_path / 'GSR_Data-1.csv'
+    source.write_text('Time,Resistance (Ohms)\n0,1.0\n')
+    key = cache_key(str(source), {'a': 1}, 'gsr_clean/1')
+    assert key == cache_key([str(source)], {'a': 1}, 'gsr_clean/1')
+    assert key != cache_key(str(source), {'a': 2}, 'gsr_clean/1')
+    assert key != cache_key(str(source), {'a': 1}, 'gsr_clean/2')
+    source.write_text('Time,Resistance (Ohms)\n0,2.0\n')
+    assert key != cache_key(str(source), {'a': 1}, 'gsr_clean/1')
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = SessionStore(str(tmp_path))
+    df = _frame()
+    store.save_frame('k', df)
+    loaded = store.load_frame('k')
+    pd.testing.assert_frame_equal(loaded, df.astype({'Note': str}), check_dtype=False)
+    assert loaded['Stage'].dtype == df['Stage'].dtype
+    assert loaded['Resistance (Ohms)'].dtype == np.float32
+    assert store.load_frame('missing') is None
+
+
+def test_iter_chunks_concatenates_to_the_frame(tmp_path):
+    store = SessionStore(str(tmp_path))
+    df = _frame()
+    store.save_frame('k', df)
+    chunks = list(store.iter_chunks('k', chunk_rows=300, columns=['Resistance (Ohms)', 'Stage']))
+    assert [len(c) for c in chunks] == [300, 300, 300, 100]
+    combined = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(combined, store.load_frame('k')[['Resistance (Ohms)', 'Stage']])
+
+
+def test_cached_frame_computes_once_per_version(tmp_path):
+    source = tmp_path / 'source.csv'
+    source.write_text('x\n1\n')
+    store = SessionStore(str(tmp_path / 'store'))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return _frame(10)
+
+    _, cached = store.cached_frame(str(source), {}, compute, 'test/1')
+    assert not cached
+    df, cached = store.cached_frame(str(source), {}, compute, 'test/1')
+    assert cached and len(df) == 10
+    _, cached = store.cached_frame(str(source), {}, compute, 'test/2')
+    assert not cached
+    assert len(calls) == 2
+    assert store.cached_frame(str(source), {'empty': True}, lambda: None, 'test/1') == (None, False)
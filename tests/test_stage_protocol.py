@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from stage_protocol import DEFAULT_STAGES, STAGE_LABELS, StageProtocol, label_for_stage, stage_label_codes
+
+
+def _loop_stages(times, stages):
+    # The per-stage boolean-mask loop StageProtocol replaced.
+    df = pd.DataFrame({'Time': times})
+    df['Stage'] = ''
+    current_time = 0
+    for stage, duration in stages.items():
+        end_time = current_time + duration
+        df.loc[(df['Time'] >= current_time) & (df['Time'] < end_time), 'Stage'] = stage
+        current_time = end_time
+    return df['Stage'].to_numpy()
+
+
+def test_stage_codes_match_the_loop():
+    times = np.concatenate([np.arange(-5, 700, 0.5), [20, 260, 440, 500, 559.999, 560]])
+    protocol = StageProtocol(DEFAULT_STAGES)
+    codes = protocol.stage_codes(times)
+    names = np.array(protocol.names + [''], dtype=object)[codes]
+    np.testing.assert_array_equal(names, _loop_stages(times, DEFAULT_STAGES))
+
+
+def test_label_codes_match_label_for_stage():
+    times = np.arange(-10, 600)
+    protocol = StageProtocol(DEFAULT_STAGES)
+    labels = protocol.label_categorical(times)
+    expected = [label_for_stage(name) if name else np.nan for name in _loop_stages(times, DEFAULT_STAGES)]
+    pd.testing.assert_series_equal(pd.Series(labels, dtype=object), pd.Series(expected, dtype=object))
+    assert list(labels.categories) == list(STAGE_LABELS)
+
+
+def test_stage_label_codes_per_name():
+    stages = ['Calibration (20s)', 'Remove 5 Easy Pieces (3 min)', 'Normal - Watch Video (4 min)', 'Break', None]
+    np.testing.assert_array_equal(stage_label_codes(stages), [0, 2, 1, -1, -1])
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pytest
+
+from batch_predict import classify_scores, sliding_windows
+from stream_scorer import RingWindow, StreamingStressScorer, follow_lines, read_lines, simulate_sensor, tail_file
+
+
+class MeanScorer:
+    """Scores a window by its mean, with TFLiteBatchScorer's score() interface."""
+    window = 30
+
+    def score(self, windows):
+        return np.asarray(windows, dtype=np.float32).mean(axis=1)
+
+
+def test_ring_window_holds_the_last_samples():
+    ring = RingWindow(4)
+    values = np.arange(11, dtype=np.float32)
+    for i, value in enumerate(values):
+        ring.push(value)
+        assert ring.full == (i >= 3)
+        if ring.full:
+            np.testing.assert_array_equal(ring.window(), values[i - 3:i + 1])
+
+
+def test_streaming_scores_equal_the_batch_scores():
+    samples = list(simulate_sensor(200, seed=3))
+    events = list(StreamingStressScorer(MeanScorer()).run(samples))
+    expected = sliding_windows(samples, 30).mean(axis=1)
+    assert [e.sample_index for e in events] == list(range(29, 200))
+    np.testing.assert_allclose([e.score for e in events], expected, rtol=1e-6)
+    assert [e.label for e in events] == list(classify_scores(np.float32(expected)))
+    assert [e.value for e in events] == samples[29:]
+
+
+def test_rows_are_cleaned_like_the_training_data(tmp_path):
+    # Two readings in second 0 are averaged, the missing second 2 is interpolated, the
+    # late row of second 2 is dropped, the column is picked by name and Stage is ignored.
+    lines = ['Time,Resistance (Ohms),Stage\n', '0,10,a\n', '0,20,a\n', '\n', '1,30,a\n', '3,70,b\n', '2,999,b\n',
+             '4,x,b\n']
+    assert list(read_lines(lines, low=10, high=90)) == [0.0625, 0.25, 0.5, 0.75]
+    # Without a known range the values are normalized over the range seen so far.
+    assert list(read_lines(lines)) == [0.0, 1.0, 1.0, 1.0]
+    assert list(read_lines(['0.5\n', '0.25\n', '1.0\n'])) == [0.0, 0.0, 1.0]
+    with pytest.raises(ValueError):
+        list(read_lines(['Time,Conductance\n', '0,1\n']))
+
+    log = tmp_path / 'gsr.csv'
+    log.write_text(''.join(lines))
+    assert list(tail_file(str(log), follow=False, low=10, high=90)) == [0.0625, 0.25, 0.5, 0.75]
+
+
+def test_a_partially_written_line_waits_for_its_newline(tmp_path, monkeypatch):
+    log = tmp_path / 'gsr.csv'
+    log.write_text('Time,Resistance (Ohms)\n0,10\n1,2')
+    writes = iter(['5\n', '2,40\n'])
+
+    def logger_writes(seconds):
+        # The logger finishes the row (and adds one more) while the reader waits.
+        with open(log, 'a') as f:
+            f.write(next(writes))
+
+    monkeypatch.setattr(time, 'sleep', logger_writes)
+    lines = follow_lines(str(log), follow=True)
+    assert [next(lines) for _ in range(4)] == ['Time,Resistance (Ohms)\n', '0,10\n', '1,25\n', '2,40\n']